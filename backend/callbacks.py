@@ -4,6 +4,7 @@ Async callback handler for sending HTTP callbacks with configurable delays.
 import asyncio
 import json
 import logging
+from collections import Counter
 from typing import Optional, Dict, Any
 import httpx
 from datetime import datetime
@@ -23,6 +24,10 @@ class CallbackHandler:
             max_timeout: Maximum timeout for HTTP requests in seconds
         """
         self.max_timeout = max_timeout
+        # Callbacks scheduled but not finished (including their delay)
+        self.pending = 0
+        # Finished callbacks per outcome: success | failure | timeout | error | unsupported
+        self.outcomes: Counter = Counter()
     
     async def send_callback(
         self,
@@ -79,6 +84,7 @@ class CallbackHandler:
                     )
                 else:
                     logger.warning(f"Unsupported callback method: {method}")
+                    self.outcomes["unsupported"] += 1
                     return False
                 
                 # Log the result
@@ -88,16 +94,21 @@ class CallbackHandler:
                 )
                 
                 # Consider 2xx and 3xx as success
-                return 200 <= response.status_code < 400
+                success = 200 <= response.status_code < 400
+                self.outcomes["success" if success else "failure"] += 1
+                return success
                 
         except httpx.TimeoutException:
             logger.error(f"Callback timeout for URL: {url}")
+            self.outcomes["timeout"] += 1
             return False
         except httpx.RequestError as e:
             logger.error(f"Callback request error for URL {url}: {str(e)}")
+            self.outcomes["error"] += 1
             return False
         except Exception as e:
             logger.error(f"Unexpected error sending callback to {url}: {str(e)}")
+            self.outcomes["error"] += 1
             return False
     
     def extract_callback_url(
@@ -156,9 +167,14 @@ class CallbackHandler:
             headers: Optional headers
             delay_ms: Delay before sending
         """
-        asyncio.create_task(
+        self.pending += 1
+        task = asyncio.create_task(
             self.send_callback(url, method, payload, headers, delay_ms)
         )
+        task.add_done_callback(self._callback_done)
+    
+    def _callback_done(self, task: asyncio.Task):
+        self.pending -= 1
 
 
 # Global instance
@@ -0,0 +1,392 @@
+"""
+Config invalidation bus for multi-replica deployments.
+Broadcasts entity/endpoint changes so every replica can keep hot in-process caches.
+
+Transports:
+- Redis pub/sub (when REDIS_URL is set)
+- PostgreSQL LISTEN/NOTIFY
+- Polling of the config_changes table (works everywhere, including SQLite)
+"""
+import os
+import json
+import uuid
+import select
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Optional, Callable
+
+logger = logging.getLogger(__name__)
+
+# Try to import Redis
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+# Unique id of this process, used to ignore our own messages
+INSTANCE_ID = uuid.uuid4().hex
+
+CHANNEL = "mocklab:config"
+
+# How often the polling bus checks for changes
+POLL_INTERVAL_MS = int(os.getenv("CONFIG_BUS_POLL_INTERVAL_MS", "500"))
+
+# How long rows are kept in the config_changes table
+CHANGE_RETENTION_SECONDS = int(os.getenv("CONFIG_BUS_RETENTION_SECONDS", "3600"))
+
+
+class ConfigChange:
+    """A single config change notification."""
+
+    __slots__ = ("kind", "object_id", "revision", "deleted", "origin")
+
+    def __init__(self, kind: str, object_id: int, revision: int = 0, deleted: bool = False, origin: Optional[str] = None):
+        self.kind = kind  # entity | endpoint
+        self.object_id = object_id
+        self.revision = revision or 0
+        self.deleted = deleted
+        self.origin = origin or INSTANCE_ID
+
+    @property
+    def is_local(self) -> bool:
+        """True if this change was published by the current process."""
+        return self.origin == INSTANCE_ID
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "kind": self.kind,
+            "id": self.object_id,
+            "revision": self.revision,
+            "deleted": self.deleted,
+            "origin": self.origin,
+        })
+
+    @classmethod
+    def from_json(cls, data: str) -> "ConfigChange":
+        payload = json.loads(data)
+        return cls(
+            kind=payload["kind"],
+            object_id=int(payload["id"]),
+            revision=int(payload.get("revision") or 0),
+            deleted=bool(payload.get("deleted")),
+            origin=payload.get("origin"),
+        )
+
+
+def bump_revision(obj):
+    """
+    Increment the config revision of an Entity or MockEndpoint.
+
+    The increment is done by the UPDATE itself (config_revision = config_revision + 1),
+    so concurrent changes on different replicas always get distinct revisions. Refresh
+    the object after commit to read the new revision.
+    """
+    obj.config_revision = type(obj).config_revision + 1
+
+
+class ConfigBus:
+    """Abstract config bus interface."""
+
+    def __init__(self):
+        self._on_change: Optional[Callable[[ConfigChange], None]] = None
+        self._on_resync: Optional[Callable[[], None]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def publish(self, change: ConfigChange) -> bool:
+        """Publish a change to all replicas. Returns True on success."""
+        raise NotImplementedError
+
+    def start(self, on_change: Callable[[ConfigChange], None], on_resync: Optional[Callable[[], None]] = None):
+        """
+        Start receiving changes in a background thread.
+
+        Args:
+            on_change: Called for every change published by another replica
+            on_resync: Called when messages may have been lost (e.g. after a reconnect)
+        """
+        self._on_change = on_change
+        self._on_resync = on_resync
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background receiver."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        raise NotImplementedError
+
+    def _dispatch(self, change: ConfigChange):
+        """Deliver a remote change to the registered handler."""
+        if change.is_local or self._on_change is None:
+            return
+        try:
+            self._on_change(change)
+        except Exception as e:
+            logger.error(f"Failed to apply config change {change.kind}:{change.object_id}: {e}")
+
+    def _resync(self):
+        if self._on_resync is None:
+            return
+        try:
+            self._on_resync()
+        except Exception as e:
+            logger.error(f"Config resync failed: {e}")
+
+
+class RedisConfigBus(ConfigBus):
+    """Redis pub/sub config bus (recommended when Redis is available)."""
+
+    def __init__(self, client=None):
+        """
+        Args:
+            client: Optional Redis client (e.g. fakeredis for local testing)
+        """
+        super().__init__()
+        if client is None:
+            if not REDIS_AVAILABLE:
+                raise RuntimeError("Redis is not available")
+            redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+            client = redis.from_url(redis_url, decode_responses=True)
+            client.ping()
+            logger.info("✓ Connected to Redis for config invalidation")
+        self.client = client
+
+    def publish(self, change: ConfigChange) -> bool:
+        try:
+            self.client.publish(CHANNEL, change.to_json())
+            return True
+        except Exception as e:
+            logger.error(f"Failed to publish config change to Redis: {e}")
+            return False
+
+    def _run(self):
+        first_connect = True
+        while not self._stop.is_set():
+            pubsub = None
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(CHANNEL)
+                # Anything published while we were disconnected is lost; reload everything
+                if not first_connect:
+                    self._resync()
+                first_connect = False
+
+                while not self._stop.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message and message.get("type") == "message":
+                        data = message["data"]
+                        if isinstance(data, bytes):
+                            data = data.decode("utf-8")
+                        self._dispatch(ConfigChange.from_json(data))
+            except Exception as e:
+                logger.error(f"Redis config bus error: {e}")
+                self._stop.wait(1.0)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+
+class PostgresConfigBus(ConfigBus):
+    """PostgreSQL LISTEN/NOTIFY config bus."""
+
+    def __init__(self, engine):
+        super().__init__()
+        self.engine = engine
+
+    def publish(self, change: ConfigChange) -> bool:
+        from sqlalchemy import text
+        try:
+            with self.engine.connect() as conn:
+                conn.execute(text("SELECT pg_notify(:channel, :payload)"), {
+                    "channel": CHANNEL.replace(":", "_"),
+                    "payload": change.to_json(),
+                })
+                conn.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to publish config change via NOTIFY: {e}")
+            return False
+
+    def _run(self):
+        first_connect = True
+        while not self._stop.is_set():
+            raw = None
+            try:
+                # Dedicated DBAPI connection in autocommit mode, outside the pool
+                cargs, cparams = self.engine.dialect.create_connect_args(self.engine.url)
+                raw = self.engine.dialect.connect(*cargs, **cparams)
+                raw.autocommit = True
+                cursor = raw.cursor()
+                cursor.execute(f"LISTEN {CHANNEL.replace(':', '_')}")
+                if not first_connect:
+                    self._resync()
+                first_connect = False
+
+                while not self._stop.is_set():
+                    if select.select([raw], [], [], 1.0) == ([], [], []):
+                        continue
+                    raw.poll()
+                    while raw.notifies:
+                        notify = raw.notifies.pop(0)
+                        self._dispatch(ConfigChange.from_json(notify.payload))
+            except Exception as e:
+                logger.error(f"Postgres config bus error: {e}")
+                self._stop.wait(1.0)
+            finally:
+                if raw is not None:
+                    try:
+                        raw.close()
+                    except Exception:
+                        pass
+
+
+class PollingConfigBus(ConfigBus):
+    """Config bus that polls the config_changes table (fallback, works with SQLite)."""
+
+    def __init__(self, db_session_factory, interval_ms: int = POLL_INTERVAL_MS):
+        super().__init__()
+        self.db_session_factory = db_session_factory
+        self.interval = interval_ms / 1000.0
+        self.last_seen_id = None
+
+    def publish(self, change: ConfigChange) -> bool:
+        from backend.models import ConfigChange as ConfigChangeRow
+        db = self.db_session_factory()
+        try:
+            db.add(ConfigChangeRow(
+                kind=change.kind,
+                object_id=change.object_id,
+                revision=change.revision,
+                deleted=change.deleted,
+                origin=change.origin,
+                created_at=datetime.utcnow()
+            ))
+            db.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to record config change: {e}")
+            db.rollback()
+            return False
+        finally:
+            db.close()
+
+    def poll(self) -> int:
+        """Fetch and dispatch changes recorded since the last poll. Returns number of changes seen."""
+        from sqlalchemy import func
+        from backend.models import ConfigChange as ConfigChangeRow
+        db = self.db_session_factory()
+        try:
+            if self.last_seen_id is None:
+                # Start from the current head; older changes are already reflected in the DB
+                self.last_seen_id = db.query(func.max(ConfigChangeRow.id)).scalar() or 0
+                return 0
+
+            rows = db.query(ConfigChangeRow).filter(
+                ConfigChangeRow.id > self.last_seen_id
+            ).order_by(ConfigChangeRow.id).all()
+            changes = [
+                ConfigChange(row.kind, row.object_id, row.revision, row.deleted, row.origin)
+                for row in rows
+            ]
+            if rows:
+                self.last_seen_id = rows[-1].id
+        finally:
+            db.close()
+
+        for change in changes:
+            self._dispatch(change)
+        return len(changes)
+
+    def cleanup_expired(self) -> int:
+        """Delete old rows from the change feed. Returns number of rows deleted."""
+        from backend.models import ConfigChange as ConfigChangeRow
+        db = self.db_session_factory()
+        try:
+            cutoff = datetime.utcnow() - timedelta(seconds=CHANGE_RETENTION_SECONDS)
+            count = db.query(ConfigChangeRow).filter(ConfigChangeRow.created_at < cutoff).delete()
+            db.commit()
+            return count
+        except Exception as e:
+            logger.error(f"Failed to clean up config changes: {e}")
+            db.rollback()
+            return 0
+        finally:
+            db.close()
+
+    def _run(self):
+        polls = 0
+        while not self._stop.is_set():
+            try:
+                self.poll()
+                polls += 1
+                # Prune the change feed roughly once a minute
+                if polls * self.interval >= 60:
+                    polls = 0
+                    self.cleanup_expired()
+            except Exception as e:
+                logger.error(f"Config polling error: {e}")
+            self._stop.wait(self.interval)
+
+
+# Global config bus instance
+_config_bus: Optional[ConfigBus] = None
+
+
+def get_config_bus(db_session_factory=None, engine=None) -> ConfigBus:
+    """Get or create the global config bus.
+
+    Uses Redis if REDIS_URL is set, LISTEN/NOTIFY on PostgreSQL, and table polling otherwise.
+    CONFIG_BUS=redis|postgres|polling forces a specific transport.
+    """
+    global _config_bus
+
+    if _config_bus is not None:
+        return _config_bus
+
+    if db_session_factory is None or engine is None:
+        from backend.database import SessionLocal, engine as default_engine
+        db_session_factory = db_session_factory or SessionLocal
+        engine = engine or default_engine
+
+    transport = os.getenv("CONFIG_BUS", "").lower()
+
+    if transport in ("", "redis") and REDIS_AVAILABLE and os.getenv("REDIS_URL"):
+        try:
+            _config_bus = RedisConfigBus()
+            logger.info("Using Redis pub/sub for config invalidation")
+            return _config_bus
+        except Exception as e:
+            logger.warning(f"Redis connection failed: {e}. Falling back to database config bus.")
+
+    if transport in ("", "postgres") and engine.dialect.name == "postgresql":
+        _config_bus = PostgresConfigBus(engine)
+        logger.info("Using PostgreSQL LISTEN/NOTIFY for config invalidation")
+        return _config_bus
+
+    _config_bus = PollingConfigBus(db_session_factory)
+    logger.info(f"Using config_changes polling every {POLL_INTERVAL_MS}ms for config invalidation")
+    return _config_bus
+
+
+def publish_change(kind: str, object_id: int, revision: int = 0, deleted: bool = False) -> bool:
+    """
+    Convenience function to publish a change for an entity or endpoint.
+
+    Args:
+        kind: "entity" or "endpoint"
+        object_id: Id of the changed object
+        revision: Config revision after the change
+        deleted: True if the object was deleted
+    """
+    return get_config_bus().publish(ConfigChange(kind, object_id, revision, deleted))
@@ -0,0 +1,98 @@
+"""
+Aggregate statistics for the admin dashboard.
+
+Each listing is built from a fixed number of GROUP BY queries, merged in Python,
+so the query count does not grow with the number of users or entities. Request
+counts come from the traffic rollups, not from request_logs.
+"""
+from collections import defaultdict
+from typing import Any, Dict, List
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from backend.models import User, Entity, MockEndpoint, user_entity_association
+from backend.traffic_rollups import requests_by_entity
+
+
+def endpoint_counts_by_entity(db: Session) -> Dict[int, int]:
+    """Number of mock endpoints per entity id."""
+    return dict(
+        db.query(MockEndpoint.entity_id, func.count(MockEndpoint.id)).group_by(MockEndpoint.entity_id).all()
+    )
+
+
+def user_stats(db: Session) -> List[Dict[str, Any]]:
+    """
+    Statistics of every user (5 queries).
+
+    Returns:
+        List of dicts with the fields of UserStatsResponse
+    """
+    users = db.query(
+        User.id, User.email, User.username, User.is_admin, User.created_at
+    ).order_by(User.id).all()
+    owners = dict(db.query(Entity.id, Entity.owner_id).all())
+    endpoint_counts = endpoint_counts_by_entity(db)
+    request_stats = requests_by_entity(db)
+
+    # Shared = member of an entity the user does not own
+    shared_counts = dict(
+        db.query(user_entity_association.c.user_id, func.count())
+        .join(Entity, Entity.id == user_entity_association.c.entity_id)
+        .filter(or_(Entity.owner_id.is_(None), Entity.owner_id != user_entity_association.c.user_id))
+        .group_by(user_entity_association.c.user_id)
+        .all()
+    )
+
+    owned = defaultdict(int)
+    endpoints = defaultdict(int)
+    requests = defaultdict(int)
+    for entity_id, owner_id in owners.items():
+        owned[owner_id] += 1
+        endpoints[owner_id] += endpoint_counts.get(entity_id, 0)
+        requests[owner_id] += request_stats.get(entity_id, {}).get("request_count", 0)
+
+    return [
+        {
+            "id": user.id,
+            "email": user.email,
+            "username": user.username,
+            "is_admin": user.is_admin,
+            "created_at": user.created_at,
+            "collections_owned": owned[user.id],
+            "collections_shared": shared_counts.get(user.id, 0),
+            "total_endpoints": endpoints[user.id],
+            "total_requests": requests[user.id],
+        }
+        for user in users
+    ]
+
+
+def collection_stats(db: Session) -> List[Dict[str, Any]]:
+    """
+    Statistics of every entity (3 queries).
+
+    Returns:
+        List of dicts with the fields of CollectionStatsResponse
+    """
+    entities = db.query(
+        Entity.id, Entity.name, Entity.base_path, Entity.is_public, Entity.created_at, User.username
+    ).outerjoin(User, User.id == Entity.owner_id).order_by(Entity.id).all()
+    endpoint_counts = endpoint_counts_by_entity(db)
+    request_stats = requests_by_entity(db)
+
+    return [
+        {
+            "id": entity.id,
+            "name": entity.name,
+            "base_path": entity.base_path,
+            "owner_username": entity.username or "Unknown",
+            "is_public": entity.is_public,
+            "created_at": entity.created_at,
+            "endpoint_count": endpoint_counts.get(entity.id, 0),
+            "request_count": request_stats.get(entity.id, {}).get("request_count", 0),
+            "last_request_at": request_stats.get(entity.id, {}).get("last_request_at"),
+        }
+        for entity in entities
+    ]
@@ -1,4 +1,5 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -6,11 +7,18 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# Imported after load_dotenv(): metrics settings are read from the environment on import
+from backend.metrics import get_metrics, timed_pool_class  # noqa: E402
+
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./mocker.db")
 
+# The dialect's default pool, timing every connection checkout for /metrics
+_url = make_url(DATABASE_URL)
 engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
+    DATABASE_URL, connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {},
+    poolclass=timed_pool_class(_url.get_dialect().get_pool_class(_url))
 )
+get_metrics().instrument_engine(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -0,0 +1,214 @@
+"""
+Per-endpoint latency and size histograms.
+
+Every request that matched a mock endpoint is counted in fixed buckets for each
+metric below. Counters are kept in memory and added to endpoint_histograms
+(one row per entity, endpoint, hour, metric and bucket) with the same periodic
+upsert as the traffic rollups, so storage depends on active endpoints and hours,
+not on request volume. Percentiles are estimated from the bucket counts.
+"""
+import logging
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import func
+
+from backend.request_timing import RequestTiming
+from backend.traffic_rollups import CounterRollup
+
+logger = logging.getLogger(__name__)
+
+# Bucket upper bounds (inclusive); one more bucket counts values above the last bound
+LATENCY_BOUNDS_MS = (
+    0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000,
+)
+SIZE_BOUNDS_BYTES = (
+    0, 64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304,
+)
+
+# metric -> (unit, bucket bounds)
+METRICS = {
+    "duration_ms": ("ms", LATENCY_BOUNDS_MS),          # Handler start until the log is queued
+    "overhead_ms": ("ms", LATENCY_BOUNDS_MS),          # Duration minus the applied delay
+    "delay_ms": ("ms", LATENCY_BOUNDS_MS),             # Applied delay (delayed scenarios only)
+    "delay_overshoot_ms": ("ms", LATENCY_BOUNDS_MS),   # Applied minus configured delay
+    "request_bytes": ("bytes", SIZE_BOUNDS_BYTES),
+    "response_bytes": ("bytes", SIZE_BOUNDS_BYTES),
+}
+
+PERCENTILES = {"p50": 0.5, "p95": 0.95, "p99": 0.99}
+
+
+def hour_of(ts: datetime) -> datetime:
+    """Truncate a timestamp to its hour."""
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def bucket_index(bounds: Sequence[float], value: float) -> int:
+    """Index of the bucket holding value (len(bounds) for values above the last bound)."""
+    return bisect_left(bounds, value)
+
+
+def percentile(bounds: Sequence[float], counts: Sequence[int], q: float) -> Optional[float]:
+    """
+    Estimate a percentile from bucket counts, interpolating linearly within the bucket.
+
+    Args:
+        bounds: Bucket upper bounds
+        counts: Count per bucket (len(bounds) + 1 entries)
+        q: Quantile between 0 and 1
+
+    Returns:
+        The estimate (the last bound if it falls in the overflow bucket), or None without samples
+    """
+    total = sum(counts)
+    if not total:
+        return None
+    rank = q * total
+    cumulative = 0
+    for index, count in enumerate(counts):
+        if count and cumulative + count >= rank:
+            if index == len(bounds):
+                return float(bounds[-1])
+            lower = bounds[index - 1] if index else 0
+            upper = bounds[index]
+            return lower + (upper - lower) * max(rank - cumulative, 0) / count
+        cumulative += count
+    return float(bounds[-1])
+
+
+class EndpointHistograms(CounterRollup):
+    """Bucket counts per (entity, endpoint, hour, metric, bucket) in endpoint_histograms."""
+
+    key_columns = ("entity_id", "endpoint_id", "hour", "metric", "bucket")
+    time_column = "hour"
+    name = "endpoint histograms"
+    prune_deleted_endpoints = True
+
+    def model(self):
+        from backend.models import EndpointHistogram
+        return EndpointHistogram
+
+    def record(self, entity_id: int, endpoint_id: int, values: Dict[str, float], timestamp: Optional[datetime] = None):
+        """
+        Count one sample per metric (event loop only; no I/O).
+
+        Args:
+            entity_id: Entity of the endpoint
+            endpoint_id: Mock endpoint id
+            values: Value per metric name (metrics missing from METRICS are ignored)
+            timestamp: Time of the request (UTC now if None)
+        """
+        hour = hour_of(timestamp or datetime.utcnow())
+        for metric, value in values.items():
+            if metric in METRICS:
+                bounds = METRICS[metric][1]
+                self._pending[(entity_id, endpoint_id, hour, metric, bucket_index(bounds, value))] += 1
+
+    def observe(self, entity_id: int, endpoint_id: int, timing: RequestTiming, request_bytes: int, response_bytes: int):
+        """
+        Count a served request from its timing and payload sizes.
+
+        Args:
+            entity_id: Entity of the endpoint
+            endpoint_id: Mock endpoint id
+            timing: Timing of the request (read when the request is logged)
+            request_bytes: Request body size
+            response_bytes: Response body size
+        """
+        duration = timing.elapsed_ms()
+        values = {
+            "duration_ms": duration,
+            "overhead_ms": max(duration - timing.delay_ms, 0.0),
+            "request_bytes": request_bytes,
+            "response_bytes": response_bytes,
+        }
+        if timing.configured_delay_ms > 0:
+            values["delay_ms"] = timing.delay_ms
+            values["delay_overshoot_ms"] = max(timing.delay_ms - timing.configured_delay_ms, 0.0)
+        self.record(entity_id, endpoint_id, values)
+
+
+# ==================== Queries ====================
+
+def histogram_summary(db, entity_id: int, endpoint_id: int, since: datetime, until: datetime) -> Dict[str, Dict[str, Any]]:
+    """
+    Histograms and percentiles of an endpoint over a time range.
+
+    Rows are hourly, so the range is widened to whole hours.
+
+    Args:
+        db: SQLAlchemy session
+        entity_id: Entity of the endpoint
+        endpoint_id: Mock endpoint id
+        since: Start of the range (UTC, inclusive)
+        until: End of the range (UTC, exclusive)
+
+    Returns:
+        Per metric: {"unit", "count", "p50", "p95", "p99", "buckets": [{"le", "count"}, ...]},
+        where the last bucket has le None (values above the last bound)
+    """
+    from backend.models import EndpointHistogram
+
+    rows = db.query(
+        EndpointHistogram.metric, EndpointHistogram.bucket, func.sum(EndpointHistogram.count)
+    ).filter(
+        EndpointHistogram.entity_id == entity_id,
+        EndpointHistogram.endpoint_id == endpoint_id,
+        EndpointHistogram.hour >= hour_of(since),
+        EndpointHistogram.hour < until
+    ).group_by(EndpointHistogram.metric, EndpointHistogram.bucket).all()
+
+    counts: Dict[str, Dict[int, int]] = defaultdict(dict)
+    for metric, bucket, count in rows:
+        counts[metric][bucket] = count
+
+    histograms = {}
+    for metric, (unit, bounds) in METRICS.items():
+        bucket_counts = [counts[metric].get(index, 0) for index in range(len(bounds) + 1)]
+        histograms[metric] = {
+            "unit": unit,
+            "count": sum(bucket_counts),
+            **{name: percentile(bounds, bucket_counts, q) for name, q in PERCENTILES.items()},
+            "buckets": _buckets(bounds, bucket_counts),
+        }
+    return histograms
+
+
+def _buckets(bounds: Sequence[float], counts: List[int]) -> List[Dict[str, Any]]:
+    return [{"le": bounds[index] if index < len(bounds) else None, "count": count} for index, count in enumerate(counts)]
+
+
+def delete_entity_histograms(db, entity_id: int):
+    """Delete the histograms of an entity (caller commits)."""
+    from backend.models import EndpointHistogram
+
+    db.query(EndpointHistogram).filter(EndpointHistogram.entity_id == entity_id).delete(synchronize_session=False)
+
+
+def delete_endpoint_histograms(db, entity_id: int, endpoint_id: int):
+    """Delete the histograms of a mock endpoint (caller commits)."""
+    from backend.models import EndpointHistogram
+
+    db.query(EndpointHistogram).filter(
+        EndpointHistogram.entity_id == entity_id,
+        EndpointHistogram.endpoint_id == endpoint_id
+    ).delete(synchronize_session=False)
+
+
+# Global histograms instance
+_endpoint_histograms: Optional[EndpointHistograms] = None
+
+
+def get_endpoint_histograms(db_session_factory=None) -> EndpointHistograms:
+    """Get or create the global endpoint histograms."""
+    global _endpoint_histograms
+
+    if _endpoint_histograms is None:
+        if db_session_factory is None:
+            from backend.database import SessionLocal
+            db_session_factory = SessionLocal
+        _endpoint_histograms = EndpointHistograms(db_session_factory)
+    return _endpoint_histograms
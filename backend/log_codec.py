@@ -0,0 +1,311 @@
+"""
+Compressed storage of request log payloads.
+
+When enabled, request headers, request body and response body of a log row are
+packed into one compressed blob (zlib, or zstd with an optional dictionary trained
+per entity from its recent logs). Read endpoints decode rows transparently.
+"""
+import os
+import json
+import time
+import zlib
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm.attributes import set_committed_value
+
+logger = logging.getLogger(__name__)
+
+# Try to import zstandard
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# none | zlib | zstd
+LOG_COMPRESSION = os.getenv("LOG_COMPRESSION", "none").lower()
+
+# Compression level (zlib: 1-9, zstd: 1-22)
+LOG_COMPRESSION_LEVEL = int(os.getenv("LOG_COMPRESSION_LEVEL", "3"))
+
+# Payloads smaller than this are stored as plain text
+LOG_COMPRESSION_MIN_BYTES = int(os.getenv("LOG_COMPRESSION_MIN_BYTES", "128"))
+
+# zstd dictionary training
+LOG_DICTIONARY_SIZE = int(os.getenv("LOG_DICTIONARY_SIZE", "16384"))
+LOG_DICTIONARY_SAMPLES = int(os.getenv("LOG_DICTIONARY_SAMPLES", "1000"))
+LOG_DICTIONARY_MIN_SAMPLES = 20
+
+# How long the writer trusts its cached "current dictionary" of an entity
+DICTIONARY_REFRESH_SECONDS = 60
+
+CODECS = ("none", "zlib", "zstd")
+
+# Log columns packed into the compressed payload
+PAYLOAD_FIELDS = ("request_headers", "request_body", "response_body")
+
+
+def pack_payload(values: Dict[str, Any]) -> bytes:
+    """Serialize the payload fields of a log row."""
+    return json.dumps([values.get(field) for field in PAYLOAD_FIELDS], separators=(",", ":")).encode("utf-8")
+
+
+def unpack_payload(data: bytes) -> Dict[str, Optional[str]]:
+    """Inverse of pack_payload()."""
+    return dict(zip(PAYLOAD_FIELDS, json.loads(data.decode("utf-8"))))
+
+
+class LogCodec:
+    """
+    Encodes log rows for storage and decodes them on read.
+
+    Dictionaries are immutable once stored; new training creates a new row, and old
+    logs keep referencing the dictionary they were compressed with.
+    """
+
+    def __init__(
+        self,
+        codec: str = LOG_COMPRESSION,
+        level: int = LOG_COMPRESSION_LEVEL,
+        min_bytes: int = LOG_COMPRESSION_MIN_BYTES
+    ):
+        if codec not in CODECS:
+            logger.warning(f"Unknown log compression '{codec}', storing logs uncompressed")
+            codec = "none"
+        if codec == "zstd" and not ZSTD_AVAILABLE:
+            logger.warning("zstandard is not installed, falling back to zlib log compression")
+            codec = "zlib"
+
+        self.codec = codec
+        self.level = level
+        self.min_bytes = min_bytes
+
+        self._lock = threading.Lock()
+        # dictionary id -> zstandard.ZstdCompressionDict
+        self._dictionaries: "OrderedDict[int, Any]" = OrderedDict()
+        # entity id -> (dictionary id or None, loaded at)
+        self._current: Dict[int, Tuple[Optional[int], float]] = {}
+        # dictionary id -> compressor (only used by the single log writer thread)
+        self._compressors: Dict[Optional[int], Any] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.codec != "none"
+
+    # ==================== Encoding ====================
+
+    def encode_row(self, db, row: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Compress the payload fields of a RequestLog column dict in place.
+
+        Args:
+            db: SQLAlchemy session (used to look up the entity's dictionary)
+            row: RequestLog column values
+
+        Returns:
+            The row, with payload columns moved into compressed_payload if worthwhile
+        """
+        if not self.enabled or all(row.get(field) is None for field in PAYLOAD_FIELDS):
+            return row
+
+        data = pack_payload(row)
+        if len(data) < self.min_bytes:
+            return row
+
+        dictionary_id = None
+        if self.codec == "zstd":
+            dictionary_id = self._current_dictionary_id(db, row["entity_id"])
+            compressed = self._compressor(db, dictionary_id).compress(data)
+        else:
+            compressed = zlib.compress(data, self.level)
+
+        if len(compressed) >= len(data):
+            return row
+
+        for field in PAYLOAD_FIELDS:
+            row[field] = None
+        row["body_codec"] = self.codec
+        row["compressed_payload"] = compressed
+        row["body_dictionary_id"] = dictionary_id
+        return row
+
+    def _compressor(self, db, dictionary_id: Optional[int]):
+        compressor = self._compressors.get(dictionary_id)
+        if compressor is None:
+            if dictionary_id is None:
+                compressor = zstandard.ZstdCompressor(level=self.level)
+            else:
+                compressor = zstandard.ZstdCompressor(level=self.level, dict_data=self._dictionary(db, dictionary_id))
+            if len(self._compressors) > 256:
+                self._compressors.clear()
+            self._compressors[dictionary_id] = compressor
+        return compressor
+
+    def _current_dictionary_id(self, db, entity_id: int) -> Optional[int]:
+        """Id of the newest dictionary of an entity (cached for DICTIONARY_REFRESH_SECONDS)."""
+        from backend.models import LogDictionary
+
+        cached = self._current.get(entity_id)
+        if cached is not None and time.monotonic() - cached[1] < DICTIONARY_REFRESH_SECONDS:
+            return cached[0]
+
+        dictionary_id = db.query(LogDictionary.id).filter(
+            LogDictionary.entity_id == entity_id
+        ).order_by(LogDictionary.id.desc()).limit(1).scalar()
+        self._current[entity_id] = (dictionary_id, time.monotonic())
+        return dictionary_id
+
+    # ==================== Decoding ====================
+
+    def decode_payload(self, db, codec: str, payload: bytes, dictionary_id: Optional[int] = None) -> Dict[str, Optional[str]]:
+        """
+        Decompress a stored payload.
+
+        Args:
+            db: SQLAlchemy session (used to load the dictionary if needed)
+            codec: Value of RequestLog.body_codec
+            payload: Value of RequestLog.compressed_payload
+            dictionary_id: Value of RequestLog.body_dictionary_id
+
+        Returns:
+            Dict with request_headers, request_body and response_body
+        """
+        if codec == "zlib":
+            return unpack_payload(zlib.decompress(payload))
+        if codec == "zstd":
+            if not ZSTD_AVAILABLE:
+                raise RuntimeError("zstandard is required to read zstd-compressed logs")
+            if dictionary_id is None:
+                decompressor = zstandard.ZstdDecompressor()
+            else:
+                decompressor = zstandard.ZstdDecompressor(dict_data=self._dictionary(db, dictionary_id))
+            return unpack_payload(decompressor.decompress(payload))
+        raise ValueError(f"Unknown log codec '{codec}'")
+
+    def decode_logs(self, db, logs: List[Any]) -> List[Any]:
+        """
+        Restore the payload fields of compressed RequestLog instances in place.
+
+        Values are set as committed state, so the session never writes them back.
+
+        Args:
+            db: SQLAlchemy session
+            logs: RequestLog model instances
+
+        Returns:
+            The same list
+        """
+        for log in logs:
+            if not log.body_codec:
+                continue
+            try:
+                values = self.decode_payload(db, log.body_codec, log.compressed_payload, log.body_dictionary_id)
+            except Exception as e:
+                logger.error(f"Failed to decode request log {log.id}: {e}")
+                continue
+            for field, value in values.items():
+                set_committed_value(log, field, value)
+        return logs
+
+    def _dictionary(self, db, dictionary_id: int):
+        """Load a dictionary by id (dictionaries never change, so they are cached)."""
+        from backend.models import LogDictionary
+
+        with self._lock:
+            dictionary = self._dictionaries.get(dictionary_id)
+            if dictionary is not None:
+                self._dictionaries.move_to_end(dictionary_id)
+                return dictionary
+
+        row = db.get(LogDictionary, dictionary_id)
+        if row is None:
+            raise ValueError(f"Log dictionary {dictionary_id} not found")
+        dictionary = zstandard.ZstdCompressionDict(row.dictionary)
+
+        with self._lock:
+            self._dictionaries[dictionary_id] = dictionary
+            while len(self._dictionaries) > 256:
+                self._dictionaries.popitem(last=False)
+        return dictionary
+
+    # ==================== Dictionary Training ====================
+
+    def train_dictionary(
+        self,
+        db,
+        entity_id: int,
+        sample_limit: int = LOG_DICTIONARY_SAMPLES,
+        dict_size: int = LOG_DICTIONARY_SIZE
+    ):
+        """
+        Train a zstd dictionary from the most recent logs of an entity.
+
+        Args:
+            db: SQLAlchemy session
+            entity_id: Entity whose logs are sampled
+            sample_limit: Maximum number of logs used as samples
+            dict_size: Target dictionary size in bytes
+
+        Returns:
+            The stored LogDictionary row
+
+        Raises:
+            RuntimeError: If zstandard is not installed
+            ValueError: If there are not enough logs to train on
+        """
+        from backend.models import RequestLog, LogDictionary
+
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("zstandard is not installed")
+
+        logs = db.query(RequestLog).filter(
+            RequestLog.entity_id == entity_id
+        ).order_by(RequestLog.id.desc()).limit(sample_limit).all()
+        self.decode_logs(db, logs)
+        samples = [
+            pack_payload({field: getattr(log, field) for field in PAYLOAD_FIELDS})
+            for log in logs
+            if any(getattr(log, field) is not None for field in PAYLOAD_FIELDS)
+        ]
+        if len(samples) < LOG_DICTIONARY_MIN_SAMPLES:
+            raise ValueError(
+                f"At least {LOG_DICTIONARY_MIN_SAMPLES} logged requests with payloads are needed "
+                f"to train a dictionary (found {len(samples)})"
+            )
+
+        try:
+            trained = zstandard.train_dictionary(dict_size, samples)
+        except zstandard.ZstdError as e:
+            raise ValueError(f"Dictionary training failed: {e}")
+
+        row = LogDictionary(
+            entity_id=entity_id,
+            dictionary=trained.as_bytes(),
+            sample_count=len(samples),
+            created_at=datetime.utcnow()
+        )
+        db.add(row)
+        db.commit()
+        db.refresh(row)
+
+        # Use it for new logs of this entity right away (other replicas pick it up on refresh)
+        self._current[entity_id] = (row.id, time.monotonic())
+        logger.info(f"Trained {len(row.dictionary)} byte log dictionary for entity {entity_id} from {len(samples)} samples")
+        return row
+
+
+# Global codec instance
+_log_codec: Optional[LogCodec] = None
+
+
+def get_log_codec() -> LogCodec:
+    """Get or create the global log codec."""
+    global _log_codec
+
+    if _log_codec is None:
+        _log_codec = LogCodec()
+    return _log_codec
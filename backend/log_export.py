@@ -0,0 +1,199 @@
+"""
+Streaming export of request logs as NDJSON or CSV.
+
+Rows are read as plain column tuples through a server-side cursor (yield_per)
+and serialized one batch at a time, optionally gzipped on the fly, so memory
+stays constant however many logs are exported.
+"""
+import io
+import os
+import csv
+import json
+import zlib
+import logging
+from urllib.parse import quote
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import select
+
+from backend.models import RequestLog
+from backend.log_codec import get_log_codec
+from backend.log_headers import get_header_store
+from backend.log_queries import filter_logs
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched from the cursor and serialized per chunk
+LOG_EXPORT_BATCH_SIZE = int(os.getenv("LOG_EXPORT_BATCH_SIZE", "1000"))
+
+# Media type per export format
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+GZIP_LEVEL = 6
+
+METADATA_FIELDS = (
+    "id", "timestamp", "entity_id", "mock_endpoint_id", "method", "path", "response_code",
+    "duration_ms", "request_size", "response_size",
+)
+PAYLOAD_FIELDS = ("request_headers", "query_params", "request_body", "response_body")
+
+
+def content_disposition(filename: str) -> str:
+    """
+    Content-Disposition header value for downloading a file (RFC 6266).
+
+    Args:
+        filename: File name, may contain any characters
+
+    Returns:
+        "attachment" with an ASCII fallback filename (quotes, backslashes and
+        non-ASCII characters replaced by "_") and the exact name as filename*
+    """
+    fallback = "".join(c if 32 <= ord(c) < 127 and c not in '"\\' else "_" for c in filename)
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+# Storage columns read to restore payloads; not exported themselves
+STORAGE_FIELDS = ("request_headers_hash", "body_codec", "compressed_payload", "body_dictionary_id")
+
+# Header sets remembered across batches of one export
+HEADER_CACHE_SIZE = 10000
+
+
+def export_fields(include_bodies: bool = True) -> tuple:
+    """Fields written for each log, in output order."""
+    return METADATA_FIELDS + (PAYLOAD_FIELDS if include_bodies else ())
+
+
+def export_logs(
+    db_session_factory,
+    entity_id: int,
+    filters: Optional[Dict[str, Any]] = None,
+    export_format: str = "ndjson",
+    include_bodies: bool = True,
+    compress: bool = False,
+    batch_size: int = LOG_EXPORT_BATCH_SIZE
+) -> Iterator[bytes]:
+    """
+    Stream an entity's request logs, oldest first.
+
+    The generator owns its database session, so it can outlive the request's
+    session while the response is streamed.
+
+    Args:
+        db_session_factory: Session factory (e.g. SessionLocal)
+        entity_id: Entity whose logs are exported
+        filters: Keyword arguments for filter_logs()
+        export_format: ndjson | csv
+        include_bodies: Export headers, query params and bodies
+        compress: Gzip the output
+        batch_size: Rows per cursor fetch
+
+    Yields:
+        Chunks of the encoded (and possibly gzipped) export
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{export_format}'")
+    fields = export_fields(include_bodies)
+    encoder = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31) if compress else None
+
+    def encode(text: str) -> bytes:
+        data = text.encode("utf-8")
+        return encoder.compress(data) if encoder else data
+
+    db = db_session_factory()
+    exported = 0
+    try:
+        if export_format == "csv":
+            chunk = encode(_csv_lines([fields]))
+            if chunk:
+                yield chunk
+
+        for records in iter_log_batches(db, entity_id, filters, include_bodies, batch_size):
+            if export_format == "csv":
+                text = _csv_lines([[record[field] for field in fields] for record in records])
+            else:
+                text = "".join(
+                    json.dumps({field: record[field] for field in fields}) + "\n" for record in records
+                )
+            exported += len(records)
+            chunk = encode(text)
+            if chunk:
+                yield chunk
+
+        if encoder:
+            yield encoder.flush()
+        logger.info(f"Exported {exported} request logs of entity {entity_id} as {export_format}")
+    finally:
+        db.close()
+
+
+def iter_log_batches(
+    db,
+    entity_id: int,
+    filters: Optional[Dict[str, Any]] = None,
+    include_bodies: bool = True,
+    batch_size: int = LOG_EXPORT_BATCH_SIZE
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Read an entity's logs in batches of plain dicts with payloads restored.
+
+    Args:
+        db: SQLAlchemy session
+        entity_id: Entity whose logs are read
+        filters: Keyword arguments for filter_logs()
+        include_bodies: Read headers, query params and bodies
+        batch_size: Rows per cursor fetch
+
+    Yields:
+        Lists of up to batch_size log dicts, oldest first
+    """
+    names = export_fields(include_bodies) + (STORAGE_FIELDS if include_bodies else ())
+    stmt = filter_logs(
+        select(*(getattr(RequestLog, name) for name in names)).where(RequestLog.entity_id == entity_id),
+        **(filters or {})
+    ).order_by(RequestLog.timestamp, RequestLog.id)
+
+    result = db.execute(stmt.execution_options(yield_per=batch_size))
+    header_cache: Dict[str, str] = {}
+    for rows in result.mappings().partitions():
+        records = [dict(row) for row in rows]
+        for record in records:
+            record["timestamp"] = record["timestamp"].isoformat() if record["timestamp"] else None
+        if include_bodies:
+            _restore_payloads(db, records, header_cache)
+        yield records
+
+
+def _restore_payloads(db, records: List[Dict[str, Any]], header_cache: Dict[str, str]):
+    """Decompress payloads and resolve deduplicated headers of a batch in place."""
+    codec = get_log_codec()
+    for record in records:
+        if record["body_codec"]:
+            try:
+                record.update(codec.decode_payload(
+                    db, record["body_codec"], record["compressed_payload"], record["body_dictionary_id"]
+                ))
+            except Exception as e:
+                logger.error(f"Failed to decode request log {record['id']}: {e}")
+
+    missing = {
+        record["request_headers_hash"] for record in records
+        if record["request_headers"] is None and record["request_headers_hash"]
+        and record["request_headers_hash"] not in header_cache
+    }
+    if missing:
+        if len(header_cache) + len(missing) > HEADER_CACHE_SIZE:
+            header_cache.clear()
+        header_cache.update(get_header_store().lookup(db, missing))
+    for record in records:
+        if record["request_headers"] is None and record["request_headers_hash"]:
+            record["request_headers"] = header_cache.get(record["request_headers_hash"])
+
+
+def _csv_lines(rows: List[List[Any]]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
@@ -0,0 +1,332 @@
+"""
+Cross-replica fan-out of live log messages.
+
+A written request log is delivered to the WebSocket viewers of its entity on
+every replica, not only on the one that served the request.
+
+Transports:
+- Redis pub/sub (when REDIS_URL is set): one channel per entity. Each replica
+  subscribes only to the entities it has local viewers for, so Redis discards
+  messages nobody is watching.
+- Local (fallback): delivery to the viewers of this process only.
+
+Log summaries are collected per entity for LOG_FANOUT_WINDOW_MS and sent as
+one {"type": "logs", "entity_id": ..., "logs": [...]} frame, oldest first.
+
+Publishing never blocks the event loop: each frame is encoded once, delivered
+to local viewers directly and queued for a publisher thread that sends frames
+to Redis in pipelined batches. A subscriber thread hands remote frames back
+to the event loop.
+"""
+import os
+import json
+import queue
+import asyncio
+import logging
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from backend.config_bus import INSTANCE_ID
+
+logger = logging.getLogger(__name__)
+
+# Try to import Redis
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+CHANNEL_PREFIX = "mocklab:logs:"
+
+# Logs of an entity are collected this long and sent as one frame...
+LOG_FANOUT_WINDOW_MS = int(os.getenv("LOG_FANOUT_WINDOW_MS", "50"))
+
+# ...unless this many are waiting
+LOG_FANOUT_MAX_BATCH = int(os.getenv("LOG_FANOUT_MAX_BATCH", "200"))
+
+# Frames waiting for the Redis publisher before new ones are dropped
+LOG_FANOUT_QUEUE_SIZE = int(os.getenv("LOG_FANOUT_QUEUE_SIZE", "10000"))
+
+# Frames sent per Redis pipeline
+LOG_FANOUT_BATCH_SIZE = int(os.getenv("LOG_FANOUT_BATCH_SIZE", "500"))
+
+# Sends an encoded message to the local viewers of an entity (called on the event loop)
+Deliver = Callable[[int, str], None]
+
+# Queue marker telling the publisher thread to exit
+_STOP = object()
+
+
+def channel_for(entity_id: int) -> str:
+    return f"{CHANNEL_PREFIX}{entity_id}"
+
+
+class LogFanout:
+    """Local fan-out: frames reach the viewers of this process only."""
+
+    # Whether frames go to other replicas (then every entity is published, watched here or not)
+    remote = False
+
+    def __init__(self, window_ms: int = LOG_FANOUT_WINDOW_MS, max_batch: int = LOG_FANOUT_MAX_BATCH):
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._deliver: Optional[Deliver] = None
+        # entity_id -> log summaries waiting for the next frame
+        self._pending: Dict[int, List[Dict[str, Any]]] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # Entities with viewers on this replica
+        self._watched: Set[int] = set()
+        self._watched_lock = threading.Lock()
+        # Counters
+        self.outcomes: Counter = Counter()
+
+    @property
+    def queue_depth(self) -> int:
+        return 0
+
+    def start(self, deliver: Deliver):
+        """
+        Start delivering messages.
+
+        Args:
+            deliver: Sends an encoded message to the local viewers of an entity
+        """
+        self._deliver = deliver
+
+    async def stop(self):
+        """Send the frames still being collected."""
+        self.flush()
+
+    def publish(self, entity_id: int, summary: Dict[str, Any]):
+        """
+        Add a log summary to the next frame of its entity (event loop only; no I/O).
+
+        Args:
+            entity_id: Entity of the log
+            summary: JSON-serializable log summary
+        """
+        if not self.remote and entity_id not in self._watched:
+            return
+        pending = self._pending.get(entity_id)
+        if pending is None:
+            pending = self._pending[entity_id] = []
+        pending.append(summary)
+        if len(pending) >= self.max_batch:
+            self._emit(entity_id, self._pending.pop(entity_id))
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.window, self.flush)
+
+    def flush(self):
+        """Send one frame per entity with the summaries collected so far."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = self._pending, {}
+        for entity_id, logs in pending.items():
+            self._emit(entity_id, logs)
+
+    def _emit(self, entity_id: int, logs: List[Dict[str, Any]]):
+        self._send(entity_id, json.dumps({"type": "logs", "entity_id": entity_id, "logs": logs}))
+
+    def _send(self, entity_id: int, text: str):
+        self._deliver_local(entity_id, text)
+
+    def _deliver_local(self, entity_id: int, text: str):
+        if self._deliver is not None and entity_id in self._watched:
+            self._deliver(entity_id, text)
+
+    def watch(self, entity_id: int, watching: bool):
+        """Called when an entity gets its first local viewer (True) or loses its last one (False)."""
+        with self._watched_lock:
+            if watching:
+                self._watched.add(entity_id)
+            else:
+                self._watched.discard(entity_id)
+
+
+class RedisLogFanout(LogFanout):
+    """Redis pub/sub fan-out across replicas."""
+
+    remote = True
+
+    def __init__(self, client=None, queue_size: int = LOG_FANOUT_QUEUE_SIZE, batch_size: int = LOG_FANOUT_BATCH_SIZE,
+                 window_ms: int = LOG_FANOUT_WINDOW_MS, max_batch: int = LOG_FANOUT_MAX_BATCH):
+        """
+        Args:
+            client: Optional Redis client (e.g. fakeredis for local testing)
+            queue_size: Frames waiting for the publisher before new ones are dropped
+            batch_size: Frames sent per Redis pipeline
+            window_ms: How long logs are collected into one frame
+            max_batch: Logs per frame
+        """
+        super().__init__(window_ms, max_batch)
+        if client is None:
+            if not REDIS_AVAILABLE:
+                raise RuntimeError("Redis is not available")
+            redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+            client = redis.from_url(redis_url)
+            client.ping()
+            logger.info("✓ Connected to Redis for live log fan-out")
+        self.client = client
+        self.batch_size = batch_size
+        self._origin = INSTANCE_ID.encode()
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop = threading.Event()
+        self._threads = []
+
+        # Set when the watched entities change, so the subscriber thread updates its subscription
+        self._watched_changed = threading.Event()
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def start(self, deliver: Deliver):
+        super().start(deliver)
+        self._loop = asyncio.get_running_loop()
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._publish_loop, name="RedisLogFanoutPublisher", daemon=True),
+            threading.Thread(target=self._subscribe_loop, name="RedisLogFanoutSubscriber", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    async def stop(self):
+        """Send what is collected and queued, then stop both threads."""
+        self.flush()
+        self._stop.set()
+        try:
+            self._queue.put_nowait(_STOP)
+        except queue.Full:
+            pass
+        loop = asyncio.get_running_loop()
+        for thread in self._threads:
+            await loop.run_in_executor(None, thread.join, 5)
+        self._threads = []
+
+    def _send(self, entity_id: int, text: str):
+        # Viewers on this replica get the frame directly; our own copy from Redis is ignored
+        self._deliver_local(entity_id, text)
+        try:
+            self._queue.put_nowait((entity_id, text))
+        except queue.Full:
+            self.outcomes["dropped"] += 1
+
+    def watch(self, entity_id: int, watching: bool):
+        super().watch(entity_id, watching)
+        self._watched_changed.set()
+
+    # ==================== Publisher ====================
+
+    def _publish_loop(self):
+        while True:
+            item = self._queue.get()
+            batch = []
+            while item is not _STOP:
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._publish_batch(batch)
+            if item is _STOP:
+                return
+
+    def _publish_batch(self, batch):
+        try:
+            pipeline = self.client.pipeline(transaction=False)
+            for entity_id, text in batch:
+                pipeline.publish(channel_for(entity_id), self._origin + b":" + text.encode("utf-8"))
+            pipeline.execute()
+            self.outcomes["published"] += len(batch)
+        except Exception as e:
+            self.outcomes["failed"] += len(batch)
+            logger.error(f"Failed to publish {len(batch)} live log frame(s) to Redis: {e}")
+
+    # ==================== Subscriber ====================
+
+    def _subscribe_loop(self):
+        while not self._stop.is_set():
+            pubsub = None
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                subscribed: Set[int] = set()
+                # Subscribe to everything watched (again, after a reconnect)
+                self._watched_changed.set()
+
+                while not self._stop.is_set():
+                    if self._watched_changed.is_set():
+                        self._watched_changed.clear()
+                        with self._watched_lock:
+                            watched = set(self._watched)
+                        added, removed = watched - subscribed, subscribed - watched
+                        if added:
+                            pubsub.subscribe(*(channel_for(entity_id) for entity_id in added))
+                        if removed:
+                            pubsub.unsubscribe(*(channel_for(entity_id) for entity_id in removed))
+                        subscribed = watched
+
+                    if not subscribed:
+                        self._watched_changed.wait(0.5)
+                        continue
+                    message = pubsub.get_message(timeout=0.1)
+                    if message and message.get("type") == "message":
+                        self._receive(message["channel"], message["data"])
+            except Exception as e:
+                logger.error(f"Redis live log fan-out error: {e}")
+                self._stop.wait(1.0)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+    def _receive(self, channel, data):
+        if isinstance(channel, bytes):
+            channel = channel.decode("utf-8")
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        origin, _, payload = data.partition(b":")
+        if origin == self._origin:
+            return
+        self.outcomes["received"] += 1
+        entity_id = int(channel[len(CHANNEL_PREFIX):])
+        self._loop.call_soon_threadsafe(self._deliver_local, entity_id, payload.decode("utf-8"))
+
+
+# Global fan-out instance
+_log_fanout: Optional[LogFanout] = None
+
+
+def get_log_fanout() -> LogFanout:
+    """Get or create the global live log fan-out.
+
+    Uses Redis if REDIS_URL is set and local delivery otherwise.
+    LOG_FANOUT=redis|local forces a specific transport.
+    """
+    global _log_fanout
+
+    if _log_fanout is not None:
+        return _log_fanout
+
+    transport = os.getenv("LOG_FANOUT", "").lower()
+
+    if transport in ("", "redis") and REDIS_AVAILABLE and os.getenv("REDIS_URL"):
+        try:
+            _log_fanout = RedisLogFanout()
+            logger.info("Using Redis pub/sub for live log fan-out")
+            return _log_fanout
+        except Exception as e:
+            logger.warning(f"Redis connection failed: {e}. Live logs reach viewers on this replica only.")
+
+    _log_fanout = LogFanout()
+    return _log_fanout
@@ -0,0 +1,229 @@
+"""
+Content-addressed storage of logged request headers.
+
+Header sets are normalized, hashed and stored once in request_header_sets; log rows
+keep only the hash. An in-process LRU of hashes known to be stored lets the log
+writer skip the insert for header sets it has already written.
+
+Unreferenced header sets are garbage collected by the retention engine once
+their created_at is older than HEADER_SET_GC_AGE. Every insert of a known set
+refreshes its created_at, and LRU entries expire after LOG_HEADER_CACHE_TTL_SECONDS,
+so no replica can still treat a collected set as stored.
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy.orm.attributes import set_committed_value
+
+logger = logging.getLogger(__name__)
+
+# Store header sets once per distinct content (set to false to keep them inline)
+LOG_HEADER_DEDUP = os.getenv("LOG_HEADER_DEDUP", "true").lower() in ("1", "true", "yes")
+
+# Number of header hashes remembered as already stored
+LOG_HEADER_CACHE_SIZE = int(os.getenv("LOG_HEADER_CACHE_SIZE", "10000"))
+
+# How long a hash is remembered as stored; must stay well below HEADER_SET_GC_AGE
+LOG_HEADER_CACHE_TTL_SECONDS = int(os.getenv("LOG_HEADER_CACHE_TTL_SECONDS", "3600"))
+
+# Unreferenced header sets not inserted for this long are garbage collected
+HEADER_SET_GC_AGE = timedelta(days=1)
+
+
+def normalize_headers(headers: Dict[str, str]) -> str:
+    """
+    Canonical JSON encoding of a header set (lowercase names, sorted keys).
+
+    Args:
+        headers: Request headers
+
+    Returns:
+        JSON string; equal header sets always produce the same string
+    """
+    return json.dumps({k.lower(): v for k, v in headers.items()}, sort_keys=True)
+
+
+def headers_hash(headers_json: str) -> str:
+    """Content hash of a normalized header set."""
+    return hashlib.blake2b(headers_json.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class HeaderStore:
+    """Writes and resolves deduplicated request header sets."""
+
+    def __init__(self, enabled: bool = LOG_HEADER_DEDUP, cache_size: int = LOG_HEADER_CACHE_SIZE,
+                 cache_ttl_seconds: int = LOG_HEADER_CACHE_TTL_SECONDS):
+        if cache_ttl_seconds >= HEADER_SET_GC_AGE.total_seconds():
+            logger.warning(
+                f"LOG_HEADER_CACHE_TTL_SECONDS={cache_ttl_seconds} is not below the header set GC age, "
+                f"using {int(HEADER_SET_GC_AGE.total_seconds() // 2)}"
+            )
+            cache_ttl_seconds = int(HEADER_SET_GC_AGE.total_seconds() // 2)
+
+        self.enabled = enabled
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl_seconds
+        self._lock = threading.Lock()
+        # hash -> time.monotonic() when it was stored, most recently used last
+        self._seen: "OrderedDict[str, float]" = OrderedDict()
+
+        self.cache_hits = 0
+        self.inserted = 0
+
+    # ==================== Write Path ====================
+
+    def dedup_rows(self, db, rows: List[Dict[str, Any]]) -> List[str]:
+        """
+        Replace inline request_headers of RequestLog column dicts by their hash.
+
+        Header sets not in the LRU are inserted (or their created_at refreshed) in the
+        caller's transaction.
+
+        Args:
+            db: SQLAlchemy session of the batch being written
+            rows: RequestLog column values (modified in place)
+
+        Returns:
+            Hashes to pass to mark_stored() once the transaction has committed
+        """
+        if not self.enabled:
+            return []
+
+        new_sets: Dict[str, str] = {}
+        for row in rows:
+            headers_json = row.get("request_headers")
+            if headers_json is None:
+                continue
+            digest = headers_hash(headers_json)
+            row["request_headers"] = None
+            row["request_headers_hash"] = digest
+            if digest not in new_sets and not self._is_known(digest):
+                new_sets[digest] = headers_json
+
+        if new_sets:
+            self._insert_missing(db, new_sets)
+        return list(new_sets)
+
+    def mark_stored(self, hashes: Iterable[str]):
+        """Remember hashes whose header sets are committed to the database."""
+        now = time.monotonic()
+        with self._lock:
+            for digest in hashes:
+                self._seen[digest] = now
+                self._seen.move_to_end(digest)
+            while len(self._seen) > self.cache_size:
+                self._seen.popitem(last=False)
+
+    def _is_known(self, digest: str) -> bool:
+        with self._lock:
+            stored_at = self._seen.get(digest)
+            if stored_at is None:
+                return False
+            if time.monotonic() - stored_at > self.cache_ttl:
+                # Insert again, refreshing created_at, before the set can be garbage collected
+                del self._seen[digest]
+                return False
+            self._seen.move_to_end(digest)
+            self.cache_hits += 1
+            return True
+
+    def _insert_missing(self, db, new_sets: Dict[str, str]):
+        """Insert header sets; sets another writer already stored get a fresh created_at."""
+        from backend.models import RequestHeaderSet
+
+        now = datetime.utcnow()
+        values = [
+            {"hash": digest, "headers": headers_json, "created_at": now}
+            for digest, headers_json in new_sets.items()
+        ]
+        dialect = db.get_bind().dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            if dialect == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            stmt = insert(RequestHeaderSet)
+            db.execute(
+                stmt.on_conflict_do_update(index_elements=["hash"], set_={"created_at": stmt.excluded.created_at}),
+                values
+            )
+        else:
+            existing = {
+                digest for (digest,) in db.query(RequestHeaderSet.hash).filter(
+                    RequestHeaderSet.hash.in_(list(new_sets))
+                )
+            }
+            if existing:
+                db.query(RequestHeaderSet).filter(RequestHeaderSet.hash.in_(existing)).update(
+                    {"created_at": now}, synchronize_session=False
+                )
+            db.add_all(RequestHeaderSet(**v) for v in values if v["hash"] not in existing)
+        self.inserted += len(values)
+
+    # ==================== Read Path ====================
+
+    def resolve_logs(self, db, logs: List[Any]) -> List[Any]:
+        """
+        Fill request_headers of RequestLog instances that reference a header set.
+
+        All hashes are resolved with one query. Values are set as committed state,
+        so the session never writes them back.
+
+        Args:
+            db: SQLAlchemy session
+            logs: RequestLog model instances
+
+        Returns:
+            The same list
+        """
+        hashes = {log.request_headers_hash for log in logs if log.request_headers_hash and log.request_headers is None}
+        if not hashes:
+            return logs
+
+        headers_by_hash = self.lookup(db, hashes)
+        for log in logs:
+            if log.request_headers_hash and log.request_headers is None:
+                set_committed_value(log, "request_headers", headers_by_hash.get(log.request_headers_hash))
+        return logs
+
+    def lookup(self, db, hashes: Iterable[str]) -> Dict[str, str]:
+        """
+        Load header sets by hash with one query.
+
+        Args:
+            db: SQLAlchemy session
+            hashes: Header set hashes
+
+        Returns:
+            Dict of hash -> normalized headers JSON (unknown hashes are missing)
+        """
+        from backend.models import RequestHeaderSet
+
+        hashes = list(hashes)
+        if not hashes:
+            return {}
+        return dict(
+            db.query(RequestHeaderSet.hash, RequestHeaderSet.headers).filter(
+                RequestHeaderSet.hash.in_(hashes)
+            ).all()
+        )
+
+
+# Global header store instance
+_header_store: Optional[HeaderStore] = None
+
+
+def get_header_store() -> HeaderStore:
+    """Get or create the global header store."""
+    global _header_store
+
+    if _header_store is None:
+        _header_store = HeaderStore()
+    return _header_store
@@ -0,0 +1,179 @@
+"""
+Time-range partitioning of request_logs on PostgreSQL.
+
+With LOG_PARTITIONING=daily|hourly, request_logs is partitioned by timestamp.
+A maintenance task creates partitions ahead of time and drops whole partitions
+once they are older than the retention window, instead of deleting rows.
+SQLite deployments keep the single table.
+"""
+import os
+import re
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# "" (off) | daily | hourly
+LOG_PARTITIONING = os.getenv("LOG_PARTITIONING", "").lower()
+
+# Number of future partitions kept ready
+LOG_PARTITION_PREMAKE = int(os.getenv("LOG_PARTITION_PREMAKE", "3"))
+
+# Partitions entirely older than this are dropped (0 = keep forever)
+LOG_PARTITION_RETENTION_DAYS = int(os.getenv("LOG_PARTITION_RETENTION_DAYS", "30"))
+
+# How often partitions are created/dropped
+LOG_PARTITION_MAINTENANCE_SECONDS = int(os.getenv("LOG_PARTITION_MAINTENANCE_SECONDS", "600"))
+
+GRANULARITIES = {
+    "daily": (timedelta(days=1), "%Y%m%d"),
+    "hourly": (timedelta(hours=1), "%Y%m%d%H"),
+}
+
+# Upper bound of a partition as reported by pg_get_expr(relpartbound)
+UPPER_BOUND_PATTERN = re.compile(r"TO \('([^']+)'\)")
+
+
+class PartitionManager:
+    """Creates and drops request_logs time partitions."""
+
+    def __init__(
+        self,
+        engine,
+        granularity: str = LOG_PARTITIONING,
+        premake: int = LOG_PARTITION_PREMAKE,
+        retention_days: int = LOG_PARTITION_RETENTION_DAYS
+    ):
+        if granularity and granularity not in GRANULARITIES:
+            logger.warning(f"Unknown LOG_PARTITIONING '{granularity}', partitioning disabled")
+            granularity = ""
+        self.engine = engine
+        self.granularity = granularity
+        self.premake = premake
+        self.retention_days = retention_days
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.granularity) and self.engine.dialect.name == "postgresql"
+
+    @property
+    def period(self) -> timedelta:
+        return GRANULARITIES[self.granularity][0]
+
+    def period_start(self, ts: Optional[datetime]) -> datetime:
+        """Start of the partition period containing ts (UTC now if None)."""
+        ts = ts or datetime.utcnow()
+        if self.granularity == "hourly":
+            return ts.replace(minute=0, second=0, microsecond=0)
+        return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def partition_name(self, start: datetime) -> str:
+        return f"request_logs_p{start.strftime(GRANULARITIES[self.granularity][1])}"
+
+    # ==================== Maintenance ====================
+
+    def create_partitions(self, conn, start: Optional[datetime] = None) -> List[str]:
+        """
+        Create missing partitions from start (default: current period) up to
+        LOG_PARTITION_PREMAKE periods ahead.
+
+        Args:
+            conn: Connection inside a transaction
+            start: First period to create
+
+        Returns:
+            Names of the partitions that were created
+        """
+        current = self.period_start(None)
+        period_start = max(self.period_start(start), current) if start else current
+        last = current + self.period * self.premake
+
+        existing = {name for name, _ in self.list_partitions(conn)}
+        created = []
+        while period_start <= last:
+            name = self.partition_name(period_start)
+            if name not in existing:
+                end = period_start + self.period
+                try:
+                    # Savepoint: an overlapping range must not abort the whole run
+                    with conn.begin_nested():
+                        conn.execute(text(
+                            f"CREATE TABLE {name} PARTITION OF request_logs "
+                            f"FOR VALUES FROM ('{period_start.isoformat(sep=' ')}') TO ('{end.isoformat(sep=' ')}')"
+                        ))
+                    created.append(name)
+                except Exception as e:
+                    logger.error(f"Failed to create partition {name}: {e}")
+            period_start += self.period
+        return created
+
+    def list_partitions(self, conn) -> List[Tuple[str, Optional[datetime]]]:
+        """List partitions of request_logs with their upper bound (None for the default partition)."""
+        rows = conn.execute(text("""
+            SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'request_logs'::regclass
+        """)).all()
+        partitions = []
+        for name, bound in rows:
+            match = UPPER_BOUND_PATTERN.search(bound or "")
+            partitions.append((name, datetime.fromisoformat(match.group(1)) if match else None))
+        return partitions
+
+    def drop_expired(self, conn) -> List[str]:
+        """
+        Drop partitions whose whole range is older than the retention window.
+
+        Args:
+            conn: Connection inside a transaction
+
+        Returns:
+            Names of the dropped partitions
+        """
+        if not self.retention_days:
+            return []
+        cutoff = datetime.utcnow() - timedelta(days=self.retention_days)
+        dropped = []
+        for name, upper in self.list_partitions(conn):
+            if upper is not None and upper <= cutoff:
+                conn.execute(text(f"DROP TABLE {name}"))
+                dropped.append(name)
+        return dropped
+
+    def run_maintenance(self):
+        """Convert the table if needed, create upcoming partitions and drop expired ones."""
+        from backend.migrations import migrate_partition_request_logs, request_logs_partitioned
+
+        if not self.enabled:
+            return
+        if not request_logs_partitioned(self.engine):
+            migrate_partition_request_logs(self.engine)
+            if not request_logs_partitioned(self.engine):
+                return
+
+        with self.engine.begin() as conn:
+            created = self.create_partitions(conn)
+            dropped = self.drop_expired(conn)
+        if created:
+            logger.info(f"Created request_logs partitions: {', '.join(created)}")
+        if dropped:
+            logger.info(f"Dropped expired request_logs partitions: {', '.join(dropped)}")
+
+
+# Global manager instance
+_partition_manager: Optional[PartitionManager] = None
+
+
+def get_partition_manager(engine=None) -> PartitionManager:
+    """Get or create the global partition manager."""
+    global _partition_manager
+
+    if _partition_manager is None:
+        if engine is None:
+            from backend.database import engine
+        _partition_manager = PartitionManager(engine)
+    return _partition_manager
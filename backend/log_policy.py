@@ -0,0 +1,59 @@
+"""
+Per-entity request logging policies.
+Decides how much of each mock request is stored and broadcast.
+"""
+import random
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# off      - nothing is logged
+# metadata - method, path, status and timing only
+# full     - headers, query params and bodies as well
+# sampled  - full logs for a fraction (sample rate) of requests, nothing for the rest
+LOG_LEVELS = ("off", "metadata", "full", "sampled")
+
+# Responses with a status code at or above this use the error policy
+ERROR_STATUS_THRESHOLD = 400
+
+
+class LogPolicy:
+    """Logging policy of an entity, with a separate level for error responses."""
+
+    __slots__ = ("level", "error_level", "sample_rate")
+
+    def __init__(self, level: str = "full", error_level: str = "full", sample_rate: float = 1.0):
+        self.level = level if level in LOG_LEVELS else "full"
+        self.error_level = error_level if error_level in LOG_LEVELS else "full"
+        self.sample_rate = min(max(sample_rate if sample_rate is not None else 1.0, 0.0), 1.0)
+
+    @classmethod
+    def from_entity(cls, entity) -> "LogPolicy":
+        """Build the policy from an Entity model instance."""
+        return cls(
+            level=entity.log_level or "full",
+            error_level=entity.error_log_level or "full",
+            sample_rate=entity.log_sample_rate,
+        )
+
+    def detail_for(self, response_code: int) -> Optional[str]:
+        """
+        Decide what to log for a response.
+
+        Args:
+            response_code: HTTP status code returned to the client
+
+        Returns:
+            "full", "metadata", or None if the request should not be logged
+        """
+        level = self.error_level if response_code >= ERROR_STATUS_THRESHOLD else self.level
+        if level == "sampled":
+            return "full" if random.random() < self.sample_rate else None
+        if level == "off":
+            return None
+        return level
+
+
+# Policy used for entities without explicit settings
+DEFAULT_LOG_POLICY = LogPolicy()
@@ -0,0 +1,156 @@
+"""
+Request log queries: server-side filters and keyset pagination.
+
+Logs are read newest first, ordered by (timestamp, id). A page's cursor is the
+(timestamp, id) of its last row, so fetching the next page is an index range
+scan on (entity_id, timestamp, id) or (mock_endpoint_id, timestamp, id) whose
+cost does not depend on how deep the page is.
+"""
+import json
+import base64
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query, defer
+from sqlalchemy.orm.attributes import set_committed_value
+
+from backend.models import RequestLog
+from backend.log_codec import get_log_codec
+from backend.log_headers import get_header_store
+
+MAX_PAGE_SIZE = 1000
+
+# Columns skipped when a listing is requested without bodies
+PAYLOAD_COLUMNS = (
+    "request_headers", "request_body", "query_params", "response_body", "compressed_payload",
+)
+
+
+def encode_cursor(log: RequestLog) -> str:
+    """Opaque cursor pointing just after the given log."""
+    raw = json.dumps([log.timestamp.isoformat(), log.id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Decode a cursor produced by encode_cursor().
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, log_id = json.loads(raw)
+        return datetime.fromisoformat(timestamp), int(log_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def filter_logs(
+    query: Query,
+    method: Optional[str] = None,
+    status_min: Optional[int] = None,
+    status_max: Optional[int] = None,
+    path_prefix: Optional[str] = None,
+    endpoint_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+) -> Query:
+    """
+    Apply server-side filters to a RequestLog query.
+
+    Args:
+        query: Query over RequestLog
+        method: HTTP method
+        status_min: Lowest response code (inclusive)
+        status_max: Highest response code (inclusive)
+        path_prefix: Entity-relative path prefix
+        endpoint_id: Mock endpoint id
+        since: Earliest timestamp (inclusive, UTC)
+        until: Latest timestamp (exclusive, UTC)
+    """
+    if method:
+        query = query.filter(RequestLog.method == method.upper())
+    if status_min is not None:
+        query = query.filter(RequestLog.response_code >= status_min)
+    if status_max is not None:
+        query = query.filter(RequestLog.response_code <= status_max)
+    if path_prefix:
+        query = query.filter(RequestLog.path.startswith(path_prefix, autoescape=True))
+    if endpoint_id is not None:
+        query = query.filter(RequestLog.mock_endpoint_id == endpoint_id)
+    if since is not None:
+        query = query.filter(RequestLog.timestamp >= to_naive_utc(since))
+    if until is not None:
+        query = query.filter(RequestLog.timestamp < to_naive_utc(until))
+    return query
+
+
+def page_logs(
+    db,
+    query: Query,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    include_bodies: bool = True,
+    id_column=None
+) -> Tuple[List[RequestLog], Optional[str]]:
+    """
+    Fetch one page of logs, newest first.
+
+    Args:
+        db: SQLAlchemy session
+        query: Filtered query over RequestLog
+        limit: Page size (capped at MAX_PAGE_SIZE)
+        cursor: Cursor returned with the previous page
+        include_bodies: Load headers, query params and bodies (otherwise they are None)
+        id_column: Order and page by this log id column alone instead of (timestamp, id),
+            e.g. the rowid of a search index
+
+    Returns:
+        Tuple of (logs, cursor of the next page or None on the last page)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    if cursor:
+        timestamp, log_id = decode_cursor(cursor)
+        if id_column is not None:
+            query = query.filter(id_column < log_id)
+        else:
+            query = query.filter(tuple_(RequestLog.timestamp, RequestLog.id) < tuple_(timestamp, log_id))
+    if not include_bodies:
+        query = query.options(*(defer(getattr(RequestLog, column)) for column in PAYLOAD_COLUMNS))
+
+    # One extra row tells whether there is a next page
+    if id_column is not None:
+        query = query.order_by(id_column.desc())
+    else:
+        query = query.order_by(RequestLog.timestamp.desc(), RequestLog.id.desc())
+    logs = query.limit(limit + 1).all()
+    next_cursor = encode_cursor(logs[limit - 1]) if len(logs) > limit else None
+    logs = logs[:limit]
+
+    if include_bodies:
+        load_log_payloads(db, logs)
+    else:
+        # Mark skipped columns as loaded so serialization never triggers lazy loads
+        for log in logs:
+            for column in PAYLOAD_COLUMNS:
+                set_committed_value(log, column, None)
+    return logs, next_cursor
+
+
+def load_log_payloads(db, logs: List[RequestLog]) -> List[RequestLog]:
+    """Restore compressed payloads and deduplicated headers of request logs for reading."""
+    get_log_codec().decode_logs(db, logs)
+    return get_header_store().resolve_logs(db, logs)
+
+
+def to_naive_utc(value: datetime) -> datetime:
+    """Convert an aware datetime to the naive UTC form stored in request_logs."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
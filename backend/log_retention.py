@@ -0,0 +1,553 @@
+"""
+Request log retention engine.
+
+Deletes request logs in small keyed chunks with a pause between them, so purges
+never hold long locks on request_logs or stall the mock data plane. Used for
+per-entity retention policies (max age, max rows) and for clearing an entity's
+logs as a background job with progress reporting. Clear jobs are stored in
+log_jobs, so their progress can be polled through any replica.
+
+Every replica runs the retention task, but a pass only runs on the replica that
+takes the retention lock: a session-level advisory lock on PostgreSQL, a lease
+row in maintenance_leases on other databases.
+"""
+import os
+import uuid
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import or_, text
+from sqlalchemy.exc import IntegrityError
+
+from backend.config_bus import INSTANCE_ID
+
+logger = logging.getLogger(__name__)
+
+# How often retention policies are enforced
+LOG_RETENTION_INTERVAL_SECONDS = int(os.getenv("LOG_RETENTION_INTERVAL_SECONDS", "300"))
+
+# Rows deleted per statement
+LOG_RETENTION_CHUNK_SIZE = int(os.getenv("LOG_RETENTION_CHUNK_SIZE", "1000"))
+
+# Pause between chunks, giving live traffic room on the table
+LOG_RETENTION_PAUSE_MS = int(os.getenv("LOG_RETENTION_PAUSE_MS", "50"))
+
+# Age limit for entities without their own log_retention_days (unset = keep forever)
+LOG_RETENTION_DEFAULT_DAYS = int(os.getenv("LOG_RETENTION_DEFAULT_DAYS", "0")) or None
+
+# Lease length of a retention pass on databases without advisory locks (renewed per entity)
+LOG_RETENTION_LEASE_SECONDS = int(os.getenv("LOG_RETENTION_LEASE_SECONDS", "600"))
+
+# Lease name, and PostgreSQL advisory lock key, of the retention pass
+RETENTION_LOCK_NAME = "log_retention"
+RETENTION_LOCK_KEY = 0x6D6F636B6C6162  # "mocklab"
+
+# Clear jobs are removed from log_jobs this long after they started
+LOG_JOB_MAX_AGE = timedelta(days=1)
+
+
+class LogDeletionJob:
+    """Progress of a chunked log deletion."""
+
+    def __init__(self, entity_id: int, kind: str, user_id: Optional[int] = None, persisted: bool = False):
+        self.id = uuid.uuid4().hex
+        self.entity_id = entity_id
+        self.kind = kind  # clear | age | max_rows
+        self.user_id = user_id  # User who started the job (None for retention passes)
+        # Progress is written to log_jobs (clear jobs only)
+        self.persisted = persisted
+        self.status = "pending"  # pending | running | completed | failed
+        self.total: Optional[int] = None
+        self.deleted = 0
+        self.error: Optional[str] = None
+        self.created_at = datetime.utcnow()
+        self.finished_at: Optional[datetime] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    @classmethod
+    def from_row(cls, row) -> "LogDeletionJob":
+        job = cls(row.entity_id, row.kind, row.user_id, persisted=True)
+        job.id = row.id
+        job.status = row.status
+        job.total = row.total
+        job.deleted = row.deleted
+        job.error = row.error
+        job.created_at = row.created_at
+        job.finished_at = row.finished_at
+        return job
+
+    def row_values(self) -> Dict[str, Any]:
+        """Column values of the job's log_jobs row."""
+        return {
+            "id": self.id,
+            "entity_id": self.entity_id,
+            "user_id": self.user_id,
+            "kind": self.kind,
+            "status": self.status,
+            "total": self.total,
+            "deleted": self.deleted,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "entity_id": self.entity_id,
+            "kind": self.kind,
+            "status": self.status,
+            "total": self.total,
+            "deleted": self.deleted,
+            "progress": (self.deleted / self.total) if self.total else (1.0 if self.done else 0.0),
+            "error": self.error,
+            "created_at": self.created_at.isoformat() + "Z",
+            "finished_at": self.finished_at.isoformat() + "Z" if self.finished_at else None,
+        }
+
+
+class LogRetentionEngine:
+    """Background enforcement of log retention plus on-demand clear jobs."""
+
+    def __init__(
+        self,
+        db_session_factory,
+        interval_seconds: int = LOG_RETENTION_INTERVAL_SECONDS,
+        chunk_size: int = LOG_RETENTION_CHUNK_SIZE,
+        pause_ms: int = LOG_RETENTION_PAUSE_MS
+    ):
+        self.db_session_factory = db_session_factory
+        self.interval = interval_seconds
+        self.chunk_size = chunk_size
+        self.pause = pause_ms / 1000.0
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._job_tasks = set()
+
+    # ==================== Lifecycle ====================
+
+    def start(self):
+        """Start periodic retention enforcement. Must be called from the event loop."""
+        self._loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Started log retention task (every {self.interval}s, chunks of {self.chunk_size})")
+
+    async def stop(self):
+        """Stop the periodic task and any running clear jobs."""
+        tasks = list(self._job_tasks)
+        if self._task is not None:
+            tasks.append(self._task)
+            self._task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.enforce_all()
+            except Exception as e:
+                logger.error(f"Log retention pass failed: {e}")
+
+    # ==================== Jobs ====================
+
+    def submit_clear(self, entity_id: int, user_id: Optional[int] = None) -> LogDeletionJob:
+        """
+        Start deleting all current logs of an entity in the background.
+
+        Logs written after the job started are kept. Stores the job, so call it from a
+        worker thread (e.g. a sync endpoint), not from the event loop; the job itself
+        runs on the loop the engine was started on.
+
+        Args:
+            entity_id: Entity whose logs are cleared
+            user_id: User starting the job (allowed to read it after the entity is deleted)
+
+        Returns:
+            The job, whose progress can be polled with get_job() on any replica
+        """
+        job = LogDeletionJob(entity_id, "clear", user_id, persisted=True)
+        self._save_job(job)
+        if self._loop is None:
+            raise RuntimeError("Log retention engine is not started")
+        self._loop.call_soon_threadsafe(self._start_job, job)
+        return job
+
+    def _start_job(self, job: LogDeletionJob):
+        task = asyncio.create_task(self._run_job(job))
+        self._job_tasks.add(task)
+        task.add_done_callback(self._job_tasks.discard)
+
+    def get_job(self, job_id: str) -> Optional[LogDeletionJob]:
+        """Load a clear job started on any replica."""
+        from backend.models import LogJob
+
+        db = self.db_session_factory()
+        try:
+            row = db.get(LogJob, job_id)
+            return LogDeletionJob.from_row(row) if row is not None else None
+        finally:
+            db.close()
+
+    async def _run_job(self, job: LogDeletionJob, before: Optional[datetime] = None, keep_rows: Optional[int] = None):
+        """Resolve the id bound of a job, then delete up to it chunk by chunk."""
+        loop = asyncio.get_running_loop()
+        job.status = "running"
+        try:
+            max_id, total = await loop.run_in_executor(
+                None, self._deletion_bound, job.entity_id, before, keep_rows
+            )
+            job.total = total
+            if job.persisted:
+                await loop.run_in_executor(None, self._save_job, job)
+            while max_id is not None:
+                deleted = await loop.run_in_executor(
+                    None, self._delete_chunk, job.entity_id, max_id, before, job.id if job.persisted else None
+                )
+                job.deleted += deleted
+                if deleted < self.chunk_size:
+                    break
+                await asyncio.sleep(self.pause)
+            job.status = "completed"
+        except asyncio.CancelledError:
+            job.status = "failed"
+            job.error = "Cancelled"
+            raise
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            logger.error(f"Log deletion job {job.id} for entity {job.entity_id} failed: {e}")
+        finally:
+            job.finished_at = datetime.utcnow()
+            if job.persisted:
+                try:
+                    await loop.run_in_executor(None, self._save_job, job)
+                except Exception as e:
+                    logger.error(f"Failed to store the state of log deletion job {job.id}: {e}")
+        if job.deleted:
+            logger.info(f"Deleted {job.deleted} request logs of entity {job.entity_id} ({job.kind})")
+
+    # ==================== Retention ====================
+
+    async def enforce_all(self) -> bool:
+        """
+        Apply the retention policy of every entity, one entity and chunk at a time.
+
+        Returns:
+            False if the pass was skipped because another replica holds the retention lock
+        """
+        from backend.models import Entity
+
+        loop = asyncio.get_running_loop()
+        lock = await loop.run_in_executor(None, self._acquire_lock)
+        if lock is None:
+            logger.debug("Log retention pass skipped: another instance holds the retention lock")
+            return False
+
+        try:
+            db = self.db_session_factory()
+            try:
+                policies = db.query(
+                    Entity.id, Entity.log_retention_days, Entity.log_retention_max_rows
+                ).all()
+            finally:
+                db.close()
+
+            for entity_id, days, max_rows in policies:
+                days = days or LOG_RETENTION_DEFAULT_DAYS
+                # Retention passes are not listed as jobs; only their totals are logged
+                if days:
+                    await self._run_job(
+                        LogDeletionJob(entity_id, "age"), before=datetime.utcnow() - timedelta(days=days)
+                    )
+                if max_rows:
+                    await self._run_job(LogDeletionJob(entity_id, "max_rows"), keep_rows=max_rows)
+                if not await loop.run_in_executor(None, self._renew_lock, lock):
+                    logger.warning("Log retention pass stopped: the retention lease was lost")
+                    return True
+
+            await loop.run_in_executor(None, self._collect_header_sets)
+            await loop.run_in_executor(None, self._prune_jobs)
+            await loop.run_in_executor(None, self._prune_rollups)
+        finally:
+            await loop.run_in_executor(None, self._release_lock, lock)
+        return True
+
+    # ==================== Coordination (runs in executor) ====================
+
+    def _acquire_lock(self):
+        """
+        Take the retention lock without waiting.
+
+        Returns:
+            The lock to pass to _renew_lock() / _release_lock(), or None if another replica holds it
+        """
+        from backend.models import MaintenanceLease
+
+        db = self.db_session_factory()
+        try:
+            engine = db.get_bind()
+            if engine.dialect.name == "postgresql":
+                # Session-level lock: held by this connection until unlocked or disconnected
+                conn = engine.connect()
+                try:
+                    locked = conn.execute(
+                        text("SELECT pg_try_advisory_lock(:key)"), {"key": RETENTION_LOCK_KEY}
+                    ).scalar()
+                    conn.commit()
+                except Exception:
+                    conn.close()
+                    raise
+                if not locked:
+                    conn.close()
+                    return None
+                return conn
+
+            now = datetime.utcnow()
+            expires_at = now + timedelta(seconds=LOG_RETENTION_LEASE_SECONDS)
+            taken = db.query(MaintenanceLease).filter(
+                MaintenanceLease.name == RETENTION_LOCK_NAME,
+                or_(MaintenanceLease.expires_at < now, MaintenanceLease.holder == INSTANCE_ID)
+            ).update({"holder": INSTANCE_ID, "expires_at": expires_at}, synchronize_session=False)
+            if not taken:
+                if db.get(MaintenanceLease, RETENTION_LOCK_NAME) is not None:
+                    db.rollback()
+                    return None
+                db.add(MaintenanceLease(name=RETENTION_LOCK_NAME, holder=INSTANCE_ID, expires_at=expires_at))
+            db.commit()
+            return RETENTION_LOCK_NAME
+        except IntegrityError:
+            # Another replica created the lease first
+            db.rollback()
+            return None
+        finally:
+            db.close()
+
+    def _renew_lock(self, lock) -> bool:
+        """Extend a lease. Returns False if it expired and was taken by another replica."""
+        from backend.models import MaintenanceLease
+
+        if lock != RETENTION_LOCK_NAME:
+            return True
+        db = self.db_session_factory()
+        try:
+            renewed = db.query(MaintenanceLease).filter(
+                MaintenanceLease.name == RETENTION_LOCK_NAME, MaintenanceLease.holder == INSTANCE_ID
+            ).update(
+                {"expires_at": datetime.utcnow() + timedelta(seconds=LOG_RETENTION_LEASE_SECONDS)},
+                synchronize_session=False
+            )
+            db.commit()
+            return bool(renewed)
+        finally:
+            db.close()
+
+    def _release_lock(self, lock):
+        from backend.models import MaintenanceLease
+
+        try:
+            if lock == RETENTION_LOCK_NAME:
+                db = self.db_session_factory()
+                try:
+                    db.query(MaintenanceLease).filter(
+                        MaintenanceLease.name == RETENTION_LOCK_NAME, MaintenanceLease.holder == INSTANCE_ID
+                    ).delete(synchronize_session=False)
+                    db.commit()
+                finally:
+                    db.close()
+            else:
+                try:
+                    lock.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": RETENTION_LOCK_KEY})
+                    lock.commit()
+                except Exception:
+                    # Never return a connection that may still hold the lock to the pool
+                    lock.invalidate()
+                    raise
+                finally:
+                    lock.close()
+        except Exception as e:
+            # An expired lease or a closed connection frees the lock anyway
+            logger.error(f"Failed to release the log retention lock: {e}")
+
+    # ==================== Database Work (runs in executor) ====================
+
+    def _deletion_bound(self, entity_id: int, before: Optional[datetime], keep_rows: Optional[int]):
+        """
+        Find the highest log id to delete and how many rows qualify.
+
+        Returns:
+            Tuple of (max_id or None if nothing to delete, number of rows to delete)
+        """
+        from sqlalchemy import func
+        from backend.models import RequestLog
+
+        db = self.db_session_factory()
+        try:
+            query = db.query(RequestLog.id).filter(RequestLog.entity_id == entity_id)
+            if keep_rows is not None:
+                # Newest keep_rows logs stay; everything at or below the next id goes
+                max_id = query.order_by(RequestLog.id.desc()).offset(keep_rows).limit(1).scalar()
+            elif before is not None:
+                max_id = query.filter(RequestLog.timestamp < before).order_by(RequestLog.id.desc()).limit(1).scalar()
+            else:
+                max_id = query.order_by(RequestLog.id.desc()).limit(1).scalar()
+            if max_id is None:
+                return None, 0
+
+            count_query = db.query(func.count(RequestLog.id)).filter(
+                RequestLog.entity_id == entity_id, RequestLog.id <= max_id
+            )
+            if before is not None:
+                count_query = count_query.filter(RequestLog.timestamp < before)
+            return max_id, count_query.scalar()
+        finally:
+            db.close()
+
+    def _delete_chunk(self, entity_id: int, max_id: int, before: Optional[datetime], job_id: Optional[str] = None) -> int:
+        """
+        Delete the oldest chunk of qualifying logs. Returns number of rows deleted.
+
+        If job_id is given, the job's progress in log_jobs is updated in the same transaction.
+        """
+        from backend.models import LogJob, RequestLog
+
+        db = self.db_session_factory()
+        try:
+            query = db.query(RequestLog.id).filter(
+                RequestLog.entity_id == entity_id, RequestLog.id <= max_id
+            )
+            if before is not None:
+                query = query.filter(RequestLog.timestamp < before)
+            ids = [log_id for (log_id,) in query.order_by(RequestLog.id).limit(self.chunk_size)]
+            if not ids:
+                return 0
+            delete_logs(db, ids)
+            if job_id is not None:
+                db.query(LogJob).filter(LogJob.id == job_id).update(
+                    {"deleted": LogJob.deleted + len(ids)}, synchronize_session=False
+                )
+            db.commit()
+            return len(ids)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _save_job(self, job: LogDeletionJob):
+        """Insert or update the log_jobs row of a job."""
+        from backend.models import LogJob
+
+        db = self.db_session_factory()
+        try:
+            db.merge(LogJob(**job.row_values()))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _prune_jobs(self) -> int:
+        """Delete clear jobs started more than LOG_JOB_MAX_AGE ago. Returns number of jobs deleted."""
+        from backend.models import LogJob
+
+        db = self.db_session_factory()
+        try:
+            count = db.query(LogJob).filter(
+                LogJob.created_at < datetime.utcnow() - LOG_JOB_MAX_AGE
+            ).delete(synchronize_session=False)
+            db.commit()
+            return count
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to prune log deletion jobs: {e}")
+            return 0
+        finally:
+            db.close()
+
+    def _prune_rollups(self):
+        """Prune traffic rollups and endpoint histograms (old rows, deleted entities)."""
+        from backend.traffic_rollups import TRAFFIC_ROLLUP_RETENTION_DAYS, get_traffic_rollups
+        from backend.histograms import get_endpoint_histograms
+
+        before = None
+        if TRAFFIC_ROLLUP_RETENTION_DAYS:
+            before = datetime.utcnow() - timedelta(days=TRAFFIC_ROLLUP_RETENTION_DAYS)
+        for rollup in (get_traffic_rollups(self.db_session_factory), get_endpoint_histograms(self.db_session_factory)):
+            try:
+                count = rollup.prune(before)
+            except Exception as e:
+                logger.error(f"Failed to prune {rollup.name}: {e}")
+                continue
+            if count:
+                logger.info(f"Pruned {count} rows of {rollup.name}")
+
+    def _collect_header_sets(self) -> int:
+        """
+        Delete header sets no log references any more. Returns number of sets deleted.
+
+        Only sets not inserted for HEADER_SET_GC_AGE qualify: writers refresh created_at
+        whenever a set is not in their LRU, and LRU entries expire well before that age.
+        """
+        from backend.models import RequestLog, RequestHeaderSet
+        from backend.log_headers import HEADER_SET_GC_AGE
+
+        db = self.db_session_factory()
+        try:
+            referenced = db.query(RequestLog.id).filter(
+                RequestLog.request_headers_hash == RequestHeaderSet.hash
+            ).exists()
+            count = db.query(RequestHeaderSet).filter(
+                RequestHeaderSet.created_at < datetime.utcnow() - HEADER_SET_GC_AGE,
+                ~referenced
+            ).delete(synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to collect unreferenced header sets: {e}")
+            return 0
+        finally:
+            db.close()
+
+        if count:
+            logger.info(f"Deleted {count} unreferenced request header sets")
+        return count
+
+
+def delete_logs(db, ids: List[int]):
+    """
+    Delete request logs by id (caller commits).
+
+    Args:
+        db: SQLAlchemy session
+        ids: RequestLog ids
+    """
+    from backend.models import RequestLog
+    from backend.log_search import get_search_index
+
+    db.query(RequestLog).filter(RequestLog.id.in_(ids)).delete(synchronize_session=False)
+    get_search_index().delete_documents(db, ids)
+
+
+# Global engine instance
+_retention_engine: Optional[LogRetentionEngine] = None
+
+
+def get_retention_engine(db_session_factory=None) -> LogRetentionEngine:
+    """Get or create the global log retention engine."""
+    global _retention_engine
+
+    if _retention_engine is None:
+        if db_session_factory is None:
+            from backend.database import SessionLocal
+            db_session_factory = SessionLocal
+        _retention_engine = LogRetentionEngine(db_session_factory)
+    return _retention_engine
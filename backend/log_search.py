@@ -0,0 +1,182 @@
+"""
+Full-text search over request logs.
+
+The log writer indexes each log's path, request headers and bodies when it
+inserts the batch, in the same transaction:
+
+- SQLite: an FTS5 table request_logs_fts whose rowid is the log id
+- PostgreSQL: the request_logs.search_vector tsvector column with a GIN index
+
+Search results are served newest first by log id, so a page of matches is read
+straight from the index without sorting every match.
+"""
+import os
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, column, func, literal_column, table, text
+from sqlalchemy.orm import Query
+
+logger = logging.getLogger(__name__)
+
+# Index logs for full-text search
+LOG_SEARCH = os.getenv("LOG_SEARCH", "true").lower() in ("1", "true", "yes")
+
+# Characters of each field that are indexed (longer bodies are truncated)
+LOG_SEARCH_MAX_FIELD_CHARS = int(os.getenv("LOG_SEARCH_MAX_FIELD_CHARS", "65536"))
+
+# Text search configuration used on PostgreSQL (no stemming: ids and tokens match as typed)
+TS_CONFIG = "simple"
+
+SEARCH_FIELDS = ("path", "request_headers", "request_body", "response_body")
+
+FTS_TABLE = "request_logs_fts"
+fts_table = table(FTS_TABLE, column("rowid"))
+
+
+class LogSearchIndex:
+    """Maintains and queries the request log full-text index."""
+
+    def __init__(self, enabled: bool = LOG_SEARCH, max_field_chars: int = LOG_SEARCH_MAX_FIELD_CHARS):
+        self.enabled = enabled
+        self.max_field_chars = max_field_chars
+        self._fts_available: Optional[bool] = None
+
+    @staticmethod
+    def dialect(db) -> str:
+        return db.get_bind().dialect.name
+
+    def fts_available(self, db) -> bool:
+        """Whether the FTS5 table exists (checked once; SQLite may be built without FTS5)."""
+        if self._fts_available is None:
+            self._fts_available = db.execute(
+                text("SELECT 1 FROM sqlite_master WHERE name = :name"), {"name": FTS_TABLE}
+            ).first() is not None
+            if not self._fts_available:
+                logger.warning(f"{FTS_TABLE} table is missing; request logs are not indexed for search")
+        return self._fts_available
+
+    def _fields(self, record: Dict[str, Any]) -> Dict[str, str]:
+        return {field: (record.get(field) or "")[:self.max_field_chars] for field in SEARCH_FIELDS}
+
+    def document(self, record: Dict[str, Any]) -> str:
+        """Text indexed for a log record (PostgreSQL); path segments become separate words."""
+        fields = self._fields(record)
+        fields["path"] = fields["path"].replace("/", " ")
+        return "\n".join(fields.values())
+
+    # ==================== Write Path ====================
+
+    def with_vectors(self, db, stmt, rows: List[Dict[str, Any]], batch: List[Dict[str, Any]]):
+        """
+        Make a bulk RequestLog insert also fill search_vector (PostgreSQL only).
+
+        Args:
+            db: SQLAlchemy session of the batch being written
+            stmt: insert(RequestLog) statement
+            rows: Column values passed to the insert (modified in place)
+            batch: Plain log records, in the same order as rows
+
+        Returns:
+            The statement to execute with rows
+        """
+        if not self.enabled or self.dialect(db) != "postgresql":
+            return stmt
+        for row, record in zip(rows, batch):
+            row["search_document"] = self.document(record)
+        return stmt.values(search_vector=func.to_tsvector(TS_CONFIG, bindparam("search_document")))
+
+    def index_batch(self, db, ids: List[int], batch: List[Dict[str, Any]]):
+        """
+        Add a written batch to the FTS5 table (SQLite only; caller commits).
+
+        Args:
+            db: SQLAlchemy session of the batch being written
+            ids: RequestLog ids, in the same order as batch
+            batch: Plain log records
+        """
+        if not self.enabled or self.dialect(db) != "sqlite" or not self.fts_available(db):
+            return
+        db.execute(
+            text(
+                f"INSERT INTO {FTS_TABLE} (rowid, path, request_headers, request_body, response_body) "
+                f"VALUES (:rowid, :path, :request_headers, :request_body, :response_body)"
+            ),
+            [{"rowid": log_id, **self._fields(record)} for log_id, record in zip(ids, batch)]
+        )
+
+    def delete_documents(self, db, ids: List[int]):
+        """Remove deleted logs from the FTS5 table (SQLite only; caller commits)."""
+        if self.dialect(db) != "sqlite" or not ids or not self.fts_available(db):
+            return
+        db.execute(fts_table.delete().where(fts_table.c.rowid.in_(ids)))
+
+    def delete_entity_documents(self, db, entity_id: int):
+        """Remove all logs of an entity from the FTS5 table (SQLite only; caller commits)."""
+        self._delete_documents_where(db, "entity_id = :value", entity_id)
+
+    def delete_endpoint_documents(self, db, endpoint_id: int):
+        """Remove all logs of a mock endpoint from the FTS5 table (SQLite only; caller commits)."""
+        self._delete_documents_where(db, "mock_endpoint_id = :value", endpoint_id)
+
+    def _delete_documents_where(self, db, condition: str, value: int):
+        if self.dialect(db) != "sqlite" or not self.fts_available(db):
+            return
+        db.execute(
+            text(f"DELETE FROM {FTS_TABLE} WHERE rowid IN (SELECT id FROM request_logs WHERE {condition})"),
+            {"value": value}
+        )
+
+    # ==================== Read Path ====================
+
+    def search(self, db, query: Query, terms: str) -> Tuple[Query, Any]:
+        """
+        Restrict a RequestLog query to logs matching every search term.
+
+        Args:
+            db: SQLAlchemy session
+            query: Query over RequestLog
+            terms: Whitespace-separated search terms
+
+        Returns:
+            Tuple of (filtered query, id column to order and page the results by)
+
+        Raises:
+            ValueError: If search is disabled or no search terms were given
+            RuntimeError: If the database has no full-text index
+        """
+        from backend.models import RequestLog
+
+        if not self.enabled:
+            raise ValueError("Log search is disabled")
+        words = terms.split()
+        if not words:
+            raise ValueError("Search query is empty")
+
+        dialect = self.dialect(db)
+        if dialect == "sqlite":
+            if not self.fts_available(db):
+                raise RuntimeError("Log search index is not available")
+            # Each word is quoted, so FTS5 operators in the input are matched literally
+            match = " ".join('"' + word.replace('"', '""') + '"' for word in words)
+            query = query.join(fts_table, fts_table.c.rowid == RequestLog.id).filter(
+                literal_column(FTS_TABLE).op("MATCH")(match)
+            )
+            return query, fts_table.c.rowid
+        if dialect == "postgresql":
+            ts_query = func.websearch_to_tsquery(TS_CONFIG, " ".join(words).replace("/", " "))
+            return query.filter(RequestLog.search_vector.op("@@")(ts_query)), RequestLog.id
+        raise RuntimeError(f"Log search is not supported on {dialect}")
+
+
+# Global search index instance
+_search_index: Optional[LogSearchIndex] = None
+
+
+def get_search_index() -> LogSearchIndex:
+    """Get or create the global log search index."""
+    global _search_index
+
+    if _search_index is None:
+        _search_index = LogSearchIndex()
+    return _search_index
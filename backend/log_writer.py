@@ -0,0 +1,357 @@
+"""
+Asynchronous, batched request log ingestion.
+Mock handlers enqueue log records; a background writer flushes them with bulk inserts.
+"""
+import os
+import time
+import asyncio
+import random
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DBAPIError, OperationalError
+
+from backend.log_codec import get_log_codec
+from backend.log_headers import get_header_store
+from backend.log_search import get_search_index
+from backend.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of records waiting to be written
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# Flush when this many records are pending...
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "500"))
+
+# ...or when the oldest pending record is this old
+LOG_FLUSH_INTERVAL_MS = int(os.getenv("LOG_FLUSH_INTERVAL_MS", "100"))
+
+# What to do when the queue is full: drop | block | sample
+LOG_OVERFLOW_POLICY = os.getenv("LOG_OVERFLOW_POLICY", "drop").lower()
+
+# For the sample policy: fraction of records admitted once the queue is 80% full
+LOG_OVERFLOW_SAMPLE_RATE = float(os.getenv("LOG_OVERFLOW_SAMPLE_RATE", "0.1"))
+
+# Retries of a batch after a transient database error (lost connection, locked database)
+LOG_WRITE_RETRIES = int(os.getenv("LOG_WRITE_RETRIES", "3"))
+
+# Delay before the first retry, doubled for each further one
+LOG_WRITE_RETRY_DELAY_MS = int(os.getenv("LOG_WRITE_RETRY_DELAY_MS", "100"))
+
+OVERFLOW_POLICIES = ("drop", "block", "sample")
+
+# Queue marker telling the writer to flush and exit
+_STOP = object()
+
+
+class RequestLogWriter:
+    """
+    Bounded queue plus background task that bulk-inserts request logs.
+
+    Flush listeners are called on the event loop after each batch is committed,
+    with the records (now carrying their database "id").
+    """
+
+    def __init__(
+        self,
+        db_session_factory,
+        queue_size: int = LOG_QUEUE_SIZE,
+        batch_size: int = LOG_BATCH_SIZE,
+        flush_interval_ms: int = LOG_FLUSH_INTERVAL_MS,
+        overflow_policy: str = LOG_OVERFLOW_POLICY,
+        sample_rate: float = LOG_OVERFLOW_SAMPLE_RATE
+    ):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            logger.warning(f"Unknown log overflow policy '{overflow_policy}', using 'drop'")
+            overflow_policy = "drop"
+
+        self.db_session_factory = db_session_factory
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.overflow_policy = overflow_policy
+        self.sample_rate = sample_rate
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._getter: Optional[asyncio.Future] = None
+        self._closing = False
+        self._listeners: List[Callable[[List[Dict[str, Any]]], None]] = []
+
+        # Counters
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+
+    # ==================== Lifecycle ====================
+
+    def start(self):
+        """Start (or restart) the background writer. Must be called from the event loop."""
+        if self._task is not None and not self._task.done():
+            return
+        if self._task is not None and not self._task.cancelled() and self._task.exception() is not None:
+            logger.error(f"Request log writer died, restarting it: {self._task.exception()!r}")
+        self._closing = False
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            f"Request log writer started (batch={self.batch_size}, "
+            f"interval={int(self.flush_interval * 1000)}ms, overflow={self.overflow_policy})"
+        )
+
+    async def stop(self):
+        """Stop accepting records and flush everything still queued."""
+        if self._task is None:
+            return
+        self._closing = True
+        if self._task.done():
+            # Died earlier: restart it once so the queued records are still written
+            self.start()
+            self._closing = True
+        # The marker queues behind every pending record, so they are all flushed first
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+        self._queue = None
+        self._getter = None
+        logger.info(f"Request log writer stopped ({self.written} written, {self.dropped} dropped)")
+
+    def add_flush_listener(self, listener: Callable[[List[Dict[str, Any]]], None]):
+        """Register a callback invoked with each committed batch of records."""
+        self._listeners.append(listener)
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self.queue_depth,
+            "queue_size": self.queue_size,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "written": self.written,
+            "failed": self.failed,
+            "batches": self.batches,
+            "overflow_policy": self.overflow_policy,
+        }
+
+    # ==================== Ingestion ====================
+
+    async def enqueue(self, record: Dict[str, Any]) -> bool:
+        """
+        Queue a log record for writing.
+
+        Args:
+            record: Column values for a RequestLog row
+
+        Returns:
+            True if the record was accepted, False if it was dropped by the overflow policy
+        """
+        if self._closing:
+            self.dropped += 1
+            return False
+        if self._task is None or self._task.done():
+            self.start()
+        record.setdefault("timestamp", datetime.utcnow())
+
+        if self.overflow_policy == "block":
+            await self._queue.put(record)
+            self.enqueued += 1
+            return True
+
+        if self.overflow_policy == "sample" and self._queue.qsize() >= self.queue_size * 0.8:
+            if random.random() >= self.sample_rate:
+                self.dropped += 1
+                return False
+
+        try:
+            self._queue.put_nowait(record)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        self.enqueued += 1
+        return True
+
+    # ==================== Writing ====================
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        # A pending queue.get() is kept across batches, and across restarts after a crash
+        # (never cancelled), so no record is lost
+        while True:
+            batch = []
+            deadline = None
+            while len(batch) < self.batch_size:
+                if self._getter is None and not self._queue.empty():
+                    item = self._queue.get_nowait()
+                else:
+                    if self._getter is None:
+                        self._getter = asyncio.ensure_future(self._queue.get())
+                    timeout = None if deadline is None else deadline - loop.time()
+                    if timeout is not None and timeout <= 0:
+                        break
+                    done, _ = await asyncio.wait({self._getter}, timeout=timeout)
+                    if not done:
+                        break
+                    item = self._getter.result()
+                    self._getter = None
+
+                if item is _STOP:
+                    await self._flush(batch)
+                    return
+                batch.append(item)
+                if deadline is None:
+                    # The flush interval starts with the oldest record of the batch
+                    deadline = loop.time() + self.flush_interval
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Dict[str, Any]]):
+        """Write a batch off the event loop, then notify listeners of the records written."""
+        if not batch:
+            return
+        start = time.perf_counter()
+        written = await self._write(batch)
+        get_metrics().observe_stage("log_write", time.perf_counter() - start)
+        if not written:
+            return
+
+        self.written += len(written)
+        self.batches += 1
+        for listener in self._listeners:
+            try:
+                listener(written)
+            except Exception as e:
+                logger.error(f"Request log flush listener failed: {e}")
+
+    async def _write(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Write records, retrying transient errors and isolating bad records.
+
+        A transient error retries the same records with backoff. Any other error
+        splits the records in halves that are written separately, so only records
+        that fail on their own (e.g. of an entity deleted meanwhile) are dropped.
+
+        Returns:
+            The records written
+        """
+        loop = asyncio.get_running_loop()
+        attempt = 0
+        while True:
+            try:
+                await loop.run_in_executor(None, self.write_batch, batch)
+                return batch
+            except Exception as e:
+                transient = is_transient_error(e)
+                if transient and attempt < LOG_WRITE_RETRIES:
+                    await asyncio.sleep(LOG_WRITE_RETRY_DELAY_MS / 1000.0 * 2 ** attempt)
+                    attempt += 1
+                    continue
+                if transient or len(batch) == 1:
+                    self.failed += len(batch)
+                    logger.error(f"Failed to write {len(batch)} request logs: {e}")
+                    return []
+                break
+
+        middle = len(batch) // 2
+        return await self._write(batch[:middle]) + await self._write(batch[middle:])
+
+    def write_batch(self, batch: List[Dict[str, Any]]):
+        """
+        Bulk insert a batch in one transaction and store the generated ids on the records.
+
+        Args:
+            batch: List of RequestLog column dicts
+        """
+        from backend.models import RequestLog
+
+        db = self.db_session_factory()
+        try:
+            codec = get_log_codec()
+            header_store = get_header_store()
+            search_index = get_search_index()
+            rows = [self._row(record) for record in batch]
+            new_header_hashes = header_store.dedup_rows(db, rows)
+            rows = [codec.encode_row(db, row) for row in rows]
+            dialect = db.get_bind().dialect
+            if dialect.insert_executemany_returning and dialect.insert_executemany_returning_sort_by_parameter_order:
+                stmt = search_index.with_vectors(db, insert(RequestLog), rows, batch)
+                result = db.execute(
+                    stmt.returning(RequestLog.id, sort_by_parameter_order=True),
+                    rows
+                )
+                ids = result.scalars().all()
+            else:
+                # Fallback for drivers without executemany RETURNING
+                logs = [RequestLog(**row) for row in rows]
+                db.add_all(logs)
+                db.flush()
+                ids = [log.id for log in logs]
+            search_index.index_batch(db, ids, batch)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        header_store.mark_stored(new_header_hashes)
+
+        for record, log_id in zip(batch, ids):
+            record["id"] = log_id
+
+    @staticmethod
+    def _row(record: Dict[str, Any]) -> Dict[str, Any]:
+        """Column values for a record (records may carry extra, non-column keys).
+
+        The record itself keeps the plain payload for flush listeners; header dedup and
+        compression are applied to the returned row only.
+        """
+        return {
+            "entity_id": record["entity_id"],
+            "mock_endpoint_id": record.get("mock_endpoint_id"),
+            "method": record.get("method"),
+            "path": record.get("path"),
+            "request_headers": record.get("request_headers"),
+            "request_headers_hash": None,
+            "request_body": record.get("request_body"),
+            "query_params": record.get("query_params"),
+            "response_code": record.get("response_code"),
+            "response_body": record.get("response_body"),
+            "body_codec": None,
+            "compressed_payload": None,
+            "body_dictionary_id": None,
+            "timestamp": record["timestamp"],
+            "duration_ms": record.get("duration_ms"),
+            "request_size": record.get("request_size"),
+            "response_size": record.get("response_size"),
+        }
+
+
+def is_transient_error(error: Exception) -> bool:
+    """True for database errors worth retrying unchanged (lost connection, locked database, ...)."""
+    if isinstance(error, DBAPIError) and error.connection_invalidated:
+        return True
+    return isinstance(error, OperationalError)
+
+
+# Global writer instance
+_log_writer: Optional[RequestLogWriter] = None
+
+
+def get_log_writer(db_session_factory=None) -> RequestLogWriter:
+    """Get or create the global request log writer."""
+    global _log_writer
+
+    if _log_writer is None:
+        if db_session_factory is None:
+            from backend.database import SessionLocal
+            db_session_factory = SessionLocal
+        _log_writer = RequestLogWriter(db_session_factory)
+    return _log_writer
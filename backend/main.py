@@ -1,30 +1,49 @@
-from fastapi import FastAPI, Depends, HTTPException, Request, Response, WebSocket, WebSocketDisconnect, Header
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional, Dict, Set
+from typing import List, Optional
 import json
 import asyncio
-import re
 from datetime import datetime, timezone, timedelta
 import secrets
 
 from backend.database import engine, get_db, Base
+from backend.metrics import METRICS_ENABLED, CONTENT_TYPE as METRICS_CONTENT_TYPE, get_metrics
 from backend.models import User, Entity, MockEndpoint, RequestLog
 from backend.schemas import (
     UserCreate, UserLogin, UserResponse, LoginResponse,
     EntityCreate, EntityUpdate, EntityResponse, EntityShareRequest,
     MockEndpointCreate, MockEndpointUpdate, MockEndpointResponse,
-    RequestLogResponse,
+    ScenarioSelectionStatsResponse, RequestLogResponse, LogDeletionJobResponse, TrafficSeriesResponse,
+    EndpointHistogramsResponse,
     UserStatsResponse, CollectionStatsResponse, DashboardStatsResponse,
     PasswordResetInitiateResponse, PasswordResetCompleteRequest, AdminRoleUpdateResponse
 )
 from backend.auth import hash_password, verify_password, create_access_token, get_current_user
 from backend.migrations import run_migrations
-from backend.placeholders import replace_placeholders
 from backend.schema_validator import validate_request as validate_schema, is_valid_schema
-from backend.callbacks import schedule_callback, extract_callback_url
+from backend.callbacks import schedule_callback, extract_callback_url, callback_handler
 from backend.session_store import initialize_session_store
+from backend.websocket_manager import get_connection_manager
+from backend.log_fanout import get_log_fanout
+from backend.routing import EntityRoute, route_table, compile_path_pattern
+from backend.config_bus import get_config_bus, publish_change, bump_revision
+from backend.response_plans import compile_response_plan, decode_response_body
+from backend.log_writer import get_log_writer
+from backend.log_codec import get_log_codec
+from backend.log_headers import normalize_headers
+from backend.log_queries import MAX_PAGE_SIZE, filter_logs, page_logs, load_log_payloads, to_naive_utc
+from backend.log_retention import get_retention_engine
+from backend.log_search import get_search_index
+from backend.log_export import EXPORT_FORMATS, content_disposition, export_logs
+from backend.dashboard_stats import user_stats, collection_stats
+from backend.traffic_rollups import get_traffic_rollups, total_requests, traffic_series, delete_entity_rollups
+from backend.histograms import (
+    get_endpoint_histograms, histogram_summary, delete_entity_histograms, delete_endpoint_histograms
+)
+from backend.request_timing import RequestTiming
+from backend.log_partitions import LOG_PARTITION_MAINTENANCE_SECONDS, get_partition_manager
 from backend.database import SessionLocal
 import logging
 
@@ -50,6 +69,36 @@ except Exception as e:
     logger.error(f"Failed to initialize session store: {e}")
     # Continue anyway - session store will be initialized lazily
 
+# Batched request log writer (started with the app, drained on shutdown)
+log_writer = get_log_writer(SessionLocal)
+
+# Per-minute request counters behind the dashboard and traffic series
+traffic_rollups = get_traffic_rollups(SessionLocal)
+
+# Per-endpoint latency and size histograms (hourly rows, flushed like the rollups)
+endpoint_histograms = get_endpoint_histograms(SessionLocal)
+
+# Prometheus metrics (collectors for the WebSocket manager are registered below it)
+metrics = get_metrics()
+metrics.collector(
+    "mocklab_log_queue_depth", "Request logs waiting for the batched writer", "gauge",
+    lambda: [((), log_writer.queue_depth)]
+)
+metrics.collector(
+    "mocklab_logs_total", "Request logs by writer outcome", "counter",
+    lambda: [((outcome,), getattr(log_writer, outcome)) for outcome in ("enqueued", "dropped", "written", "failed")],
+    ("outcome",)
+)
+metrics.collector(
+    "mocklab_callback_queue_depth", "Callbacks scheduled and not finished yet", "gauge",
+    lambda: [((), callback_handler.pending)]
+)
+metrics.collector(
+    "mocklab_callbacks_total", "Finished callbacks by outcome", "counter",
+    lambda: [((outcome,), count) for outcome, count in sorted(callback_handler.outcomes.items())],
+    ("outcome",)
+)
+
 app = FastAPI(
     title="Mock-Lab",
     description="Dynamic API mocking service with real-time monitoring and scenario-based testing",
@@ -64,6 +113,50 @@ async def startup_event():
     if session_store is None:
         session_store = initialize_session_store(SessionLocal)
     
+    # Build the in-memory route table used by the mock data plane
+    try:
+        route_table.reload(SessionLocal)
+    except Exception as e:
+        logger.error(f"Failed to load route table: {e}")
+    
+    # Keep the route table in sync with config changes made on other replicas
+    def apply_config_change(change):
+        db = SessionLocal()
+        try:
+            route_table.apply_change(db, change)
+        finally:
+            db.close()
+    
+    log_writer.start()
+    log_fanout.start(manager.broadcast_text)
+    traffic_rollups.start()
+    endpoint_histograms.start()
+    get_retention_engine(SessionLocal).start()
+    
+    try:
+        get_config_bus(SessionLocal, engine).start(
+            on_change=apply_config_change,
+            on_resync=lambda: route_table.reload(SessionLocal)
+        )
+    except Exception as e:
+        logger.error(f"Failed to start config bus: {e}")
+    
+    # Create upcoming request_logs partitions and drop expired ones (PostgreSQL, opt-in)
+    partition_manager = get_partition_manager(engine)
+    if partition_manager.enabled:
+        async def maintain_log_partitions():
+            """Periodically run request_logs partition maintenance."""
+            loop = asyncio.get_running_loop()
+            while True:
+                try:
+                    await loop.run_in_executor(None, partition_manager.run_maintenance)
+                except Exception as e:
+                    logger.error(f"Error maintaining request_logs partitions: {e}")
+                await asyncio.sleep(LOG_PARTITION_MAINTENANCE_SECONDS)
+        
+        asyncio.create_task(maintain_log_partitions())
+        logger.info(f"Started {partition_manager.granularity} request_logs partition maintenance")
+    
     # Schedule periodic cleanup of expired tokens (only for database storage)
     if hasattr(session_store, 'cleanup_expired'):
         async def cleanup_expired_tokens():
@@ -81,6 +174,16 @@ async def startup_event():
         asyncio.create_task(cleanup_expired_tokens())
         logger.info("Started background task for cleaning expired session tokens")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Shutdown tasks: drain queued request logs and stop background receivers."""
+    await log_writer.stop()
+    await log_fanout.stop()
+    await traffic_rollups.stop()
+    await endpoint_histograms.stop()
+    await get_retention_engine().stop()
+    get_config_bus().stop()
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -88,41 +191,51 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Server-Timing"],
 )
 
 # ==================== WebSocket Manager ====================
 
-class ConnectionManager:
-    def __init__(self):
-        # entity_id -> Set of WebSocket connections
-        self.active_connections: Dict[int, Set[WebSocket]] = {}
-
-    async def connect(self, websocket: WebSocket, entity_id: int):
-        await websocket.accept()
-        if entity_id not in self.active_connections:
-            self.active_connections[entity_id] = set()
-        self.active_connections[entity_id].add(websocket)
-
-    def disconnect(self, websocket: WebSocket, entity_id: int):
-        if entity_id in self.active_connections:
-            self.active_connections[entity_id].discard(websocket)
-            if not self.active_connections[entity_id]:
-                del self.active_connections[entity_id]
-
-    async def broadcast_to_entity(self, entity_id: int, message: dict):
-        if entity_id in self.active_connections:
-            dead_connections = set()
-            for connection in self.active_connections[entity_id]:
-                try:
-                    await connection.send_json(message)
-                except:
-                    dead_connections.add(connection)
-            
-            # Clean up dead connections
-            for connection in dead_connections:
-                self.active_connections[entity_id].discard(connection)
+manager = get_connection_manager()
+
+# Delivers live log messages to viewers on every replica
+log_fanout = get_log_fanout()
+manager.add_watch_listener(log_fanout.watch)
 
-manager = ConnectionManager()
+metrics.collector(
+    "mocklab_websocket_connections", "Open live log WebSocket connections", "gauge",
+    lambda: [((), manager.connection_count())]
+)
+metrics.collector(
+    "mocklab_websocket_broadcast_queue_depth", "Live log frames queued on all connections and not sent yet", "gauge",
+    lambda: [((), manager.pending_broadcasts)]
+)
+metrics.collector(
+    "mocklab_websocket_max_queue_depth", "Live log frames queued on the most backed-up connection", "gauge",
+    lambda: [((), manager.max_queue_depth())]
+)
+metrics.collector(
+    "mocklab_websocket_broadcasts_total", "Live log frames broadcast to at least one viewer", "counter",
+    lambda: [((), manager.broadcasts)]
+)
+metrics.collector(
+    "mocklab_websocket_frames_dropped_total", "Live log frames not delivered by the slow consumer policy", "counter",
+    lambda: [((reason,), manager.dropped[reason]) for reason in ("dropped_oldest", "coalesced", "disconnected")],
+    ("reason",)
+)
+metrics.collector(
+    "mocklab_websocket_slow_consumer_disconnects_total", "Live log connections closed for falling behind", "counter",
+    lambda: [((), manager.slow_consumer_disconnects)]
+)
+metrics.collector(
+    "mocklab_log_fanout_queue_depth", "Live log frames waiting to be published to other replicas", "gauge",
+    lambda: [((), log_fanout.queue_depth)]
+)
+metrics.collector(
+    "mocklab_log_fanout_messages_total", "Live log frames exchanged with other replicas by outcome", "counter",
+    lambda: [((outcome,), log_fanout.outcomes[outcome]) for outcome in ("published", "received", "dropped", "failed")],
+    ("outcome",)
+)
 
 # ==================== Authentication Dependencies ====================
 
@@ -360,11 +473,20 @@ def create_entity(
         name=entity.name,
         base_path=base_path,
         owner_id=current_user.id,
-        is_public=entity.is_public
+        is_public=entity.is_public,
+        log_retention_days=entity.log_retention_days,
+        log_retention_max_rows=entity.log_retention_max_rows,
+        log_level=entity.log_level,
+        log_sample_rate=entity.log_sample_rate,
+        error_log_level=entity.error_log_level,
+        server_timing_enabled=entity.server_timing_enabled,
+        config_revision=1
     )
     db.add(db_entity)
     db.commit()
     db.refresh(db_entity)
+    route_table.sync_entity(db_entity)
+    publish_change("entity", db_entity.id, db_entity.config_revision)
     return db_entity
 
 @app.get("/admin/entities", response_model=List[EntityResponse], tags=["Admin"])
@@ -429,8 +551,16 @@ def delete_entity(
     # Only owner can delete
     require_entity_ownership(current_user, entity)
     
+    revision = (entity.config_revision or 0) + 1
+    get_search_index().delete_entity_documents(db, entity_id)
+    delete_entity_rollups(db, entity_id)
+    delete_entity_histograms(db, entity_id)
     db.delete(entity)
     db.commit()
+    traffic_rollups.forget(entity_id)
+    endpoint_histograms.forget(entity_id)
+    route_table.remove_entity(entity_id)
+    publish_change("entity", entity_id, revision, deleted=True)
     return {"message": "Entity deleted successfully"}
 
 @app.put("/admin/entities/{entity_id}", response_model=EntityResponse, tags=["Admin"])
@@ -468,8 +598,11 @@ def update_entity(
         else:
             entity.name = value
     
+    bump_revision(entity)
     db.commit()
     db.refresh(entity)
+    route_table.sync_entity(entity)
+    publish_change("entity", entity.id, entity.config_revision)
     return entity
 
 @app.post("/admin/entities/{entity_id}/share", tags=["Admin"])
@@ -615,11 +748,14 @@ def create_mock_endpoint(
         callback_payload=endpoint.callback_payload,
         # Schema validation fields
         request_schema=endpoint.request_schema,
-        schema_validation_enabled=endpoint.schema_validation_enabled
+        schema_validation_enabled=endpoint.schema_validation_enabled,
+        config_revision=1
     )
     db.add(db_endpoint)
     db.commit()
     db.refresh(db_endpoint)
+    route_table.sync_endpoint(db_endpoint)
+    publish_change("endpoint", db_endpoint.id, db_endpoint.config_revision)
     return db_endpoint
 
 @app.get("/admin/entities/{entity_id}/endpoints", response_model=List[MockEndpointResponse], tags=["Admin"])
@@ -750,8 +886,11 @@ def update_mock_endpoint(
         setattr(db_endpoint, key, value)
     
     db_endpoint.updated_at = datetime.utcnow()
+    bump_revision(db_endpoint)
     db.commit()
     db.refresh(db_endpoint)
+    route_table.sync_endpoint(db_endpoint)
+    publish_change("endpoint", db_endpoint.id, db_endpoint.config_revision)
     return db_endpoint
 
 @app.delete("/admin/endpoints/{endpoint_id}", tags=["Admin"])
@@ -768,8 +907,14 @@ def delete_mock_endpoint(
     # Check entity access
     require_entity_access(current_user, endpoint.entity)
     
+    revision = (endpoint.config_revision or 0) + 1
+    get_search_index().delete_endpoint_documents(db, endpoint_id)
+    delete_endpoint_histograms(db, endpoint.entity_id, endpoint_id)
     db.delete(endpoint)
     db.commit()
+    endpoint_histograms.forget(endpoint.entity_id, endpoint_id)
+    route_table.remove_endpoint(endpoint_id)
+    publish_change("endpoint", endpoint_id, revision, deleted=True)
     return {"message": "Endpoint deleted successfully"}
 
 @app.post("/admin/endpoints/{endpoint_id}/switch-scenario/{scenario_index}", tags=["Admin"])
@@ -798,24 +943,88 @@ def switch_active_scenario(
     # Switching explicitly sets selection to fixed mode
     endpoint.scenario_selection_mode = "fixed"
     endpoint.updated_at = datetime.utcnow()
+    bump_revision(endpoint)
     db.commit()
     db.refresh(endpoint)
+    route_table.sync_endpoint(endpoint)
+    publish_change("endpoint", endpoint.id, endpoint.config_revision)
     
     return {
         "message": "Scenario switched successfully",
         "active_scenario": scenarios[scenario_index]
     }
 
+@app.get("/admin/endpoints/{endpoint_id}/selection-stats", response_model=ScenarioSelectionStatsResponse, tags=["Admin"])
+def get_scenario_selection_stats(
+    endpoint_id: int,
+    db: Session = Depends(get_db),
+    current_user: Optional[User] = Depends(get_optional_user)
+):
+    """
+    Get realized scenario selection counts versus the configured distribution.
+    Counts are kept per backend process and reset when the endpoint config changes.
+    """
+    endpoint = db.query(MockEndpoint).filter(MockEndpoint.id == endpoint_id).first()
+    if not endpoint:
+        raise HTTPException(status_code=404, detail="Endpoint not found")
+    
+    # Check entity access
+    entity = endpoint.entity
+    if current_user:
+        require_entity_access(current_user, entity)
+    else:
+        # Not authenticated - can only view public entity endpoints
+        if not entity.is_public:
+            raise HTTPException(status_code=401, detail="Authentication required")
+    
+    # Inactive endpoints are not in the route table; report their configuration with zero counts
+    route = route_table.find_endpoint(endpoint_id)
+    plan = route.plan if route else compile_response_plan(endpoint)
+    return plan.selection_stats()
+
 # ==================== Request Logs ====================
 
+def query_logs_page(
+    db: Session,
+    response: Response,
+    query,
+    limit: int,
+    cursor: Optional[str],
+    include_bodies: bool,
+    id_column=None
+) -> List[RequestLog]:
+    """Fetch one page of logs and expose the next page cursor in the X-Next-Cursor header."""
+    try:
+        logs, next_cursor = page_logs(db, query, limit, cursor, include_bodies, id_column)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return logs
+
 @app.get("/admin/entities/{entity_id}/logs", response_model=List[RequestLogResponse], tags=["Admin"])
 def get_request_logs(
     entity_id: int,
-    limit: int = 100,
+    response: Response,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    method: Optional[str] = None,
+    status_min: Optional[int] = None,
+    status_max: Optional[int] = None,
+    path_prefix: Optional[str] = None,
+    endpoint_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    include_bodies: bool = True,
     db: Session = Depends(get_db),
     current_user: Optional[User] = Depends(get_optional_user)
 ):
-    """Get request logs for an entity. Requires access to the entity."""
+    """
+    Get request logs for an entity, newest first. Requires access to the entity.
+    
+    Filters are applied server-side. When more logs match, the X-Next-Cursor
+    response header holds the cursor for the next page.
+    """
     entity = db.query(Entity).filter(Entity.id == entity_id).first()
     if not entity:
         raise HTTPException(status_code=404, detail="Entity not found")
@@ -828,19 +1037,239 @@ def get_request_logs(
         if not entity.is_public:
             raise HTTPException(status_code=401, detail="Authentication required")
     
-    logs = db.query(RequestLog).filter(
-        RequestLog.entity_id == entity_id
-    ).order_by(RequestLog.timestamp.desc()).limit(limit).all()
-    return logs
+    query = filter_logs(
+        db.query(RequestLog).filter(RequestLog.entity_id == entity_id),
+        method=method, status_min=status_min, status_max=status_max, path_prefix=path_prefix,
+        endpoint_id=endpoint_id, since=since, until=until
+    )
+    return query_logs_page(db, response, query, limit, cursor, include_bodies)
+
+@app.get("/admin/entities/{entity_id}/logs/search", response_model=List[RequestLogResponse], tags=["Admin"])
+def search_request_logs(
+    entity_id: int,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=500),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    method: Optional[str] = None,
+    status_min: Optional[int] = None,
+    status_max: Optional[int] = None,
+    path_prefix: Optional[str] = None,
+    endpoint_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    include_bodies: bool = True,
+    db: Session = Depends(get_db),
+    current_user: Optional[User] = Depends(get_optional_user)
+):
+    """
+    Full-text search over an entity's request logs (path, headers and bodies), newest first.
+    Requires access to the entity.
+    
+    Every word of q must match. Accepts the same filters and cursor pagination
+    as the entity logs endpoint.
+    """
+    entity = db.query(Entity).filter(Entity.id == entity_id).first()
+    if not entity:
+        raise HTTPException(status_code=404, detail="Entity not found")
+    
+    # Check entity access
+    if current_user:
+        require_entity_access(current_user, entity)
+    else:
+        # Not authenticated - can only view public entity logs
+        if not entity.is_public:
+            raise HTTPException(status_code=401, detail="Authentication required")
+    
+    query = filter_logs(
+        db.query(RequestLog).filter(RequestLog.entity_id == entity_id),
+        method=method, status_min=status_min, status_max=status_max, path_prefix=path_prefix,
+        endpoint_id=endpoint_id, since=since, until=until
+    )
+    try:
+        query, id_column = get_search_index().search(db, query, q)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    return query_logs_page(db, response, query, limit, cursor, include_bodies, id_column)
+
+@app.get("/admin/entities/{entity_id}/logs/export", tags=["Admin"])
+def export_request_logs(
+    entity_id: int,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    gzip: bool = False,
+    method: Optional[str] = None,
+    status_min: Optional[int] = None,
+    status_max: Optional[int] = None,
+    path_prefix: Optional[str] = None,
+    endpoint_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    include_bodies: bool = True,
+    db: Session = Depends(get_db),
+    current_user: Optional[User] = Depends(get_optional_user)
+):
+    """
+    Stream all matching request logs of an entity, oldest first, as NDJSON or CSV.
+    Requires access to the entity.
+    
+    Accepts the same filters as the entity logs endpoint. Rows are streamed from a
+    server-side cursor, so exports of any size run in constant memory; gzip=true
+    compresses the stream on the fly.
+    """
+    entity = db.query(Entity).filter(Entity.id == entity_id).first()
+    if not entity:
+        raise HTTPException(status_code=404, detail="Entity not found")
+    
+    # Check entity access
+    if current_user:
+        require_entity_access(current_user, entity)
+    else:
+        # Not authenticated - can only view public entity logs
+        if not entity.is_public:
+            raise HTTPException(status_code=401, detail="Authentication required")
+    
+    filters = {
+        "method": method, "status_min": status_min, "status_max": status_max, "path_prefix": path_prefix,
+        "endpoint_id": endpoint_id, "since": since, "until": until,
+    }
+    filename = f"{entity.name}-logs.{format}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        export_logs(SessionLocal, entity_id, filters, format, include_bodies, compress=gzip),
+        media_type="application/gzip" if gzip else EXPORT_FORMATS[format],
+        headers={"Content-Disposition": content_disposition(filename)}
+    )
+
+@app.get("/admin/entities/{entity_id}/traffic", response_model=TrafficSeriesResponse, tags=["Admin"])
+def get_entity_traffic(
+    entity_id: int,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    bucket: str = Query("minute", pattern="^(minute|hour|day)$"),
+    endpoint_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: Optional[User] = Depends(get_optional_user)
+):
+    """
+    Requests served by an entity per minute, hour or day, split by status class.
+    Requires access to the entity.
+    
+    Defaults to the last hour. Read from the traffic rollups, so the cost depends
+    on the range, not on how many requests were logged.
+    """
+    entity = db.query(Entity).filter(Entity.id == entity_id).first()
+    if not entity:
+        raise HTTPException(status_code=404, detail="Entity not found")
+    
+    # Check entity access
+    if current_user:
+        require_entity_access(current_user, entity)
+    else:
+        # Not authenticated - can only view public entity traffic
+        if not entity.is_public:
+            raise HTTPException(status_code=401, detail="Authentication required")
+    
+    until = to_naive_utc(until) if until else datetime.utcnow()
+    since = to_naive_utc(since) if since else until - timedelta(hours=1)
+    try:
+        points = traffic_series(db, entity_id, since, until, bucket, endpoint_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "entity_id": entity_id,
+        "bucket": bucket,
+        "since": since,
+        "until": until,
+        "total": sum(point["count"] for point in points),
+        "points": points,
+    }
+
+@app.get("/admin/endpoints/{endpoint_id}/histograms", response_model=EndpointHistogramsResponse, tags=["Admin"])
+def get_endpoint_histograms_summary(
+    endpoint_id: int,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    current_user: Optional[User] = Depends(get_optional_user)
+):
+    """
+    Latency and size histograms of an endpoint with p50/p95/p99 estimates.
+    Requires access to the associated entity.
+    
+    Metrics: total handler time (duration_ms), handler time without the applied
+    delay (overhead_ms), applied delay and how far it overshot the configured
+    delay (delayed scenarios only), and request / response body sizes. Defaults
+    to the last 24 hours; histograms are stored per hour.
+    """
+    endpoint = db.query(MockEndpoint).filter(MockEndpoint.id == endpoint_id).first()
+    if not endpoint:
+        raise HTTPException(status_code=404, detail="Endpoint not found")
+    
+    # Check entity access
+    entity = endpoint.entity
+    if current_user:
+        require_entity_access(current_user, entity)
+    else:
+        # Not authenticated - can only view public entity endpoints
+        if not entity.is_public:
+            raise HTTPException(status_code=401, detail="Authentication required")
+    
+    until = to_naive_utc(until) if until else datetime.utcnow()
+    since = to_naive_utc(since) if since else until - timedelta(hours=24)
+    if until <= since:
+        raise HTTPException(status_code=400, detail="until must be after since")
+    return {
+        "endpoint_id": endpoint_id,
+        "since": since,
+        "until": until,
+        "metrics": histogram_summary(db, entity.id, endpoint_id, since, until),
+    }
+
+@app.get("/admin/logs/{log_id}", response_model=RequestLogResponse, tags=["Admin"])
+def get_request_log(
+    log_id: int,
+    db: Session = Depends(get_db),
+    current_user: Optional[User] = Depends(get_optional_user)
+):
+    """Get one request log with its headers and bodies (live log frames carry summaries only)."""
+    log = db.query(RequestLog).filter(RequestLog.id == log_id).first()
+    if not log:
+        raise HTTPException(status_code=404, detail="Log not found")
+    
+    # Check entity access
+    entity = db.query(Entity).filter(Entity.id == log.entity_id).first()
+    if current_user:
+        require_entity_access(current_user, entity)
+    else:
+        # Not authenticated - can only view public entity logs
+        if not entity.is_public:
+            raise HTTPException(status_code=401, detail="Authentication required")
+    
+    load_log_payloads(db, [log])
+    return log
 
 @app.get("/admin/endpoints/{endpoint_id}/logs", response_model=List[RequestLogResponse], tags=["Admin"])
 def get_endpoint_logs(
     endpoint_id: int,
-    limit: int = 100,
+    response: Response,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    method: Optional[str] = None,
+    status_min: Optional[int] = None,
+    status_max: Optional[int] = None,
+    path_prefix: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    include_bodies: bool = True,
     db: Session = Depends(get_db),
     current_user: Optional[User] = Depends(get_optional_user)
 ):
-    """Get request logs for a specific endpoint. Requires access to the associated entity."""
+    """
+    Get request logs for a specific endpoint, newest first. Requires access to the associated entity.
+    
+    Supports the same filters and cursor pagination as the entity logs endpoint.
+    """
     endpoint = db.query(MockEndpoint).filter(MockEndpoint.id == endpoint_id).first()
     if not endpoint:
         raise HTTPException(status_code=404, detail="Endpoint not found")
@@ -854,18 +1283,25 @@ def get_endpoint_logs(
         if not entity.is_public:
             raise HTTPException(status_code=401, detail="Authentication required")
     
-    logs = db.query(RequestLog).filter(
-        RequestLog.mock_endpoint_id == endpoint_id
-    ).order_by(RequestLog.timestamp.desc()).limit(limit).all()
-    return logs
+    query = filter_logs(
+        db.query(RequestLog).filter(RequestLog.mock_endpoint_id == endpoint_id),
+        method=method, status_min=status_min, status_max=status_max, path_prefix=path_prefix,
+        since=since, until=until
+    )
+    return query_logs_page(db, response, query, limit, cursor, include_bodies)
 
-@app.delete("/admin/entities/{entity_id}/logs", tags=["Admin"])
+@app.delete("/admin/entities/{entity_id}/logs", response_model=LogDeletionJobResponse, status_code=202, tags=["Admin"])
 def clear_entity_logs(
     entity_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user_dependency)
 ):
-    """Clear all logs for an entity. Requires access to the entity."""
+    """
+    Clear all logs for an entity. Requires access to the entity.
+    
+    Logs are deleted in chunks by a background job; poll
+    /admin/log-jobs/{job_id} for progress.
+    """
     entity = db.query(Entity).filter(Entity.id == entity_id).first()
     if not entity:
         raise HTTPException(status_code=404, detail="Entity not found")
@@ -873,56 +1309,174 @@ def clear_entity_logs(
     # Check entity access
     require_entity_access(current_user, entity)
     
-    db.query(RequestLog).filter(RequestLog.entity_id == entity_id).delete()
-    db.commit()
-    return {"message": "Logs cleared successfully"}
+    job = get_retention_engine().submit_clear(entity_id, current_user.id)
+    return {**job.to_dict(), "message": "Log clearing started"}
+
+@app.get("/admin/log-jobs/{job_id}", response_model=LogDeletionJobResponse, tags=["Admin"])
+def get_log_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_dependency)
+):
+    """
+    Get the progress of a log clearing job.
+    
+    Readable by the user who started it and, while the entity exists, by users with access to it.
+    """
+    job = get_retention_engine().get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    if job.user_id != current_user.id:
+        entity = db.query(Entity).filter(Entity.id == job.entity_id).first()
+        if not entity:
+            raise HTTPException(status_code=403, detail="You don't have permission to access this job")
+        require_entity_access(current_user, entity)
+    return job.to_dict()
+
+@app.post("/admin/entities/{entity_id}/log-dictionary", tags=["Admin"])
+def train_log_dictionary(
+    entity_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_dependency)
+):
+    """
+    Train a zstd compression dictionary from the entity's recent request logs.
+    
+    New logs of the entity are compressed with it when LOG_COMPRESSION=zstd.
+    """
+    entity = db.query(Entity).filter(Entity.id == entity_id).first()
+    if not entity:
+        raise HTTPException(status_code=404, detail="Entity not found")
+    
+    # Check entity access
+    require_entity_access(current_user, entity)
+    
+    try:
+        dictionary = get_log_codec().train_dictionary(db, entity_id)
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {
+        "id": dictionary.id,
+        "entity_id": dictionary.entity_id,
+        "size": len(dictionary.dictionary),
+        "sample_count": dictionary.sample_count,
+        "created_at": dictionary.created_at.replace(tzinfo=timezone.utc).isoformat()
+    }
 
 # ==================== Dynamic Mock Endpoint Handler ====================
 
+def log_summary(record: dict) -> dict:
+    """Compact live log entry for a written request log record (bodies are fetched with GET /admin/logs/{id})."""
+    return {
+        "id": record["id"],
+        "mock_endpoint_id": record["mock_endpoint_id"],
+        "method": record["method"],
+        "path": record["path"],
+        "response_code": record["response_code"],
+        "timestamp": record["timestamp"].replace(tzinfo=timezone.utc).isoformat(),
+        "duration_ms": round(record["duration_ms"], 3) if record.get("duration_ms") is not None else None,
+        "request_size": record.get("request_size"),
+        "response_size": record.get("response_size")
+    }
+
+def broadcast_written_logs(records: List[dict]):
+    """Broadcast request logs to WebSocket clients on every replica once they are stored."""
+    for record in records:
+        log_fanout.publish(record["entity_id"], log_summary(record))
+
+log_writer.add_flush_listener(broadcast_written_logs)
+
+async def log_mock_request(
+    entity: EntityRoute,
+    mock_endpoint_id: Optional[int],
+    method: str,
+    path: str,
+    request_headers: dict,
+    request_body: Optional[str],
+    query_params: dict,
+    response_code: int,
+    response_body: Optional[str],
+    timing: RequestTiming,
+    request_size: int,
+    response_size: int
+):
+    """
+    Queue a request log for the batched writer (broadcast happens after it is written).
+    
+    The entity's logging policy decides whether the request is logged at all and
+    whether headers, query params and bodies are kept. Traffic rollups and the
+    endpoint histograms count every request regardless of the policy.
+    """
+    traffic_rollups.record(entity.id, mock_endpoint_id, response_code)
+    if mock_endpoint_id is not None:
+        endpoint_histograms.observe(entity.id, mock_endpoint_id, timing, request_size, response_size)
+    
+    detail = entity.log_policy.detail_for(response_code)
+    if detail is not None:
+        full = detail == "full"
+        with timing.stage("log_enqueue"):
+            await log_writer.enqueue({
+                "entity_id": entity.id,
+                "mock_endpoint_id": mock_endpoint_id,
+                "method": method,
+                "path": path,
+                "request_headers": normalize_headers(request_headers) if full else None,
+                "request_body": request_body if full else None,
+                "query_params": json.dumps(query_params) if full else None,
+                "response_code": response_code,
+                "response_body": response_body if full else None,
+                "timestamp": datetime.utcnow(),
+                "duration_ms": timing.elapsed_ms(),
+                "request_size": request_size,
+                "response_size": response_size
+            })
+    
+    # After the enqueue, so its stage is included
+    metrics.observe_request(entity.id, mock_endpoint_id, response_code, timing)
+
+def with_server_timing(response: Response, entity: EntityRoute, timing: RequestTiming) -> Response:
+    """Add Server-Timing (readable by browser scripts on any origin) if the entity enabled it."""
+    if entity.server_timing:
+        response.headers["Server-Timing"] = timing.server_timing()
+        response.headers["Timing-Allow-Origin"] = "*"
+    return response
+
 def match_path(pattern: str, actual: str) -> bool:
     """Match URL pattern with path parameters like /users/{id}."""
-    pattern_regex = re.sub(r'\{[^}]+\}', r'[^/]+', pattern)
-    pattern_regex = f"^{pattern_regex}$"
-    return bool(re.match(pattern_regex, actual))
+    return bool(compile_path_pattern(pattern).match(actual))
 
 async def handle_mock_request(request: Request, db: Session):
     """Handle dynamic mock endpoint requests."""
+    timing = RequestTiming()
     method = request.method
     full_path = request.url.path
     
-    # Find entity by base path
-    entity = None
-    for t in db.query(Entity).all():
-        if full_path.startswith(t.base_path):
-            entity = t
-            break
+    # Resolve entity and endpoint from the in-memory route table (no DB round trips)
+    with timing.stage("route"):
+        route_table.ensure_loaded(db)
+        entity, endpoint_route, endpoint_path = route_table.resolve(method, full_path)
     
     if not entity:
+        metrics.observe_request(None, None, 404, timing)
         return JSONResponse(
             status_code=404,
             content={"error": "Entity not found for this endpoint"}
         )
     
-    # Extract the endpoint path (remove entity base path)
-    endpoint_path = full_path[len(entity.base_path):]
-    if not endpoint_path:
-        endpoint_path = "/"
-    
-    # Find matching mock endpoint
-    mock_endpoint = None
-    for endpoint in db.query(MockEndpoint).filter(
-        MockEndpoint.entity_id == entity.id,
-        MockEndpoint.is_active == True
-    ).all():
-        if endpoint.method == method and match_path(endpoint.path, endpoint_path):
-            mock_endpoint = endpoint
-            break
+    # Precompiled configuration of the matched endpoint
+    plan = endpoint_route.plan if endpoint_route else None
     
     # Prepare request data for logging
     request_body = None
     request_data = None
+    request_size = 0
     try:
         request_body = await request.body()
+        request_size = len(request_body)
         request_body = request_body.decode('utf-8') if request_body else None
         # Try to parse as JSON
         if request_body:
@@ -937,252 +1491,142 @@ async def handle_mock_request(request: Request, db: Session):
     request_headers = dict(request.headers)
     
     # If no matching endpoint found
-    if not mock_endpoint:
-        log = RequestLog(
-            entity_id=entity.id,
+    if not plan:
+        response = JSONResponse(
+            status_code=404,
+            content={"error": "No matching mock endpoint found"}
+        )
+        await log_mock_request(
+            entity=entity,
             mock_endpoint_id=None,
             method=method,
             path=endpoint_path,
-            request_headers=json.dumps(request_headers),
+            request_headers=request_headers,
             request_body=request_body,
-            query_params=json.dumps(query_params),
+            query_params=query_params,
             response_code=404,
             response_body=json.dumps({"error": "No matching mock endpoint found"}),
-            timestamp=datetime.utcnow()
+            timing=timing,
+            request_size=request_size,
+            response_size=len(response.body)
         )
-        db.add(log)
-        db.commit()
-        db.refresh(log)
-        
-        # Broadcast log to WebSocket clients
-        asyncio.create_task(manager.broadcast_to_entity(entity.id, {
-            "type": "new_log",
-            "log": {
-                "id": log.id,
-                "entity_id": log.entity_id,
-                "mock_endpoint_id": log.mock_endpoint_id,
-                "method": log.method,
-                "path": log.path,
-                "request_headers": log.request_headers,
-                "request_body": log.request_body,
-                "query_params": log.query_params,
-                "response_code": log.response_code,
-                "response_body": log.response_body,
-                "timestamp": log.timestamp.replace(tzinfo=timezone.utc).isoformat()
-            }
-        }))
         
-        return JSONResponse(
-            status_code=404,
-            content={"error": "No matching mock endpoint found"}
-        )
+        return with_server_timing(response, entity, timing)
     
     # ==================== FEATURE 1: Schema Validation ====================
     # Validate request schema if enabled
-    if mock_endpoint.schema_validation_enabled and mock_endpoint.request_schema:
+    if plan.schema_validation_enabled and plan.request_schema:
         if request_data is None:
             # Schema validation requires JSON data
             error_response = {"error": "Schema validation enabled but request body is not valid JSON"}
-            log = RequestLog(
-                entity_id=entity.id,
-                mock_endpoint_id=mock_endpoint.id,
+            response = JSONResponse(status_code=400, content=error_response)
+            await log_mock_request(
+                entity=entity,
+                mock_endpoint_id=plan.endpoint_id,
                 method=method,
                 path=endpoint_path,
-                request_headers=json.dumps(request_headers),
+                request_headers=request_headers,
                 request_body=request_body,
-                query_params=json.dumps(query_params),
+                query_params=query_params,
                 response_code=400,
                 response_body=json.dumps(error_response),
-                timestamp=datetime.utcnow()
+                timing=timing,
+                request_size=request_size,
+                response_size=len(response.body)
             )
-            db.add(log)
-            db.commit()
-            db.refresh(log)
             
-            asyncio.create_task(manager.broadcast_to_entity(entity.id, {
-                "type": "new_log",
-                "log": {
-                    "id": log.id,
-                    "entity_id": log.entity_id,
-                    "mock_endpoint_id": log.mock_endpoint_id,
-                    "method": log.method,
-                    "path": log.path,
-                    "request_headers": log.request_headers,
-                    "request_body": log.request_body,
-                    "query_params": log.query_params,
-                    "response_code": log.response_code,
-                    "response_body": log.response_body,
-                    "timestamp": log.timestamp.replace(tzinfo=timezone.utc).isoformat()
-                }
-            }))
-            
-            return JSONResponse(status_code=400, content=error_response)
+            return with_server_timing(response, entity, timing)
         
         # Validate against schema
-        is_valid, error_message = validate_schema(mock_endpoint.request_schema, request_data)
+        with timing.stage("validate"):
+            is_valid, error_message = validate_schema(plan.request_schema, request_data)
         if not is_valid:
             error_response = {
                 "error": "Request validation failed",
                 "details": error_message
             }
-            log = RequestLog(
-                entity_id=entity.id,
-                mock_endpoint_id=mock_endpoint.id,
+            response = JSONResponse(status_code=400, content=error_response)
+            await log_mock_request(
+                entity=entity,
+                mock_endpoint_id=plan.endpoint_id,
                 method=method,
                 path=endpoint_path,
-                request_headers=json.dumps(request_headers),
+                request_headers=request_headers,
                 request_body=request_body,
-                query_params=json.dumps(query_params),
+                query_params=query_params,
                 response_code=400,
                 response_body=json.dumps(error_response),
-                timestamp=datetime.utcnow()
+                timing=timing,
+                request_size=request_size,
+                response_size=len(response.body)
             )
-            db.add(log)
-            db.commit()
-            db.refresh(log)
-            
-            asyncio.create_task(manager.broadcast_to_entity(entity.id, {
-                "type": "new_log",
-                "log": {
-                    "id": log.id,
-                    "entity_id": log.entity_id,
-                    "mock_endpoint_id": log.mock_endpoint_id,
-                    "method": log.method,
-                    "path": log.path,
-                    "request_headers": log.request_headers,
-                    "request_body": log.request_body,
-                    "query_params": log.query_params,
-                    "response_code": log.response_code,
-                    "response_body": log.response_body,
-                    "timestamp": log.timestamp.replace(tzinfo=timezone.utc).isoformat()
-                }
-            }))
             
-            return JSONResponse(status_code=400, content=error_response)
-    
-    # Determine response based on scenarios or legacy fields
-    response_code = mock_endpoint.response_code
-    response_body_str = mock_endpoint.response_body
-    response_headers_dict = json.loads(mock_endpoint.response_headers)
-    delay_ms = mock_endpoint.delay_ms
-    
-    # Check if scenarios are configured
-    scenarios = json.loads(mock_endpoint.response_scenarios or "[]")
-    if scenarios:
-        selected_index = None
-        mode = getattr(mock_endpoint, 'scenario_selection_mode', 'fixed') or 'fixed'
-        if mode == 'random':
-            import random
-            selected_index = random.randrange(0, len(scenarios))
-        elif mode == 'weighted':
-            import random
-            try:
-                weights = json.loads(getattr(mock_endpoint, 'scenario_weights', '[]') or '[]')
-            except Exception:
-                weights = []
-            # Normalize weights; fallback to equal if invalid
-            if not isinstance(weights, list) or len(weights) != len(scenarios):
-                weights = [1.0] * len(scenarios)
-            total = sum([w if isinstance(w, (int, float)) and w >= 0 else 0 for w in weights])
-            if total <= 0:
-                weights = [1.0] * len(scenarios)
-                total = float(len(scenarios))
-            # Roulette wheel selection
-            r = random.uniform(0, total)
-            upto = 0.0
-            for i, w in enumerate(weights):
-                wv = w if isinstance(w, (int, float)) and w >= 0 else 0.0
-                if upto + wv >= r:
-                    selected_index = i
-                    break
-                upto += wv
-            if selected_index is None:
-                selected_index = len(scenarios) - 1
-        else:
-            # fixed
-            if 0 <= mock_endpoint.active_scenario_index < len(scenarios):
-                selected_index = mock_endpoint.active_scenario_index
-            else:
-                selected_index = 0
-        active_scenario = scenarios[selected_index]
-        response_code = active_scenario["response_code"]
-        response_body_str = active_scenario["response_body"]
-        response_headers_dict = active_scenario.get("response_headers", {})
-        delay_ms = active_scenario.get("delay_ms", 0)  # Use scenario-specific delay
+            return with_server_timing(response, entity, timing)
+    
+    # Pick the response scenario (legacy single responses are compiled as one scenario)
+    scenario = plan.select()
+    response_code = scenario.response_code
+    delay_ms = scenario.delay_ms
+    timing.configured_delay_ms = delay_ms
     
     # ==================== FEATURE 2: Placeholder Replacement ====================
-    # Replace placeholders in response body
-    response_body_str = replace_placeholders(response_body_str)
+    # Render the precompiled response template (static bodies are returned as-is)
+    with timing.stage("render"):
+        response_body_str = scenario.template.render()
+        
+        # Parse response body (static scenarios are already encoded in the plan)
+        response_body_json = None
+        if scenario.encoded_body is None:
+            response_body_json = decode_response_body(response_body_str)
+        
+        # Build the mock response (pre-encoded bytes for static scenarios)
+        response = scenario.build_response(response_body_json)
     
     # Apply delay if configured
     if delay_ms > 0:
-        await asyncio.sleep(delay_ms / 1000.0)
-    
-    # Parse response body
-    try:
-        response_body_json = json.loads(response_body_str)
-    except:
-        response_body_json = response_body_str
+        with timing.stage("delay"):
+            await asyncio.sleep(delay_ms / 1000.0)
     
     # Log the request
-    log = RequestLog(
-        entity_id=entity.id,
-        mock_endpoint_id=mock_endpoint.id,
+    await log_mock_request(
+        entity=entity,
+        mock_endpoint_id=plan.endpoint_id,
         method=method,
         path=endpoint_path,
-        request_headers=json.dumps(request_headers),
+        request_headers=request_headers,
         request_body=request_body,
-        query_params=json.dumps(query_params),
+        query_params=query_params,
         response_code=response_code,
         response_body=response_body_str,
-        timestamp=datetime.utcnow()
+        timing=timing,
+        request_size=request_size,
+        response_size=len(response.body)
     )
-    db.add(log)
-    db.commit()
-    db.refresh(log)
-    
-    # Broadcast log to WebSocket clients
-    asyncio.create_task(manager.broadcast_to_entity(entity.id, {
-        "type": "new_log",
-        "log": {
-            "id": log.id,
-            "entity_id": log.entity_id,
-            "mock_endpoint_id": log.mock_endpoint_id,
-            "method": log.method,
-            "path": log.path,
-            "request_headers": log.request_headers,
-            "request_body": log.request_body,
-            "query_params": log.query_params,
-            "response_code": log.response_code,
-            "response_body": log.response_body,
-            "timestamp": log.timestamp.replace(tzinfo=timezone.utc).isoformat()
-        }
-    }))
     
     # ==================== FEATURE 3: Async Callbacks ====================
     # Send async callback if configured
-    if mock_endpoint.callback_enabled:
+    if plan.callback_enabled:
         callback_url = None
         
         # Extract callback URL from request if configured
-        if mock_endpoint.callback_extract_from_request and mock_endpoint.callback_extract_field:
+        if plan.callback_extract_from_request and plan.callback_extract_field:
             if request_data:
-                callback_url = extract_callback_url(request_data, mock_endpoint.callback_extract_field)
+                callback_url = extract_callback_url(request_data, plan.callback_extract_field)
                 if not callback_url:
                     logger.warning(
-                        f"Failed to extract callback URL from field: {mock_endpoint.callback_extract_field}"
+                        f"Failed to extract callback URL from field: {plan.callback_extract_field}"
                     )
         
         # Use static callback URL if extraction failed or not configured
         if not callback_url:
-            callback_url = mock_endpoint.callback_url
+            callback_url = plan.callback_url
         
         # Send callback if URL is available
         if callback_url:
             # Prepare callback payload
-            if mock_endpoint.callback_payload:
+            if plan.callback_template:
                 # Use custom callback payload with placeholder replacement
-                callback_payload_str = replace_placeholders(mock_endpoint.callback_payload)
+                callback_payload_str = plan.callback_template.render()
                 try:
                     callback_payload = json.loads(callback_payload_str)
                 except json.JSONDecodeError:
@@ -1191,6 +1635,8 @@ async def handle_mock_request(request: Request, db: Session):
                     logger.warning(f"Custom callback payload is not valid JSON, wrapping it")
             else:
                 # Default payload (send back the response)
+                if scenario.encoded_body is not None:
+                    response_body_json = decode_response_body(response_body_str)
                 callback_payload = {
                     "endpoint": {
                         "method": method,
@@ -1204,23 +1650,18 @@ async def handle_mock_request(request: Request, db: Session):
             # Schedule the callback with configured delay
             schedule_callback(
                 url=callback_url,
-                method=mock_endpoint.callback_method,
+                method=plan.callback_method,
                 payload=callback_payload,
                 headers=None,  # Use default headers
-                delay_ms=mock_endpoint.callback_delay_ms
+                delay_ms=plan.callback_delay_ms
             )
             logger.info(
-                f"Callback scheduled for {callback_url} with delay {mock_endpoint.callback_delay_ms}ms"
+                f"Callback scheduled for {callback_url} with delay {plan.callback_delay_ms}ms"
             )
         else:
             logger.warning("Callback enabled but no callback URL available")
     
-    # Return mock response
-    return JSONResponse(
-        status_code=response_code,
-        content=response_body_json,
-        headers=response_headers_dict
-    )
+    return with_server_timing(response, entity, timing)
 
 # Catch-all route for dynamic mock endpoints
 @app.api_route("/api/{full_path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"], tags=["Mock"])
@@ -1228,37 +1669,47 @@ async def mock_endpoint_handler(request: Request, db: Session = Depends(get_db))
     """Handle all mock endpoint requests dynamically."""
     return await handle_mock_request(request, db)
 
-# WebSocket endpoint for real-time logs
-@app.websocket("/ws/logs/{entity_id}")
-async def websocket_logs(websocket: WebSocket, entity_id: int, token: Optional[str] = None, db: Session = Depends(get_db)):
-    """WebSocket endpoint for real-time request logs streaming."""
+def websocket_access_error(db: Session, entity_id: int, token: Optional[str]) -> Optional[str]:
+    """Reason to refuse a live log connection, or None if it is allowed."""
     # Verify entity exists
     entity = db.query(Entity).filter(Entity.id == entity_id).first()
     if not entity:
-        await websocket.close(code=1008, reason="Entity not found")
-        return
+        return "Entity not found"
     
     # Check access permissions
     # For WebSocket, we'll allow public entities without auth
     # and require auth for private entities
     if not entity.is_public:
         if not token:
-            await websocket.close(code=1008, reason="Authentication required for private entity")
-            return
+            return "Authentication required for private entity"
         
         user = get_current_user(db, token)
         if not user:
-            await websocket.close(code=1008, reason="Invalid token")
-            return
+            return "Invalid token"
         
         if not check_entity_access(user, entity):
-            await websocket.close(code=1008, reason="Access denied")
-            return
+            return "Access denied"
+    return None
+
+# WebSocket endpoint for real-time logs
+@app.websocket("/ws/logs/{entity_id}")
+async def websocket_logs(websocket: WebSocket, entity_id: int, token: Optional[str] = None):
+    """WebSocket endpoint for real-time request logs streaming."""
+    # Check access with a short-lived session: a Depends(get_db) session would hold
+    # a pooled connection for as long as the socket stays open
+    db = SessionLocal()
+    try:
+        denied = websocket_access_error(db, entity_id, token)
+    finally:
+        db.close()
+    if denied:
+        await websocket.close(code=1008, reason=denied)
+        return
     
-    await manager.connect(websocket, entity_id)
+    connection = await manager.connect(websocket, entity_id)
     try:
         # Send initial connection message
-        await websocket.send_json({
+        connection.send_json({
             "type": "connected",
             "entity_id": entity_id,
             "message": "Connected to real-time logs"
@@ -1270,13 +1721,13 @@ async def websocket_logs(websocket: WebSocket, entity_id: int, token: Optional[s
                 data = await websocket.receive_text()
                 # Echo back or handle ping/pong
                 if data == "ping":
-                    await websocket.send_json({"type": "pong"})
+                    connection.send_json({"type": "pong"})
             except WebSocketDisconnect:
                 break
     except Exception as e:
         print(f"WebSocket error: {e}")
     finally:
-        manager.disconnect(websocket, entity_id)
+        manager.disconnect(connection)
 
 # ==================== Admin Dashboard ====================
 
@@ -1296,22 +1747,22 @@ def get_dashboard_stats(
     total_users = db.query(User).count()
     total_collections = db.query(Entity).count()
     total_endpoints = db.query(MockEndpoint).count()
-    total_requests = db.query(RequestLog).count()
     
     # Count by type
     public_collections = db.query(Entity).filter(Entity.is_public == True).count()
     private_collections = total_collections - public_collections
     admin_users = db.query(User).filter(User.is_admin == True).count()
     
-    # Count requests by time
-    requests_today = db.query(RequestLog).filter(RequestLog.timestamp >= today).count()
-    requests_this_week = db.query(RequestLog).filter(RequestLog.timestamp >= week_ago).count()
+    # Count requests from the per-minute rollups (cost independent of log volume)
+    requests_total = total_requests(db)
+    requests_today = total_requests(db, since=today)
+    requests_this_week = total_requests(db, since=week_ago)
     
     return DashboardStatsResponse(
         total_users=total_users,
         total_collections=total_collections,
         total_endpoints=total_endpoints,
-        total_requests=total_requests,
+        total_requests=requests_total,
         public_collections=public_collections,
         private_collections=private_collections,
         admin_users=admin_users,
@@ -1325,39 +1776,7 @@ def get_all_users_with_stats(
     admin_user: User = Depends(get_admin_user)
 ):
     """Get all users with their statistics. Admin only."""
-    users = db.query(User).all()
-    
-    user_stats = []
-    for user in users:
-        # Count collections owned
-        collections_owned = db.query(Entity).filter(Entity.owner_id == user.id).count()
-        
-        # Count collections shared with this user
-        collections_shared = len([e for e in user.entities if e.owner_id != user.id])
-        
-        # Count total endpoints for owned collections
-        total_endpoints = db.query(MockEndpoint).join(Entity).filter(
-            Entity.owner_id == user.id
-        ).count()
-        
-        # Count total requests for owned collections
-        total_requests = db.query(RequestLog).join(Entity).filter(
-            Entity.owner_id == user.id
-        ).count()
-        
-        user_stats.append(UserStatsResponse(
-            id=user.id,
-            email=user.email,
-            username=user.username,
-            is_admin=user.is_admin,
-            created_at=user.created_at,
-            collections_owned=collections_owned,
-            collections_shared=collections_shared,
-            total_endpoints=total_endpoints,
-            total_requests=total_requests
-        ))
-    
-    return user_stats
+    return [UserStatsResponse(**stats) for stats in user_stats(db)]
 
 @app.get("/admin/dashboard/collections", response_model=List[CollectionStatsResponse], tags=["Admin Dashboard"])
 def get_all_collections_with_stats(
@@ -1365,44 +1784,15 @@ def get_all_collections_with_stats(
     admin_user: User = Depends(get_admin_user)
 ):
     """Get all collections with their statistics. Admin only."""
-    entities = db.query(Entity).all()
-    
-    collection_stats = []
-    for entity in entities:
-        # Count endpoints
-        endpoint_count = db.query(MockEndpoint).filter(
-            MockEndpoint.entity_id == entity.id
-        ).count()
-        
-        # Count requests
-        request_count = db.query(RequestLog).filter(
-            RequestLog.entity_id == entity.id
-        ).count()
-        
-        # Get last request timestamp
-        last_log = db.query(RequestLog).filter(
-            RequestLog.entity_id == entity.id
-        ).order_by(RequestLog.timestamp.desc()).first()
-        
-        last_request_at = last_log.timestamp if last_log else None
-        
-        # Get owner username
-        owner = db.query(User).filter(User.id == entity.owner_id).first()
-        owner_username = owner.username if owner else "Unknown"
-        
-        collection_stats.append(CollectionStatsResponse(
-            id=entity.id,
-            name=entity.name,
-            base_path=entity.base_path,
-            owner_username=owner_username,
-            is_public=entity.is_public,
-            created_at=entity.created_at,
-            endpoint_count=endpoint_count,
-            request_count=request_count,
-            last_request_at=last_request_at
-        ))
-    
-    return collection_stats
+    return [CollectionStatsResponse(**stats) for stats in collection_stats(db)]
+
+# Prometheus metrics
+@app.get("/metrics", tags=["System"], include_in_schema=False)
+def get_prometheus_metrics():
+    """Prometheus metrics in the text exposition format (METRICS_ENABLED=false disables it)."""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return PlainTextResponse(metrics.render(), media_type=METRICS_CONTENT_TYPE)
 
 # Health check
 @app.get("/health", tags=["System"])
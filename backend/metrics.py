@@ -0,0 +1,303 @@
+"""
+Prometheus metrics for GET /metrics.
+
+Hot-path metrics (mock requests, stage timings, pool checkout waits) are
+recorded in process as counters and histograms. Queue depths and component
+counters are read from their owners by collectors when /metrics is scraped,
+so they cost nothing per request. The output is the Prometheus text format
+(version 0.0.4), written without a client library.
+
+Label cardinality is bounded: entities and endpoints are labelled by id,
+statuses by class (2xx, 4xx, ...), and each labelled metric keeps at most
+METRICS_MAX_SERIES label sets. Requests for further label sets are counted
+under "other" label values.
+"""
+import os
+import time
+import logging
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+from backend.histograms import LATENCY_BOUNDS_MS
+from backend.request_timing import RequestTiming
+from backend.traffic_rollups import status_class, status_class_label
+
+logger = logging.getLogger(__name__)
+
+# Expose /metrics
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Label sets kept per metric before new ones are folded into "other"
+METRICS_MAX_SERIES = int(os.getenv("METRICS_MAX_SERIES", "1000"))
+
+# Starlette appends "; charset=utf-8" to text media types
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# Same bounds as the endpoint histograms, in seconds
+LATENCY_BUCKETS = tuple(bound / 1000 for bound in LATENCY_BOUNDS_MS)
+
+OTHER = "other"
+
+# A collector returns (labels, value) samples; labels are in the metric's label order
+Samples = Iterable[Tuple[Tuple[str, ...], float]]
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class Metric:
+    """Base of the labelled metrics; keeps at most max_series label sets."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), max_series: int = METRICS_MAX_SERIES):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.max_series = max_series
+        self._values: Dict[Tuple[str, ...], object] = {}
+        # Recorded from the event loop and from threadpool / executor threads
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Sequence) -> Tuple[str, ...]:
+        key = tuple(str(label) for label in labels)
+        if key not in self._values and len(self._values) >= self.max_series:
+            return (OTHER,) * len(self.labelnames)
+        return key
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            key = self._key(labels)
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in values
+        ]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS, max_series: int = METRICS_MAX_SERIES):
+        super().__init__(name, documentation, labelnames, max_series)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            key = self._key(labels)
+            series = self._values.get(key)
+            if series is None:
+                # Non-cumulative bucket counts (+ overflow), sum
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        lines = self.header()
+        bucket_names = self.labelnames + ("le",)
+        for key, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(bucket_names, key + (_format_value(bound),))} {cumulative}"
+                )
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class CollectedMetric(Metric):
+    """Gauge or counter whose samples are read from a collector at scrape time."""
+
+    def __init__(self, name: str, documentation: str, kind: str, collect: Callable[[], Samples], labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.kind = kind
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        try:
+            samples = list(self.collect())
+        except Exception as e:
+            logger.error(f"Metrics collector for {self.name} failed: {e}")
+            return []
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in samples
+        ]
+
+
+class MetricsRegistry:
+    """Mock-Lab metrics and the collectors registered by other components."""
+
+    def __init__(self, max_series: int = METRICS_MAX_SERIES):
+        self.max_series = max_series
+        self.metrics: List[Metric] = []
+
+        self.mock_requests = self.add(Counter(
+            "mocklab_mock_requests_total", "Mock requests served",
+            ("entity", "endpoint", "status"), max_series
+        ))
+        self.mock_request_duration = self.add(Histogram(
+            "mocklab_mock_request_duration_seconds", "Mock request handler time, including configured delays",
+            ("entity", "endpoint", "status"), max_series=max_series
+        ))
+        self.stage_duration = self.add(Histogram(
+            "mocklab_stage_duration_seconds",
+            "Time spent per processing stage (route, validate, render, delay per request; log_write per batch)",
+            ("stage",), max_series=max_series
+        ))
+        self.pool_checkout_wait = self.add(Histogram(
+            "mocklab_db_pool_checkout_wait_seconds", "Time waited for a database connection from the pool"
+        ))
+
+    def add(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def collector(self, name: str, documentation: str, kind: str, collect: Callable[[], Samples], labelnames: Sequence[str] = ()):
+        """
+        Register a gauge or counter read at scrape time.
+
+        Args:
+            name: Metric name
+            documentation: HELP text
+            kind: gauge | counter
+            collect: Returns (label values, value) samples
+            labelnames: Label names, in the order of the sample label values
+        """
+        self.add(CollectedMetric(name, documentation, kind, collect, labelnames))
+
+    # ==================== Recording ====================
+
+    def observe_request(self, entity_id: Optional[int], endpoint_id: Optional[int], response_code: int, timing: RequestTiming):
+        """
+        Count a mock request and its stage timings.
+
+        Args:
+            entity_id: Entity the request was routed to (None if no entity matched)
+            endpoint_id: Matched mock endpoint (None if no endpoint matched)
+            response_code: HTTP status returned
+            timing: Timing of the request
+        """
+        labels = (
+            entity_id if entity_id is not None else "none",
+            endpoint_id if endpoint_id is not None else "none",
+            status_class_label(status_class(response_code)),
+        )
+        self.mock_requests.inc(*labels)
+        self.mock_request_duration.observe(timing.elapsed_ms() / 1000, *labels)
+        for stage, duration_ms in timing.stages.items():
+            self.stage_duration.observe(duration_ms / 1000, stage)
+
+    def observe_stage(self, stage: str, seconds: float):
+        self.stage_duration.observe(seconds, stage)
+
+    def instrument_engine(self, engine):
+        """
+        Register connection pool gauges of an engine, kept up to date by pool events.
+
+        Checkout waits are timed by the pool class (see timed_pool_class()).
+        """
+        lock = threading.Lock()
+        counts = {"checked_out": 0, "open": 0}
+
+        def change(name: str, amount: int):
+            with lock:
+                counts[name] += amount
+
+        event.listen(engine, "checkout", lambda dbapi_connection, record, proxy: change("checked_out", 1))
+        event.listen(engine, "checkin", lambda dbapi_connection, record: change("checked_out", -1))
+        event.listen(engine, "connect", lambda dbapi_connection, record: change("open", 1))
+        event.listen(engine, "close", lambda dbapi_connection, record: change("open", -1))
+        event.listen(engine, "detach", lambda dbapi_connection, record: change("open", -1))
+
+        self.collector(
+            "mocklab_db_pool_connections_checked_out", "Database connections currently checked out", "gauge",
+            lambda: [((), counts["checked_out"])]
+        )
+        self.collector(
+            "mocklab_db_pool_connections", "Database connections held by the pool (idle or checked out)", "gauge",
+            lambda: [((), counts["open"])]
+        )
+
+    # ==================== Exposition ====================
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text format."""
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def timed_pool_class(pool_class):
+    """
+    Subclass of a SQLAlchemy pool class that times every connection checkout.
+
+    The time spent in _do_get() (including waiting for a free connection) is recorded
+    in mocklab_db_pool_checkout_wait_seconds. Pass the result as create_engine(poolclass=...).
+
+    Args:
+        pool_class: Pool class the dialect would use (e.g. QueuePool)
+    """
+    class TimedPool(pool_class):
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                return super()._do_get()
+            finally:
+                get_metrics().pool_checkout_wait.observe(time.perf_counter() - start)
+
+    TimedPool.__name__ = TimedPool.__qualname__ = f"Timed{pool_class.__name__}"
+    return TimedPool
+
+
+# Global metrics instance
+_metrics: Optional[MetricsRegistry] = None
+
+
+def get_metrics() -> MetricsRegistry:
+    """Get or create the global metrics registry."""
+    global _metrics
+
+    if _metrics is None:
+        _metrics = MetricsRegistry()
+    return _metrics
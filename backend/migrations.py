@@ -31,6 +31,39 @@ def run_migrations(engine):
         # Migration 6: Create session_tokens table for distributed session management
         migrate_create_session_tokens_table(engine)
         
+        # Migration 7: Add config revision counters for cross-replica cache invalidation
+        migrate_add_config_revision_fields(engine)
+        
+        # Migration 8: Add per-entity request logging policy
+        migrate_add_entity_log_policy_fields(engine)
+        
+        # Migration 9: Add compressed payload storage to request_logs
+        migrate_add_request_log_compression_fields(engine)
+        
+        # Migration 10: Reference deduplicated request header sets from request_logs
+        migrate_add_request_headers_hash_field(engine)
+        
+        # Migration 11: Add per-entity request log retention policy
+        migrate_add_entity_log_retention_fields(engine)
+        
+        # Migration 12: Convert request_logs to time-range partitions (PostgreSQL, opt-in)
+        migrate_partition_request_logs(engine)
+        
+        # Migration 13: Add composite indexes for keyset-paginated log queries
+        migrate_add_request_log_keyset_indexes(engine)
+        
+        # Migration 14: Add the full-text search index over request logs
+        migrate_add_request_log_search_index(engine)
+        
+        # Migration 15: Create per-minute traffic rollups from existing request logs
+        migrate_create_traffic_rollups_table(engine)
+        
+        # Migration 16: Add request timing and payload size fields to request_logs
+        migrate_add_request_log_timing_fields(engine)
+        
+        # Migration 17: Add per-entity Server-Timing toggle
+        migrate_add_entity_server_timing_field(engine)
+        
         logger.info("All migrations completed successfully")
     except Exception as e:
         logger.error(f"Migration failed: {e}")
@@ -315,3 +348,415 @@ def migrate_create_session_tokens_table(engine):
             logger.info("✓ Created session_tokens table")
     else:
         logger.info("✓ session_tokens table already exists")
+
+
+def migrate_add_config_revision_fields(engine):
+    """
+    Migration: Add config revision counters
+    - Adds config_revision to entities table
+    - Adds config_revision to mock_endpoints table
+    Used by the config bus to detect stale cache entries across replicas.
+    """
+    with engine.connect() as conn:
+        for table_name in ('entities', 'mock_endpoints'):
+            if not table_exists(engine, table_name):
+                logger.info(f"{table_name} table doesn't exist yet, skipping migration")
+                continue
+            
+            if not column_exists(engine, table_name, 'config_revision'):
+                logger.info(f"Adding config_revision column to {table_name} table")
+                conn.execute(text(f"""
+                    ALTER TABLE {table_name} 
+                    ADD COLUMN config_revision INTEGER DEFAULT 0 NOT NULL
+                """))
+                conn.commit()
+                logger.info(f"✓ Added config_revision column to {table_name}")
+            else:
+                logger.info(f"✓ config_revision column already exists on {table_name}")
+
+
+def migrate_add_entity_log_policy_fields(engine):
+    """
+    Migration: Add request logging policy fields to entities table
+    - Adds log_level (off|metadata|full|sampled)
+    - Adds log_sample_rate
+    - Adds error_log_level (policy for responses with status >= 400)
+    Existing entities keep full logging.
+    """
+    if not table_exists(engine, 'entities'):
+        logger.info("Entities table doesn't exist yet, skipping migration")
+        return
+    
+    fields = [
+        ('log_level', "VARCHAR DEFAULT 'full' NOT NULL"),
+        ('log_sample_rate', 'FLOAT DEFAULT 1.0 NOT NULL'),
+        ('error_log_level', "VARCHAR DEFAULT 'full' NOT NULL"),
+    ]
+    
+    with engine.connect() as conn:
+        for field_name, field_type in fields:
+            if not column_exists(engine, 'entities', field_name):
+                logger.info(f"Adding {field_name} column to entities table")
+                conn.execute(text(f"""
+                    ALTER TABLE entities 
+                    ADD COLUMN {field_name} {field_type}
+                """))
+                conn.commit()
+                logger.info(f"✓ Added {field_name} column")
+            else:
+                logger.info(f"✓ {field_name} column already exists")
+
+
+def migrate_add_request_log_compression_fields(engine):
+    """
+    Migration: Add compressed payload storage fields to request_logs table
+    - Adds body_codec (zlib|zstd, NULL for plain text rows)
+    - Adds compressed_payload (binary)
+    - Adds body_dictionary_id (log_dictionaries.id)
+    Existing rows stay uncompressed; the log_dictionaries table is created by create_all.
+    """
+    if not table_exists(engine, 'request_logs'):
+        logger.info("Request logs table doesn't exist yet, skipping migration")
+        return
+    
+    with engine.connect() as conn:
+        db_url = str(engine.url)
+        is_sqlite = 'sqlite' in db_url
+        
+        fields = [
+            ('body_codec', 'VARCHAR'),
+            ('compressed_payload', 'BLOB' if is_sqlite else 'BYTEA'),
+            ('body_dictionary_id', 'INTEGER'),
+        ]
+        
+        for field_name, field_type in fields:
+            if not column_exists(engine, 'request_logs', field_name):
+                logger.info(f"Adding {field_name} column to request_logs table")
+                conn.execute(text(f"""
+                    ALTER TABLE request_logs 
+                    ADD COLUMN {field_name} {field_type}
+                """))
+                conn.commit()
+                logger.info(f"✓ Added {field_name} column")
+            else:
+                logger.info(f"✓ {field_name} column already exists")
+
+
+def migrate_add_request_headers_hash_field(engine):
+    """
+    Migration: Add request_headers_hash to request_logs table
+    - Adds request_headers_hash (request_header_sets.hash) with an index
+    Existing rows keep their inline request_headers; request_header_sets is created by create_all.
+    """
+    if not table_exists(engine, 'request_logs'):
+        logger.info("Request logs table doesn't exist yet, skipping migration")
+        return
+    
+    with engine.connect() as conn:
+        if not column_exists(engine, 'request_logs', 'request_headers_hash'):
+            logger.info("Adding request_headers_hash column to request_logs table")
+            conn.execute(text("""
+                ALTER TABLE request_logs 
+                ADD COLUMN request_headers_hash VARCHAR
+            """))
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS ix_request_logs_request_headers_hash
+                ON request_logs (request_headers_hash)
+            """))
+            conn.commit()
+            logger.info("✓ Added request_headers_hash column")
+        else:
+            logger.info("✓ request_headers_hash column already exists")
+
+
+def migrate_add_entity_log_retention_fields(engine):
+    """
+    Migration: Add request log retention fields to entities table
+    - Adds log_retention_days (nullable, NULL = keep forever)
+    - Adds log_retention_max_rows (nullable, NULL = no limit)
+    """
+    if not table_exists(engine, 'entities'):
+        logger.info("Entities table doesn't exist yet, skipping migration")
+        return
+    
+    with engine.connect() as conn:
+        for field_name in ('log_retention_days', 'log_retention_max_rows'):
+            if not column_exists(engine, 'entities', field_name):
+                logger.info(f"Adding {field_name} column to entities table")
+                conn.execute(text(f"""
+                    ALTER TABLE entities 
+                    ADD COLUMN {field_name} INTEGER
+                """))
+                conn.commit()
+                logger.info(f"✓ Added {field_name} column")
+            else:
+                logger.info(f"✓ {field_name} column already exists")
+
+
+def request_logs_partitioned(engine):
+    """Check if request_logs is a partitioned table (PostgreSQL only)."""
+    if engine.dialect.name != 'postgresql':
+        return False
+    with engine.connect() as conn:
+        return conn.execute(text("""
+            SELECT 1 FROM pg_partitioned_table p
+            JOIN pg_class c ON c.oid = p.partrelid
+            WHERE c.relname = 'request_logs' AND pg_table_is_visible(c.oid)
+        """)).first() is not None
+
+
+def migrate_partition_request_logs(engine):
+    """
+    Migration: Convert request_logs into a table partitioned by timestamp range
+    (PostgreSQL only, when LOG_PARTITIONING is daily or hourly)
+    - Renames the existing table (and its indexes) to request_logs_legacy
+    - Creates request_logs PARTITION BY RANGE (timestamp) with the same columns,
+      primary key (id, timestamp) and indexes; the id sequence is reused
+    - Attaches the legacy table as the partition holding all existing rows
+    - Creates a default partition and the first time partitions
+    SQLite deployments keep the single table.
+    """
+    from backend.log_partitions import LOG_PARTITIONING, get_partition_manager
+    
+    if engine.dialect.name != 'postgresql' or not LOG_PARTITIONING:
+        return
+    
+    if not table_exists(engine, 'request_logs'):
+        logger.info("Request logs table doesn't exist yet, skipping migration")
+        return
+    
+    if request_logs_partitioned(engine):
+        logger.info("✓ request_logs is already partitioned")
+        return
+    
+    logger.info(f"Converting request_logs to {LOG_PARTITIONING} partitions")
+    manager = get_partition_manager(engine)
+    
+    # One transaction: either the table is fully converted or left untouched
+    with engine.begin() as conn:
+        conn.execute(text("LOCK TABLE request_logs IN ACCESS EXCLUSIVE MODE"))
+        conn.execute(text("ALTER TABLE request_logs RENAME TO request_logs_legacy"))
+        index_names = conn.execute(text("""
+            SELECT indexname FROM pg_indexes
+            WHERE tablename = 'request_logs_legacy' AND schemaname = current_schema()
+        """)).scalars().all()
+        for index_name in index_names:
+            conn.execute(text(f'ALTER INDEX "{index_name}" RENAME TO "{index_name}_legacy"'))
+        
+        conn.execute(text("""
+            CREATE TABLE request_logs (LIKE request_logs_legacy INCLUDING DEFAULTS)
+            PARTITION BY RANGE (timestamp)
+        """))
+        conn.execute(text("ALTER SEQUENCE IF EXISTS request_logs_id_seq OWNED BY request_logs.id"))
+        conn.execute(text("ALTER TABLE request_logs ADD PRIMARY KEY (id, timestamp)"))
+        conn.execute(text("""
+            ALTER TABLE request_logs
+            ADD FOREIGN KEY (entity_id) REFERENCES entities(id),
+            ADD FOREIGN KEY (mock_endpoint_id) REFERENCES mock_endpoints(id)
+        """))
+        # Same indexes as the model defines; created on the parent, they cascade to every partition
+        # (indexes over columns added by later migrations are created by those migrations)
+        from backend.models import RequestLog
+        legacy_columns = {column['name'] for column in inspect(conn).get_columns('request_logs_legacy')}
+        for index in RequestLog.__table__.indexes:
+            if all(column.name in legacy_columns for column in index.columns):
+                index.create(conn)
+        
+        # Existing rows stay where they are: the legacy table becomes the partition
+        # covering everything before the first time partition
+        conn.execute(text("""
+            UPDATE request_logs_legacy SET timestamp = to_timestamp(0) AT TIME ZONE 'UTC'
+            WHERE timestamp IS NULL
+        """))
+        conn.execute(text("ALTER TABLE request_logs_legacy ALTER COLUMN timestamp SET NOT NULL"))
+        latest = conn.execute(text("SELECT max(timestamp) FROM request_logs_legacy")).scalar()
+        boundary = manager.period_start(latest) + manager.period if latest else manager.period_start(None)
+        conn.execute(text(f"""
+            ALTER TABLE request_logs ATTACH PARTITION request_logs_legacy
+            FOR VALUES FROM (MINVALUE) TO ('{boundary.isoformat(sep=' ')}')
+        """))
+        conn.execute(text("CREATE TABLE request_logs_default PARTITION OF request_logs DEFAULT"))
+        manager.create_partitions(conn, start=boundary)
+    
+    logger.info(f"✓ Converted request_logs to {LOG_PARTITIONING} partitions (legacy rows before {boundary})")
+
+
+def migrate_add_request_log_keyset_indexes(engine):
+    """
+    Migration: Add composite indexes used by log pagination
+    - (entity_id, timestamp, id) for entity log listings
+    - (mock_endpoint_id, timestamp, id) for endpoint log listings
+    On a partitioned request_logs table the indexes are created on every partition.
+    """
+    if not table_exists(engine, 'request_logs'):
+        logger.info("Request logs table doesn't exist yet, skipping migration")
+        return
+    
+    indexes = [
+        ('ix_request_logs_entity_timestamp_id', 'entity_id, timestamp, id'),
+        ('ix_request_logs_endpoint_timestamp_id', 'mock_endpoint_id, timestamp, id'),
+    ]
+    
+    existing = {index['name'] for index in inspect(engine).get_indexes('request_logs')}
+    with engine.connect() as conn:
+        for index_name, columns in indexes:
+            if index_name not in existing:
+                logger.info(f"Creating {index_name} index on request_logs")
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS {index_name} ON request_logs ({columns})"))
+                conn.commit()
+                logger.info(f"✓ Created {index_name} index")
+            else:
+                logger.info(f"✓ {index_name} index already exists")
+
+
+def migrate_add_request_log_search_index(engine):
+    """
+    Migration: Add the full-text search index over request logs
+    - Adds search_vector to request_logs (TSVECTOR with a GIN index on PostgreSQL,
+      unused TEXT on SQLite); on PostgreSQL only logs written from now on are indexed
+    - SQLite: creates the request_logs_fts FTS5 table (rowid = request_logs.id) and
+      indexes existing logs; compressed payloads of existing logs are not indexed
+    """
+    is_sqlite = engine.dialect.name == 'sqlite'
+    
+    if table_exists(engine, 'request_logs'):
+        with engine.connect() as conn:
+            if not column_exists(engine, 'request_logs', 'search_vector'):
+                logger.info("Adding search_vector column to request_logs table")
+                conn.execute(text(f"""
+                    ALTER TABLE request_logs 
+                    ADD COLUMN search_vector {'TEXT' if is_sqlite else 'TSVECTOR'}
+                """))
+                if not is_sqlite:
+                    conn.execute(text("""
+                        CREATE INDEX IF NOT EXISTS ix_request_logs_search_vector
+                        ON request_logs USING gin (search_vector)
+                    """))
+                conn.commit()
+                logger.info("✓ Added search_vector column")
+            else:
+                logger.info("✓ search_vector column already exists")
+    
+    if not is_sqlite:
+        return
+    
+    if table_exists(engine, 'request_logs_fts'):
+        logger.info("✓ request_logs_fts table already exists")
+        return
+    
+    logger.info("Creating request_logs_fts table")
+    with engine.connect() as conn:
+        try:
+            conn.execute(text("""
+                CREATE VIRTUAL TABLE request_logs_fts
+                USING fts5(path, request_headers, request_body, response_body)
+            """))
+        except Exception as e:
+            logger.error(f"Could not create request_logs_fts (SQLite built without FTS5?): {e}")
+            return
+        if table_exists(engine, 'request_logs'):
+            if table_exists(engine, 'request_header_sets'):
+                headers = "COALESCE(l.request_headers, (SELECT h.headers FROM request_header_sets h WHERE h.hash = l.request_headers_hash))"
+            else:
+                headers = "l.request_headers"
+            conn.execute(text(f"""
+                INSERT INTO request_logs_fts (rowid, path, request_headers, request_body, response_body)
+                SELECT l.id, l.path, {headers}, l.request_body, l.response_body
+                FROM request_logs l
+            """))
+        conn.commit()
+    logger.info("✓ Created request_logs_fts table")
+
+
+def migrate_create_traffic_rollups_table(engine):
+    """
+    Migration: Create traffic_rollups table
+    - Creates the per-minute request counts table (entity, minute, endpoint, status class)
+    - Backfills it from existing request_logs in one GROUP BY pass, so dashboard totals
+      keep counting traffic logged before the upgrade
+    """
+    from backend.models import TrafficRollup
+    
+    if table_exists(engine, 'traffic_rollups'):
+        logger.info("✓ traffic_rollups table already exists")
+        return
+    
+    logger.info("Creating traffic_rollups table")
+    backfill = table_exists(engine, 'request_logs')
+    with engine.begin() as conn:
+        TrafficRollup.__table__.create(conn)
+        if backfill:
+            if engine.dialect.name == 'sqlite':
+                # Same text format SQLAlchemy writes for DateTime values on SQLite
+                minute = "strftime('%Y-%m-%d %H:%M:00.000000', timestamp)"
+            else:
+                minute = "date_trunc('minute', timestamp)"
+            conn.execute(text(f"""
+                INSERT INTO traffic_rollups (entity_id, minute, endpoint_id, status_class, count)
+                SELECT entity_id, {minute}, COALESCE(mock_endpoint_id, 0),
+                       COALESCE(response_code / 100, 0), COUNT(*)
+                FROM request_logs
+                WHERE entity_id IS NOT NULL AND timestamp IS NOT NULL
+                GROUP BY entity_id, {minute}, COALESCE(mock_endpoint_id, 0), COALESCE(response_code / 100, 0)
+            """))
+    logger.info("✓ Created traffic_rollups table")
+
+
+def migrate_add_request_log_timing_fields(engine):
+    """
+    Migration: Add timing and size fields to request_logs table
+    - Adds duration_ms (handler time until the log was queued)
+    - Adds request_size and response_size (body sizes in bytes)
+    Existing rows keep NULL; the endpoint_histograms table is created by create_all.
+    """
+    if not table_exists(engine, 'request_logs'):
+        logger.info("Request logs table doesn't exist yet, skipping migration")
+        return
+    
+    with engine.connect() as conn:
+        fields = [
+            ('duration_ms', 'DOUBLE PRECISION'),
+            ('request_size', 'INTEGER'),
+            ('response_size', 'INTEGER'),
+        ]
+        
+        for field_name, field_type in fields:
+            if not column_exists(engine, 'request_logs', field_name):
+                logger.info(f"Adding {field_name} column to request_logs table")
+                conn.execute(text(f"""
+                    ALTER TABLE request_logs 
+                    ADD COLUMN {field_name} {field_type}
+                """))
+                conn.commit()
+                logger.info(f"✓ Added {field_name} column")
+            else:
+                logger.info(f"✓ {field_name} column already exists")
+
+
+def migrate_add_entity_server_timing_field(engine):
+    """
+    Migration: Add server_timing_enabled to entities table
+    Existing entities keep Server-Timing headers off.
+    """
+    if not table_exists(engine, 'entities'):
+        logger.info("Entities table doesn't exist yet, skipping migration")
+        return
+    
+    with engine.connect() as conn:
+        if not column_exists(engine, 'entities', 'server_timing_enabled'):
+            logger.info("Adding server_timing_enabled column to entities table")
+            db_url = str(engine.url)
+            if 'sqlite' in db_url:
+                conn.execute(text("""
+                    ALTER TABLE entities 
+                    ADD COLUMN server_timing_enabled INTEGER DEFAULT 0 NOT NULL
+                """))
+            else:
+                conn.execute(text("""
+                    ALTER TABLE entities 
+                    ADD COLUMN server_timing_enabled BOOLEAN DEFAULT FALSE NOT NULL
+                """))
+            conn.commit()
+            logger.info("✓ Added server_timing_enabled column")
+        else:
+            logger.info("✓ server_timing_enabled column already exists")
@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Table
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Float, LargeBinary, Table, Index
+from sqlalchemy.orm import relationship, deferred
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from datetime import datetime
 from backend.database import Base
 import secrets
@@ -38,6 +39,16 @@ class Entity(Base):
     base_path = Column(String, unique=True, index=True)  # e.g., /api/entity123
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # Owner of the entity
     is_public = Column(Boolean, default=False)  # Public entities are visible to all
+    config_revision = Column(Integer, default=0, nullable=False)  # Bumped on every data-plane config change
+    # Request logging policy
+    log_level = Column(String, default="full")  # off | metadata | full | sampled
+    log_sample_rate = Column(Float, default=1.0)  # Fraction of requests logged when sampled
+    error_log_level = Column(String, default="full")  # Level for responses with status >= 400
+    # Request log retention (NULL = no limit)
+    log_retention_days = Column(Integer, nullable=True)
+    log_retention_max_rows = Column(Integer, nullable=True)
+    # Add Server-Timing headers to mock responses
+    server_timing_enabled = Column(Boolean, default=False, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationship with owner
@@ -46,6 +57,7 @@ class Entity(Base):
     users = relationship("User", secondary=user_entity_association, back_populates="entities")
     mock_endpoints = relationship("MockEndpoint", back_populates="entity", cascade="all, delete-orphan")
     request_logs = relationship("RequestLog", back_populates="entity", cascade="all, delete-orphan")
+    log_dictionaries = relationship("LogDictionary", cascade="all, delete-orphan")
 
 class MockEndpoint(Base):
     __tablename__ = "mock_endpoints"
@@ -77,6 +89,7 @@ class MockEndpoint(Base):
     # Schema validation
     request_schema = Column(Text, nullable=True)  # JSON Schema for request validation
     schema_validation_enabled = Column(Boolean, default=False)
+    config_revision = Column(Integer, default=0, nullable=False)  # Bumped on every config change
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -91,15 +104,74 @@ class RequestLog(Base):
     mock_endpoint_id = Column(Integer, ForeignKey("mock_endpoints.id"), nullable=True)
     method = Column(String)
     path = Column(String)
-    request_headers = Column(Text)  # JSON string
+    request_headers = Column(Text, nullable=True)  # JSON string (NULL for metadata-only or deduplicated logs)
+    request_headers_hash = Column(String, nullable=True, index=True)  # request_header_sets.hash
     request_body = Column(Text, nullable=True)
     query_params = Column(Text, nullable=True)  # JSON string
     response_code = Column(Integer)
     response_body = Column(Text, nullable=True)
+    # Compressed storage: when body_codec is set, request_headers, request_body and
+    # response_body are NULL and packed into compressed_payload instead
+    body_codec = Column(String, nullable=True)  # zlib | zstd
+    compressed_payload = Column(LargeBinary, nullable=True)
+    body_dictionary_id = Column(Integer, nullable=True)  # log_dictionaries.id for zstd with dictionary
     timestamp = Column(DateTime, default=datetime.utcnow, index=True)
+    # Handler time until the log was queued, and request / response body sizes in bytes
+    duration_ms = Column(Float, nullable=True)
+    request_size = Column(Integer, nullable=True)
+    response_size = Column(Integer, nullable=True)
+    # Full-text search document (PostgreSQL; always NULL on SQLite, which indexes logs in request_logs_fts)
+    search_vector = deferred(Column(Text().with_variant(TSVECTOR(), "postgresql"), nullable=True))
     
     entity = relationship("Entity", back_populates="request_logs")
     mock_endpoint = relationship("MockEndpoint", back_populates="request_logs")
+    
+    # Keyset pagination indexes (newest first per entity / per endpoint) and the search index
+    __table_args__ = (
+        Index("ix_request_logs_entity_timestamp_id", "entity_id", "timestamp", "id"),
+        Index("ix_request_logs_endpoint_timestamp_id", "mock_endpoint_id", "timestamp", "id"),
+        Index("ix_request_logs_search_vector", "search_vector", postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
+
+class RequestHeaderSet(Base):
+    """Distinct set of logged request headers, stored once and referenced by hash."""
+    __tablename__ = "request_header_sets"
+    
+    hash = Column(String, primary_key=True)
+    headers = Column(Text, nullable=False)  # Normalized JSON string
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class LogDictionary(Base):
+    """zstd dictionary trained from an entity's request logs (immutable once stored)."""
+    __tablename__ = "log_dictionaries"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    entity_id = Column(Integer, ForeignKey("entities.id"), index=True)
+    dictionary = Column(LargeBinary, nullable=False)
+    sample_count = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class TrafficRollup(Base):
+    """Requests served per (entity, endpoint, minute, status class), maintained by the ingestion path."""
+    __tablename__ = "traffic_rollups"
+    
+    # Key order (entity, minute, ...) keeps an entity's time range contiguous
+    entity_id = Column(Integer, primary_key=True)  # No FK: rows are removed explicitly with the entity
+    minute = Column(DateTime, primary_key=True, index=True)  # UTC, truncated to the minute
+    endpoint_id = Column(Integer, primary_key=True)  # 0 for requests that matched no endpoint
+    status_class = Column(Integer, primary_key=True)  # 2 = 2xx, 4 = 4xx, ...
+    count = Column(Integer, nullable=False, default=0)
+
+class EndpointHistogram(Base):
+    """Latency and size bucket counts per (entity, endpoint, hour, metric), see backend/histograms.py."""
+    __tablename__ = "endpoint_histograms"
+    
+    entity_id = Column(Integer, primary_key=True)  # No FK: rows are removed explicitly with the entity
+    endpoint_id = Column(Integer, primary_key=True)
+    hour = Column(DateTime, primary_key=True, index=True)  # UTC, truncated to the hour
+    metric = Column(String, primary_key=True)  # duration_ms | overhead_ms | ... (histograms.METRICS)
+    bucket = Column(Integer, primary_key=True)  # Index into the metric's bucket bounds
+    count = Column(Integer, nullable=False, default=0)
 
 class SessionToken(Base):
     __tablename__ = "session_tokens"
@@ -112,3 +184,38 @@ class SessionToken(Base):
     
     # Relationship with user
     user = relationship("User", foreign_keys=[user_id])
+
+class ConfigChange(Base):
+    """Change feed used by the polling config bus to invalidate caches on other replicas."""
+    __tablename__ = "config_changes"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)  # entity | endpoint
+    object_id = Column(Integer, nullable=False)
+    revision = Column(Integer, default=0, nullable=False)
+    deleted = Column(Boolean, default=False, nullable=False)
+    origin = Column(String, nullable=True)  # Instance id of the publishing replica
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+class LogJob(Base):
+    """Progress of a background log clearing job, readable from every replica."""
+    __tablename__ = "log_jobs"
+    
+    id = Column(String, primary_key=True)  # uuid4 hex
+    entity_id = Column(Integer, nullable=False, index=True)  # No FK: jobs outlive deleted entities
+    user_id = Column(Integer, nullable=True)  # User who started the job
+    kind = Column(String, nullable=False)  # clear
+    status = Column(String, nullable=False)  # pending | running | completed | failed
+    total = Column(Integer, nullable=True)
+    deleted = Column(Integer, default=0, nullable=False)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    finished_at = Column(DateTime, nullable=True)
+
+class MaintenanceLease(Base):
+    """Lease on a background task that must run on one replica at a time (databases without advisory locks)."""
+    __tablename__ = "maintenance_leases"
+    
+    name = Column(String, primary_key=True)  # e.g. log_retention
+    holder = Column(String, nullable=False)  # Instance id of the replica holding the lease
+    expires_at = Column(DateTime, nullable=False)
@@ -6,8 +6,59 @@ import re
 import uuid
 import random
 import string
+import threading
+from collections import OrderedDict
 from datetime import datetime, timezone
-from typing import Dict, Any, List, Callable
+from typing import Dict, Any, List, Callable, Tuple, Union
+
+# Pattern to match {{placeholder}} or {{placeholder:arg1:arg2}}
+PLACEHOLDER_PATTERN = re.compile(r'\{\{([a-zA-Z_][a-zA-Z0-9_]*(?::[^}]*)?)\}\}')
+
+# Number of compiled templates kept by the engine for ad-hoc replace_placeholders() calls
+TEMPLATE_CACHE_SIZE = 1024
+
+
+class PlaceholderCall:
+    """A placeholder bound to its handler with pre-parsed arguments."""
+    
+    __slots__ = ("handler", "args", "original")
+    
+    def __init__(self, handler: Callable, args: Tuple[str, ...], original: str):
+        self.handler = handler
+        self.args = args
+        self.original = original
+    
+    def __call__(self) -> str:
+        try:
+            return str(self.handler(*self.args))
+        except Exception:
+            # If handler fails, return the original placeholder
+            return self.original
+
+
+class CompiledTemplate:
+    """
+    A text parsed once into literal chunks and bound placeholder calls.
+    
+    Templates without known placeholders are flagged static and render to the
+    source text without any work.
+    """
+    
+    __slots__ = ("source", "segments", "is_static")
+    
+    def __init__(self, source: str, segments: List[Union[str, PlaceholderCall]]):
+        self.source = source
+        self.segments = tuple(segments)
+        self.is_static = not any(isinstance(segment, PlaceholderCall) for segment in segments)
+    
+    def render(self) -> str:
+        """Render the template with fresh dynamic values."""
+        if self.is_static:
+            return self.source
+        return "".join([
+            segment if segment.__class__ is str else segment()
+            for segment in self.segments
+        ])
 
 
 class PlaceholderEngine:
@@ -72,6 +123,66 @@ class PlaceholderEngine:
             "random_bool": self._generate_random_bool,
             "random_boolean": self._generate_random_bool,
         }
+        self._template_cache: "OrderedDict[str, CompiledTemplate]" = OrderedDict()
+        # Used from the event loop and from threadpool / callback executor threads
+        self._template_lock = threading.Lock()
+    
+    def compile(self, text: str) -> CompiledTemplate:
+        """
+        Parse text into a CompiledTemplate.
+        
+        Placeholder names are resolved to their handlers and arguments are split
+        once here instead of on every render. Unknown placeholders are kept as
+        literal text.
+        
+        Args:
+            text: String containing placeholders
+            
+        Returns:
+            CompiledTemplate ready to render
+        """
+        text = text or ""
+        segments: List[Union[str, PlaceholderCall]] = []
+        literal = []
+        position = 0
+        
+        for match in PLACEHOLDER_PATTERN.finditer(text):
+            literal.append(text[position:match.start()])
+            position = match.end()
+            
+            parts = match.group(1).split(':')
+            handler = self.handlers.get(parts[0])
+            if handler is None:
+                # Unknown placeholder, leave it as is
+                literal.append(match.group(0))
+                continue
+            
+            if any(literal):
+                segments.append("".join(literal))
+            literal = []
+            segments.append(PlaceholderCall(handler, tuple(parts[1:]), match.group(0)))
+        
+        literal.append(text[position:])
+        if any(literal):
+            segments.append("".join(literal))
+        
+        return CompiledTemplate(text, segments)
+    
+    def get_template(self, text: str) -> CompiledTemplate:
+        """Return a cached CompiledTemplate for text, compiling it on first use."""
+        with self._template_lock:
+            template = self._template_cache.get(text)
+            if template is not None:
+                self._template_cache.move_to_end(text)
+                return template
+        
+        # Compiled outside the lock; a concurrent compile of the same text just wins or loses the insert
+        template = self.compile(text)
+        with self._template_lock:
+            self._template_cache[text] = template
+            if len(self._template_cache) > TEMPLATE_CACHE_SIZE:
+                self._template_cache.popitem(last=False)
+        return template
     
     def replace_placeholders(self, text: str) -> str:
         """
@@ -86,27 +197,7 @@ class PlaceholderEngine:
         Returns:
             String with all placeholders replaced with dynamic values
         """
-        # Pattern to match {{placeholder}} or {{placeholder:arg1:arg2}}
-        pattern = r'\{\{([a-zA-Z_][a-zA-Z0-9_]*(?::[^}]*)?)\}\}'
-        
-        def replacer(match):
-            full_placeholder = match.group(1)
-            parts = full_placeholder.split(':')
-            placeholder_name = parts[0]
-            args = parts[1:] if len(parts) > 1 else []
-            
-            handler = self.handlers.get(placeholder_name)
-            if handler:
-                try:
-                    return str(handler(*args))
-                except Exception as e:
-                    # If handler fails, return the original placeholder
-                    return match.group(0)
-            else:
-                # Unknown placeholder, leave it as is
-                return match.group(0)
-        
-        return re.sub(pattern, replacer, text)
+        return self.get_template(text).render()
     
     # UUID Generators
     def _generate_uuid(self, *args) -> str:
@@ -225,3 +316,15 @@ def replace_placeholders(text: str) -> str:
         '{"id": "123e4567-e89b-12d3-a456-426614174000", "timestamp": 1634567890123}'
     """
     return placeholder_engine.replace_placeholders(text)
+
+
+def compile_template(text: str) -> CompiledTemplate:
+    """
+    Convenience function to compile text into a reusable template.
+    
+    Example:
+        >>> template = compile_template('{"id": "{{uuid}}"}')
+        >>> template.render()
+        '{"id": "f47ac10b-58cc-4372-a567-0e02b2c3d479"}'
+    """
+    return placeholder_engine.compile(text)
@@ -0,0 +1,56 @@
+"""
+Timing of a single mock request.
+
+handle_mock_request creates a RequestTiming when it starts and wraps each
+processing stage (route lookup, schema validation, placeholder rendering,
+the configured delay) in stage(). Durations are measured with perf_counter
+and kept in milliseconds.
+"""
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+# Stages reported in Server-Timing headers, in order (followed by total)
+SERVER_TIMING_STAGES = ("route", "validate", "render", "delay", "log_enqueue")
+
+
+class RequestTiming:
+    """Stage durations of one mock request."""
+
+    __slots__ = ("started", "stages", "configured_delay_ms")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        # Delay the selected scenario asked for (the applied delay is the "delay" stage)
+        self.configured_delay_ms = 0
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a block and add its duration to the named stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + (time.perf_counter() - start) * 1000
+
+    def elapsed_ms(self) -> float:
+        """Milliseconds since the request started."""
+        return (time.perf_counter() - self.started) * 1000
+
+    @property
+    def delay_ms(self) -> float:
+        """Delay actually applied, in milliseconds."""
+        return self.stages.get("delay", 0.0)
+
+    def server_timing(self) -> str:
+        """
+        Server-Timing header value, e.g. "route;dur=0.012, ..., total;dur=20.4".
+
+        Every stage is listed (dur=0 if it did not run), so clients can parse a fixed set.
+        """
+        entries = [
+            f"{name.replace('_', '-')};dur={self.stages.get(name, 0.0):.3f}" for name in SERVER_TIMING_STAGES
+        ]
+        entries.append(f"total;dur={self.elapsed_ms():.3f}")
+        return ", ".join(entries)
@@ -0,0 +1,316 @@
+"""
+Precompiled response plans for mock endpoints.
+Each endpoint config is decoded once per revision into an immutable plan, so the
+request path only has to pick a scenario and render it.
+"""
+import json
+import random
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+
+from backend.placeholders import CompiledTemplate, compile_template
+
+logger = logging.getLogger(__name__)
+
+SELECTION_MODES = ("fixed", "random", "weighted")
+
+
+def decode_response_body(text: str) -> Any:
+    """Parse a rendered response body as JSON, falling back to the raw string."""
+    try:
+        return json.loads(text)
+    except (TypeError, ValueError):
+        return text
+
+
+class PreencodedResponse(Response):
+    """Response whose body bytes and raw headers were encoded ahead of time."""
+
+    def __init__(self, status_code: int, body: bytes, raw_headers: List[Tuple[bytes, bytes]]):
+        self.status_code = status_code
+        self.body = body
+        self.background = None
+        # Copy so middleware appending headers never touches the shared list
+        self.raw_headers = list(raw_headers)
+
+
+class ScenarioPlan:
+    """Decoded response configuration for a single scenario (or the legacy single response)."""
+
+    __slots__ = (
+        "name", "response_code", "response_body", "headers", "delay_ms", "template",
+        "encoded_body", "raw_headers",
+    )
+
+    def __init__(self, name: str, response_code: int, response_body: str, headers: Dict[str, str], delay_ms: int):
+        self.name = name
+        self.response_code = response_code
+        self.response_body = response_body
+        self.headers = headers
+        self.delay_ms = delay_ms or 0
+        # Placeholder template compiled once per config revision
+        self.template: CompiledTemplate = compile_template(response_body)
+        # Final body bytes and headers for responses whose output never changes
+        self.encoded_body: Optional[bytes] = None
+        self.raw_headers: Optional[List[Tuple[bytes, bytes]]] = None
+        if self.template.is_static:
+            self._preencode()
+
+    def _preencode(self):
+        """Encode a static response exactly as JSONResponse would, once."""
+        try:
+            response = JSONResponse(
+                status_code=self.response_code,
+                content=decode_response_body(self.response_body),
+                headers=self.headers
+            )
+        except (TypeError, ValueError) as e:
+            # e.g. NaN in the body or non latin-1 header values; render per request instead
+            logger.warning(f"Could not pre-encode scenario '{self.name}': {e}")
+            return
+        self.encoded_body = response.body
+        self.raw_headers = response.raw_headers
+
+    def build_response(self, body_value: Any = None) -> Response:
+        """
+        Build the HTTP response for this scenario.
+
+        Args:
+            body_value: Decoded rendered body (ignored for pre-encoded scenarios)
+        """
+        if self.encoded_body is not None:
+            return PreencodedResponse(self.response_code, self.encoded_body, self.raw_headers)
+        return JSONResponse(status_code=self.response_code, content=body_value, headers=self.headers)
+
+
+class AliasSampler:
+    """
+    Vose's alias method for O(1) weighted sampling.
+
+    The tables are built once in O(n); each sample costs one random number,
+    one table lookup and one comparison regardless of the number of scenarios.
+    """
+
+    __slots__ = ("count", "prob", "alias")
+
+    def __init__(self, weights: List[float]):
+        count = len(weights)
+        total = float(sum(weights))
+        scaled = [w * count / total for w in weights]
+        prob = [0.0] * count
+        alias = list(range(count))
+
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            prob[less] = scaled[less]
+            alias[less] = more
+            scaled[more] = (scaled[more] + scaled[less]) - 1.0
+            if scaled[more] < 1.0:
+                small.append(more)
+            else:
+                large.append(more)
+        # Leftovers are 1.0 up to floating point error
+        for i in large + small:
+            prob[i] = 1.0
+
+        self.count = count
+        self.prob = tuple(prob)
+        self.alias = tuple(alias)
+
+    def sample(self) -> int:
+        """Return a weighted random index."""
+        r = random.random() * self.count
+        column = min(int(r), self.count - 1)
+        return column if (r - column) < self.prob[column] else self.alias[column]
+
+
+class ScenarioSampler:
+    """Picks a scenario index according to the endpoint's selection mode."""
+
+    __slots__ = ("mode", "count", "fixed_index", "alias_sampler")
+
+    def __init__(self, mode: str, count: int, fixed_index: int = 0, weights: Optional[List[float]] = None):
+        self.mode = mode
+        self.count = count
+        self.fixed_index = fixed_index
+        self.alias_sampler = AliasSampler(weights) if mode == "weighted" else None
+
+    def sample(self) -> int:
+        """Return the index of the scenario to serve."""
+        if self.mode == "random":
+            return random.randrange(0, self.count)
+        if self.mode == "weighted":
+            return self.alias_sampler.sample()
+        return self.fixed_index
+
+
+class ResponsePlan:
+    """
+    Immutable, fully decoded configuration of a mock endpoint.
+
+    Built once per endpoint config revision by compile_response_plan(). The only
+    mutable state is selection_counts, the per-scenario selection counter.
+    """
+
+    __slots__ = (
+        "endpoint_id", "entity_id", "revision",
+        "scenarios", "selection_mode", "weights", "sampler", "selection_counts",
+        "schema_validation_enabled", "request_schema",
+        "callback_enabled", "callback_url", "callback_method", "callback_delay_ms",
+        "callback_extract_from_request", "callback_extract_field", "callback_payload",
+        "callback_template",
+    )
+
+    def select(self) -> ScenarioPlan:
+        """Pick the scenario to serve for the current request."""
+        index = self.sampler.sample()
+        self.selection_counts[index] += 1
+        return self.scenarios[index]
+
+    def selection_stats(self) -> Dict[str, Any]:
+        """
+        Compare realized scenario selections with the configured distribution.
+
+        Counts are per process and reset whenever the endpoint config changes.
+        """
+        count = len(self.scenarios)
+        total = sum(self.selection_counts)
+        if self.selection_mode == "weighted":
+            weight_sum = sum(self.weights)
+            expected = [w / weight_sum for w in self.weights]
+        elif self.selection_mode == "random":
+            expected = [1.0 / count] * count
+        else:
+            expected = [1.0 if i == self.sampler.fixed_index else 0.0 for i in range(count)]
+
+        return {
+            "endpoint_id": self.endpoint_id,
+            "config_revision": self.revision,
+            "selection_mode": self.selection_mode,
+            "total_selections": total,
+            "scenarios": [
+                {
+                    "index": i,
+                    "name": scenario.name,
+                    "expected_ratio": expected[i],
+                    "selections": self.selection_counts[i],
+                    "realized_ratio": (self.selection_counts[i] / total) if total else 0.0,
+                }
+                for i, scenario in enumerate(self.scenarios)
+            ],
+        }
+
+
+def _load_json(value: Optional[str], default: Any, field: str, endpoint_id: int) -> Any:
+    """Decode a JSON column, falling back to default if it is empty or invalid."""
+    if not value:
+        return default
+    try:
+        return json.loads(value)
+    except (TypeError, ValueError):
+        logger.warning(f"Invalid JSON in {field} for endpoint {endpoint_id}, using default")
+        return default
+
+
+def normalize_weights(weights: Any, count: int) -> List[float]:
+    """
+    Normalize configured scenario weights.
+
+    Non-numeric and negative weights count as 0. Falls back to equal weights if the
+    list length does not match the number of scenarios or all weights are 0.
+
+    Args:
+        weights: Decoded scenario_weights value
+        count: Number of scenarios
+
+    Returns:
+        List of non-negative weights aligned with the scenarios
+    """
+    if not isinstance(weights, list) or len(weights) != count:
+        return [1.0] * count
+    cleaned = [float(w) if isinstance(w, (int, float)) and w >= 0 else 0.0 for w in weights]
+    if sum(cleaned) <= 0:
+        return [1.0] * count
+    return cleaned
+
+
+def compile_response_plan(endpoint) -> ResponsePlan:
+    """
+    Compile a MockEndpoint into a ResponsePlan.
+
+    Args:
+        endpoint: MockEndpoint model instance
+
+    Returns:
+        ResponsePlan holding the decoded scenarios, headers, delays and sampler
+    """
+    plan = ResponsePlan()
+    plan.endpoint_id = endpoint.id
+    plan.entity_id = endpoint.entity_id
+    plan.revision = endpoint.config_revision or 0
+
+    raw_scenarios = _load_json(endpoint.response_scenarios, [], "response_scenarios", endpoint.id)
+    if not isinstance(raw_scenarios, list):
+        raw_scenarios = []
+
+    if raw_scenarios:
+        scenarios = tuple(
+            ScenarioPlan(
+                name=s.get("name", ""),
+                response_code=s.get("response_code", 200),
+                response_body=s.get("response_body", ""),
+                headers=dict(s.get("response_headers") or {}),
+                delay_ms=s.get("delay_ms", 0),
+            )
+            for s in raw_scenarios
+        )
+        mode = endpoint.scenario_selection_mode or "fixed"
+        if mode not in SELECTION_MODES:
+            mode = "fixed"
+    else:
+        # Legacy single-response configuration
+        scenarios = (
+            ScenarioPlan(
+                name="default",
+                response_code=endpoint.response_code,
+                response_body=endpoint.response_body,
+                headers=_load_json(endpoint.response_headers, {}, "response_headers", endpoint.id),
+                delay_ms=endpoint.delay_ms,
+            ),
+        )
+        mode = "fixed"
+
+    count = len(scenarios)
+    active_index = endpoint.active_scenario_index or 0
+    fixed_index = active_index if 0 <= active_index < count else 0
+
+    weights = None
+    if mode == "weighted":
+        weights = normalize_weights(
+            _load_json(endpoint.scenario_weights, [], "scenario_weights", endpoint.id), count
+        )
+
+    plan.scenarios = scenarios
+    plan.selection_mode = mode
+    plan.weights = tuple(weights) if weights else None
+    plan.sampler = ScenarioSampler(mode, count, fixed_index, weights)
+    plan.selection_counts = [0] * count
+
+    plan.schema_validation_enabled = bool(endpoint.schema_validation_enabled)
+    plan.request_schema = endpoint.request_schema
+
+    plan.callback_enabled = bool(endpoint.callback_enabled)
+    plan.callback_url = endpoint.callback_url
+    plan.callback_method = endpoint.callback_method or "POST"
+    plan.callback_delay_ms = endpoint.callback_delay_ms or 0
+    plan.callback_extract_from_request = bool(endpoint.callback_extract_from_request)
+    plan.callback_extract_field = endpoint.callback_extract_field
+    plan.callback_payload = endpoint.callback_payload
+    plan.callback_template = compile_template(endpoint.callback_payload) if endpoint.callback_payload else None
+    return plan
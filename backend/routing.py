@@ -0,0 +1,374 @@
+"""
+In-memory routing index for dynamic mock endpoints.
+Resolves an incoming mock request to its entity and endpoint without touching the database.
+"""
+import re
+import threading
+import logging
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from backend.log_policy import DEFAULT_LOG_POLICY, LogPolicy
+from backend.response_plans import ResponsePlan, compile_response_plan
+
+logger = logging.getLogger(__name__)
+
+# Matches path parameters like {id} in endpoint paths
+PATH_PARAM_PATTERN = re.compile(r'\{[^}]+\}')
+
+# Characters that make a path behave as a regex (and therefore not a plain string match)
+REGEX_SPECIAL_CHARS = set('.^$*+?{}[]\\|()')
+
+
+@lru_cache(maxsize=4096)
+def compile_path_pattern(pattern: str) -> "re.Pattern":
+    """
+    Compile an endpoint path pattern like /users/{id} into an anchored regex.
+
+    Args:
+        pattern: Endpoint path pattern with optional {param} segments
+
+    Returns:
+        Compiled regular expression matching the full path
+    """
+    pattern_regex = PATH_PARAM_PATTERN.sub('[^/]+', pattern)
+    return re.compile(f"^{pattern_regex}$")
+
+
+def split_path(path: str) -> List[str]:
+    """Split a URL path into its segments (leading slash ignored)."""
+    return path.split('/')[1:] if path.startswith('/') else path.split('/')
+
+
+class EndpointRoute:
+    """Compiled matcher and response plan for a single active mock endpoint."""
+
+    __slots__ = ("id", "entity_id", "method", "path", "regex", "is_static", "revision", "plan")
+
+    def __init__(
+        self,
+        endpoint_id: int,
+        entity_id: int,
+        method: str,
+        path: str,
+        revision: int = 0,
+        plan: Optional[ResponsePlan] = None
+    ):
+        self.id = endpoint_id
+        self.entity_id = entity_id
+        self.method = method
+        self.path = path
+        self.revision = revision or 0
+        self.plan = plan
+        # Paths without parameters or regex metacharacters can be matched by plain lookup
+        self.is_static = not any(ch in REGEX_SPECIAL_CHARS for ch in path)
+        self.regex = None if self.is_static else compile_path_pattern(path)
+
+
+class EntityRoute:
+    """
+    Routing snapshot for one entity.
+
+    Endpoints are bucketed by HTTP method. Static paths resolve through a dict,
+    parameterized paths through precompiled regexes. When several endpoints match,
+    the one with the lowest id wins (same as the original database ordering).
+    """
+
+    def __init__(
+        self,
+        entity_id: int,
+        base_path: str,
+        endpoints: Optional[Dict[int, EndpointRoute]] = None,
+        revision: int = 0,
+        log_policy: LogPolicy = DEFAULT_LOG_POLICY,
+        server_timing: bool = False
+    ):
+        self.id = entity_id
+        self.base_path = base_path
+        self.revision = revision or 0
+        self.log_policy = log_policy
+        self.server_timing = server_timing
+        self.endpoints: Dict[int, EndpointRoute] = dict(endpoints or {})
+        self._static: Dict[str, Dict[str, EndpointRoute]] = {}
+        self._dynamic: Dict[str, List[EndpointRoute]] = {}
+
+        for route in sorted(self.endpoints.values(), key=lambda r: r.id):
+            if route.is_static:
+                # Keep the lowest id for duplicate method/path pairs
+                self._static.setdefault(route.method, {}).setdefault(route.path, route)
+            else:
+                self._dynamic.setdefault(route.method, []).append(route)
+
+    def with_endpoint(self, route: EndpointRoute) -> "EntityRoute":
+        """Return a copy of this snapshot with the given endpoint added or replaced."""
+        endpoints = dict(self.endpoints)
+        endpoints[route.id] = route
+        return EntityRoute(self.id, self.base_path, endpoints, self.revision, self.log_policy, self.server_timing)
+
+    def without_endpoint(self, endpoint_id: int) -> "EntityRoute":
+        """Return a copy of this snapshot with the given endpoint removed."""
+        endpoints = dict(self.endpoints)
+        endpoints.pop(endpoint_id, None)
+        return EntityRoute(self.id, self.base_path, endpoints, self.revision, self.log_policy, self.server_timing)
+
+    def with_entity(self, base_path: str, revision: int, log_policy: LogPolicy, server_timing: bool) -> "EntityRoute":
+        """Return a copy of this snapshot with updated entity settings."""
+        return EntityRoute(self.id, base_path, self.endpoints, revision, log_policy, server_timing)
+
+    def match(self, method: str, path: str) -> Optional[EndpointRoute]:
+        """Find the endpoint matching the given method and entity-relative path."""
+        static_bucket = self._static.get(method)
+        static_match = static_bucket.get(path) if static_bucket else None
+
+        for route in self._dynamic.get(method, ()):
+            if static_match is not None and route.id > static_match.id:
+                break
+            if route.regex.match(path):
+                return route
+
+        return static_match
+
+
+class _TrieNode:
+    """Node of the base path prefix trie."""
+
+    __slots__ = ("children", "entity_id")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.entity_id: Optional[int] = None
+
+
+class RouteTable:
+    """
+    Process-local routing index for the mock data plane.
+
+    Entities are indexed in a prefix trie keyed by base path segments; each entity
+    holds method-bucketed compiled matchers for its active endpoints. Snapshots are
+    replaced copy-on-write so lookups never need a lock or a database query.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entities: Dict[int, EntityRoute] = {}
+        self._root = _TrieNode()
+        self.loaded = False
+
+    # ==================== Loading ====================
+
+    def load(self, db):
+        """
+        (Re)build the whole table from the database.
+
+        Args:
+            db: SQLAlchemy session
+        """
+        from backend.models import Entity, MockEndpoint
+
+        endpoints_by_entity: Dict[int, Dict[int, EndpointRoute]] = {}
+        for endpoint in db.query(MockEndpoint).filter(MockEndpoint.is_active == True).all():
+            route = self._endpoint_route(endpoint)
+            endpoints_by_entity.setdefault(endpoint.entity_id, {})[endpoint.id] = route
+
+        entities = {
+            entity.id: EntityRoute(
+                entity.id, entity.base_path, endpoints_by_entity.get(entity.id), entity.config_revision,
+                LogPolicy.from_entity(entity), bool(entity.server_timing_enabled)
+            )
+            for entity in db.query(Entity).all()
+        }
+
+        with self._lock:
+            self._entities = entities
+            self._rebuild_trie()
+            self.loaded = True
+
+        logger.info(
+            f"Route table loaded: {len(entities)} entities, "
+            f"{sum(len(e.endpoints) for e in entities.values())} active endpoints"
+        )
+
+    def reload(self, session_factory):
+        """Rebuild the table using a fresh session (used when change notifications may have been lost)."""
+        db = session_factory()
+        try:
+            self.load(db)
+        finally:
+            db.close()
+
+    def ensure_loaded(self, db):
+        """Load the table on first use if startup did not already do it."""
+        if not self.loaded:
+            self.load(db)
+
+    def _rebuild_trie(self):
+        """Rebuild the base path trie from the entity snapshots. Caller holds the lock."""
+        root = _TrieNode()
+        for entity in self._entities.values():
+            if not entity.base_path:
+                continue
+            node = root
+            for segment in split_path(entity.base_path):
+                node = node.children.setdefault(segment, _TrieNode())
+            node.entity_id = entity.id
+        self._root = root
+
+    # ==================== Incremental Updates ====================
+
+    def sync_entity(self, entity):
+        """
+        Add or update an entity after it was created or modified.
+
+        Args:
+            entity: Entity model instance (committed)
+        """
+        with self._lock:
+            existing = self._entities.get(entity.id)
+            if existing is None:
+                self._entities[entity.id] = EntityRoute(
+                    entity.id, entity.base_path, revision=entity.config_revision,
+                    log_policy=LogPolicy.from_entity(entity), server_timing=bool(entity.server_timing_enabled)
+                )
+            else:
+                self._entities[entity.id] = existing.with_entity(
+                    entity.base_path, entity.config_revision, LogPolicy.from_entity(entity),
+                    bool(entity.server_timing_enabled)
+                )
+                if existing.base_path == entity.base_path:
+                    return
+            self._rebuild_trie()
+
+    def remove_entity(self, entity_id: int):
+        """Remove an entity and all of its endpoints."""
+        with self._lock:
+            if self._entities.pop(entity_id, None) is not None:
+                self._rebuild_trie()
+
+    def sync_endpoint(self, endpoint):
+        """
+        Add, update or drop an endpoint after it was created or modified.
+
+        Inactive endpoints are removed from the table.
+
+        Args:
+            endpoint: MockEndpoint model instance (committed)
+        """
+        with self._lock:
+            # The endpoint may have moved between entities; drop it everywhere first
+            self._drop_endpoint(endpoint.id, keep_entity_id=endpoint.entity_id)
+            entity = self._entities.get(endpoint.entity_id)
+            if entity is None:
+                return
+            if endpoint.is_active:
+                route = self._endpoint_route(endpoint)
+                self._entities[entity.id] = entity.with_endpoint(route)
+            elif endpoint.id in entity.endpoints:
+                self._entities[entity.id] = entity.without_endpoint(endpoint.id)
+
+    def remove_endpoint(self, endpoint_id: int):
+        """Remove an endpoint from the table."""
+        with self._lock:
+            self._drop_endpoint(endpoint_id)
+
+    def _drop_endpoint(self, endpoint_id: int, keep_entity_id: Optional[int] = None):
+        """Remove an endpoint from every entity except keep_entity_id. Caller holds the lock."""
+        for entity_id, entity in list(self._entities.items()):
+            if entity_id != keep_entity_id and endpoint_id in entity.endpoints:
+                self._entities[entity_id] = entity.without_endpoint(endpoint_id)
+
+    def _endpoint_route(self, endpoint) -> EndpointRoute:
+        """Build the compiled route and response plan for an endpoint model instance."""
+        return EndpointRoute(
+            endpoint.id, endpoint.entity_id, endpoint.method, endpoint.path, endpoint.config_revision,
+            plan=compile_response_plan(endpoint)
+        )
+
+    def find_endpoint(self, endpoint_id: int) -> Optional[EndpointRoute]:
+        """Find a cached endpoint route by id."""
+        for entity in list(self._entities.values()):
+            route = entity.endpoints.get(endpoint_id)
+            if route is not None:
+                return route
+        return None
+
+    # ==================== Cross-Replica Changes ====================
+
+    def apply_change(self, db, change):
+        """
+        Apply a config change published by another replica.
+
+        Changes whose revision is not newer than the cached one are ignored.
+
+        Args:
+            db: SQLAlchemy session
+            change: ConfigChange from the config bus
+        """
+        from backend.models import Entity, MockEndpoint
+
+        if change.kind == "entity":
+            if change.deleted:
+                self.remove_entity(change.object_id)
+                return
+            cached = self._entities.get(change.object_id)
+            if cached is not None and cached.revision >= change.revision:
+                return
+            entity = db.get(Entity, change.object_id)
+            if entity is None:
+                self.remove_entity(change.object_id)
+            else:
+                self.sync_entity(entity)
+
+        elif change.kind == "endpoint":
+            if change.deleted:
+                self.remove_endpoint(change.object_id)
+                return
+            cached = self.find_endpoint(change.object_id)
+            if cached is not None and cached.revision >= change.revision:
+                return
+            endpoint = db.get(MockEndpoint, change.object_id)
+            if endpoint is None:
+                self.remove_endpoint(change.object_id)
+                return
+            if endpoint.entity_id not in self._entities and endpoint.entity is not None:
+                self.sync_entity(endpoint.entity)
+            self.sync_endpoint(endpoint)
+
+    # ==================== Lookup ====================
+
+    def find_entity(self, full_path: str) -> Optional[EntityRoute]:
+        """Find the entity whose base path is the longest segment prefix of full_path."""
+        node = self._root
+        entities = self._entities
+        found = None
+        for segment in split_path(full_path):
+            node = node.children.get(segment)
+            if node is None:
+                break
+            if node.entity_id is not None:
+                found = node.entity_id
+        return entities.get(found) if found is not None else None
+
+    def resolve(self, method: str, full_path: str) -> Tuple[Optional[EntityRoute], Optional[EndpointRoute], str]:
+        """
+        Resolve a request to its entity and endpoint.
+
+        Args:
+            method: HTTP method of the request
+            full_path: Full request path (including the entity base path)
+
+        Returns:
+            Tuple of (entity_route, endpoint_route, endpoint_path)
+            - entity_route: None if no entity owns the path
+            - endpoint_route: None if no active endpoint matches
+            - endpoint_path: Path relative to the entity base path
+        """
+        entity = self.find_entity(full_path)
+        if entity is None:
+            return None, None, full_path
+
+        endpoint_path = full_path[len(entity.base_path):] or "/"
+        return entity, entity.match(method, endpoint_path), endpoint_path
+
+
+# Global instance
+route_table = RouteTable()
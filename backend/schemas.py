@@ -54,10 +54,25 @@ class ResponseScenario(BaseModel):
 class EntityCreate(BaseModel):
     name: str
     is_public: bool = False  # Default to private
+    # Request logging policy
+    log_level: str = Field("full", pattern="^(off|metadata|full|sampled)$")
+    log_sample_rate: float = Field(1.0, ge=0.0, le=1.0)
+    error_log_level: str = Field("full", pattern="^(off|metadata|full|sampled)$")
+    # Request log retention (None = no limit)
+    log_retention_days: Optional[int] = Field(None, ge=1)
+    log_retention_max_rows: Optional[int] = Field(None, ge=1)
+    # Add Server-Timing headers to mock responses
+    server_timing_enabled: bool = False
 
 class EntityUpdate(BaseModel):
     name: Optional[str] = None
     is_public: Optional[bool] = None
+    log_level: Optional[str] = Field(None, pattern="^(off|metadata|full|sampled)$")
+    log_sample_rate: Optional[float] = Field(None, ge=0.0, le=1.0)
+    error_log_level: Optional[str] = Field(None, pattern="^(off|metadata|full|sampled)$")
+    log_retention_days: Optional[int] = Field(None, ge=1)
+    log_retention_max_rows: Optional[int] = Field(None, ge=1)
+    server_timing_enabled: Optional[bool] = None
 
 class EntityResponse(BaseModel):
     id: int
@@ -66,6 +81,13 @@ class EntityResponse(BaseModel):
     base_path: str
     owner_id: Optional[int]
     is_public: bool
+    config_revision: int = 0
+    log_level: str = "full"
+    log_sample_rate: float = 1.0
+    error_log_level: str = "full"
+    log_retention_days: Optional[int] = None
+    log_retention_max_rows: Optional[int] = None
+    server_timing_enabled: bool = False
     created_at: datetime
     
     class Config:
@@ -149,12 +171,28 @@ class MockEndpointResponse(BaseModel):
     callback_payload: Optional[str]
     request_schema: Optional[str]
     schema_validation_enabled: bool
+    config_revision: int = 0
     created_at: datetime
     updated_at: datetime
     
     class Config:
         from_attributes = True
 
+# Scenario Selection Stats Schemas
+class ScenarioSelectionStat(BaseModel):
+    index: int
+    name: str
+    expected_ratio: float
+    selections: int
+    realized_ratio: float
+
+class ScenarioSelectionStatsResponse(BaseModel):
+    endpoint_id: int
+    config_revision: int
+    selection_mode: str
+    total_selections: int
+    scenarios: List[ScenarioSelectionStat]
+
 # Request Log Schemas
 class RequestLogResponse(BaseModel):
     id: int
@@ -162,12 +200,15 @@ class RequestLogResponse(BaseModel):
     mock_endpoint_id: Optional[int]
     method: str
     path: str
-    request_headers: str
+    request_headers: Optional[str]
     request_body: Optional[str]
     query_params: Optional[str]
     response_code: int
     response_body: Optional[str]
     timestamp: datetime
+    duration_ms: Optional[float] = None
+    request_size: Optional[int] = None
+    response_size: Optional[int] = None
     
     @field_serializer('timestamp')
     def serialize_timestamp(self, dt: datetime, _info):
@@ -179,6 +220,50 @@ class RequestLogResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class LogDeletionJobResponse(BaseModel):
+    job_id: str
+    entity_id: int
+    kind: str  # clear | age | max_rows
+    status: str  # pending | running | completed | failed
+    total: Optional[int]
+    deleted: int
+    progress: float
+    error: Optional[str]
+    created_at: str
+    finished_at: Optional[str]
+    message: Optional[str] = None
+
+class TrafficPointResponse(BaseModel):
+    timestamp: datetime
+    count: int
+    status_classes: Dict[str, int]  # e.g. {"2xx": 120, "5xx": 3}
+
+class TrafficSeriesResponse(BaseModel):
+    entity_id: int
+    bucket: str
+    since: datetime
+    until: datetime
+    total: int
+    points: List[TrafficPointResponse]
+
+class HistogramBucketResponse(BaseModel):
+    le: Optional[float]  # Upper bound (inclusive); None for values above the last bound
+    count: int
+
+class HistogramResponse(BaseModel):
+    unit: str  # ms | bytes
+    count: int
+    p50: Optional[float]
+    p95: Optional[float]
+    p99: Optional[float]
+    buckets: List[HistogramBucketResponse]
+
+class EndpointHistogramsResponse(BaseModel):
+    endpoint_id: int
+    since: datetime
+    until: datetime
+    metrics: Dict[str, HistogramResponse]  # duration_ms, overhead_ms, delay_ms, ...
+
 # Admin Dashboard Schemas
 class UserStatsResponse(BaseModel):
     id: int
@@ -0,0 +1,352 @@
+"""
+Per-minute traffic rollups.
+
+Every mock request is counted in memory by (entity, endpoint, minute, status class).
+The counters are added to traffic_rollups with one upsert every TRAFFIC_ROLLUP_FLUSH_MS,
+so replicas simply add up. Dashboard totals and entity traffic series read the
+rollups, whose size depends on active minutes and endpoints, not on request volume.
+Requests are counted whether or not the entity's log policy keeps a log row.
+
+The retention pass prunes rollups older than TRAFFIC_ROLLUP_RETENTION_DAYS and
+rollups of deleted entities (e.g. counts flushed by another replica after the delete).
+"""
+import os
+import asyncio
+import logging
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select
+
+logger = logging.getLogger(__name__)
+
+# How often counters are written to traffic_rollups
+TRAFFIC_ROLLUP_FLUSH_MS = int(os.getenv("TRAFFIC_ROLLUP_FLUSH_MS", "1000"))
+
+# Rollups (and endpoint histograms) older than this are pruned by the retention pass (0 = keep forever)
+TRAFFIC_ROLLUP_RETENTION_DAYS = int(os.getenv("TRAFFIC_ROLLUP_RETENTION_DAYS", "90"))
+
+# Largest number of points returned by one traffic series
+MAX_SERIES_POINTS = 10080
+
+BUCKETS = {
+    "minute": timedelta(minutes=1),
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+
+def minute_of(ts: datetime) -> datetime:
+    """Truncate a timestamp to its minute."""
+    return ts.replace(second=0, microsecond=0)
+
+
+def status_class(response_code: Optional[int]) -> int:
+    """First digit of a status code (0 if unknown)."""
+    return response_code // 100 if response_code else 0
+
+
+def status_class_label(value: int) -> str:
+    return f"{value}xx" if value else "other"
+
+
+class CounterRollup:
+    """
+    In-memory counters flushed periodically as increments to a rollup table.
+
+    Subclasses set key_columns (the table's primary key, in key tuple order, including
+    entity_id and endpoint_id) and time_column, implement model() and count keys with
+    _pending from the event loop. Each flush is one additive upsert, so counts from
+    several replicas add up.
+    """
+
+    key_columns: Tuple[str, ...] = ()
+    time_column = ""
+    name = "rollups"
+    # Prune rows of deleted endpoints too (not only of deleted entities)
+    prune_deleted_endpoints = False
+
+    def __init__(self, db_session_factory, flush_interval_ms: int = TRAFFIC_ROLLUP_FLUSH_MS):
+        self.db_session_factory = db_session_factory
+        self.flush_interval = flush_interval_ms / 1000.0
+        self._pending: Counter = Counter()
+        self._task: Optional[asyncio.Task] = None
+
+        # Counters
+        self.flushes = 0
+        self.failed = 0
+
+    def model(self):
+        raise NotImplementedError
+
+    # ==================== Lifecycle ====================
+
+    def start(self):
+        """Start periodic flushing. Must be called from the event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Started {self.name} (flush every {int(self.flush_interval * 1000)}ms)")
+
+    async def stop(self):
+        """Stop periodic flushing and write the remaining counters."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    # ==================== Writing ====================
+
+    async def flush(self):
+        """Write pending counters off the event loop; on failure they are kept for the next flush."""
+        if not self._pending:
+            return
+        counts, self._pending = self._pending, Counter()
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, self.write, counts)
+            self.flushes += 1
+        except Exception as e:
+            self.failed += 1
+            self._pending.update(counts)
+            logger.error(f"Failed to write {len(counts)} {self.name}: {e}")
+
+    def forget(self, entity_id: int, endpoint_id: Optional[int] = None):
+        """
+        Drop pending counts of a deleted entity or endpoint, so they are never flushed.
+
+        May be called from any thread.
+
+        Args:
+            entity_id: Deleted entity, or entity of the deleted endpoint
+            endpoint_id: Deleted endpoint (None for all endpoints of the entity)
+        """
+        entity_index = self.key_columns.index("entity_id")
+        endpoint_index = self.key_columns.index("endpoint_id")
+        pending = self._pending
+        # Copy: the event loop keeps counting while we iterate
+        for key in list(pending):
+            if key[entity_index] == entity_id and (endpoint_id is None or key[endpoint_index] == endpoint_id):
+                pending.pop(key, None)
+
+    def prune(self, before: Optional[datetime]) -> int:
+        """
+        Delete rows older than a cutoff and rows of deleted entities (or endpoints).
+
+        Args:
+            before: Delete rows whose time column is before this (None keeps old rows)
+
+        Returns:
+            Number of rows deleted
+        """
+        from backend.models import Entity, MockEndpoint
+
+        model = self.model()
+        db = self.db_session_factory()
+        try:
+            count = db.query(model).filter(
+                ~model.entity_id.in_(select(Entity.id))
+            ).delete(synchronize_session=False)
+            if self.prune_deleted_endpoints:
+                count += db.query(model).filter(
+                    ~model.endpoint_id.in_(select(MockEndpoint.id))
+                ).delete(synchronize_session=False)
+            if before is not None:
+                count += db.query(model).filter(
+                    getattr(model, self.time_column) < before
+                ).delete(synchronize_session=False)
+            db.commit()
+            return count
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def write(self, counts: Dict[tuple, int]):
+        """
+        Add counts to the rollup table in one transaction.
+
+        Args:
+            counts: Count per key tuple (values of key_columns)
+        """
+        model = self.model()
+        values = [{**dict(zip(self.key_columns, key)), "count": count} for key, count in counts.items()]
+        db = self.db_session_factory()
+        try:
+            dialect = db.get_bind().dialect.name
+            if dialect in ("sqlite", "postgresql"):
+                if dialect == "sqlite":
+                    from sqlalchemy.dialects.sqlite import insert
+                else:
+                    from sqlalchemy.dialects.postgresql import insert
+                stmt = insert(model)
+                db.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=list(self.key_columns),
+                        set_={"count": model.count + stmt.excluded.count}
+                    ),
+                    values
+                )
+            else:
+                for value in values:
+                    updated = db.query(model).filter(
+                        *(getattr(model, column) == value[column] for column in self.key_columns)
+                    ).update({"count": model.count + value["count"]}, synchronize_session=False)
+                    if not updated:
+                        db.add(model(**value))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+class TrafficRollups(CounterRollup):
+    """Request counts per (entity, minute, endpoint, status class) in traffic_rollups."""
+
+    key_columns = ("entity_id", "minute", "endpoint_id", "status_class")
+    time_column = "minute"
+    name = "traffic rollups"
+
+    def model(self):
+        from backend.models import TrafficRollup
+        return TrafficRollup
+
+    def record(self, entity_id: int, endpoint_id: Optional[int], response_code: Optional[int], timestamp: Optional[datetime] = None):
+        """
+        Count one served request (event loop only; no I/O).
+
+        Args:
+            entity_id: Entity the request was routed to
+            endpoint_id: Matched mock endpoint (None if no endpoint matched)
+            response_code: HTTP status returned
+            timestamp: Time of the request (UTC now if None)
+        """
+        key = (entity_id, minute_of(timestamp or datetime.utcnow()), endpoint_id or 0, status_class(response_code))
+        self._pending[key] += 1
+
+
+# ==================== Queries ====================
+
+def total_requests(db, since: Optional[datetime] = None) -> int:
+    """Requests served by all entities (since the given time, if any)."""
+    from backend.models import TrafficRollup
+
+    query = db.query(func.coalesce(func.sum(TrafficRollup.count), 0))
+    if since is not None:
+        query = query.filter(TrafficRollup.minute >= minute_of(since))
+    return query.scalar()
+
+
+def requests_by_entity(db) -> Dict[int, Dict[str, Any]]:
+    """Requests served and minute of the latest request per entity id."""
+    from backend.models import TrafficRollup
+
+    rows = db.query(
+        TrafficRollup.entity_id, func.sum(TrafficRollup.count), func.max(TrafficRollup.minute)
+    ).group_by(TrafficRollup.entity_id).all()
+    return {
+        entity_id: {"request_count": count, "last_request_at": last_minute}
+        for entity_id, count, last_minute in rows
+    }
+
+
+def traffic_series(
+    db,
+    entity_id: int,
+    since: datetime,
+    until: datetime,
+    bucket: str = "minute",
+    endpoint_id: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Requests of an entity per time bucket, split by status class.
+
+    Args:
+        db: SQLAlchemy session
+        entity_id: Entity id
+        since: Start of the range (UTC, inclusive)
+        until: End of the range (UTC, exclusive)
+        bucket: minute | hour | day
+        endpoint_id: Only count this endpoint (0 = requests that matched no endpoint)
+
+    Returns:
+        One point per bucket, oldest first, including empty buckets:
+        {"timestamp", "count", "status_classes": {"2xx": n, ...}}
+
+    Raises:
+        ValueError: If the bucket is unknown or the range has too many buckets
+    """
+    from backend.models import TrafficRollup
+
+    if bucket not in BUCKETS:
+        raise ValueError(f"Unknown bucket '{bucket}'")
+    step = BUCKETS[bucket]
+    start = bucket_start(since, bucket)
+    if until <= start:
+        raise ValueError("until must be after since")
+    if (until - start) / step > MAX_SERIES_POINTS:
+        raise ValueError(f"Range spans more than {MAX_SERIES_POINTS} {bucket} buckets")
+
+    query = db.query(
+        TrafficRollup.minute, TrafficRollup.status_class, func.sum(TrafficRollup.count)
+    ).filter(
+        TrafficRollup.entity_id == entity_id,
+        TrafficRollup.minute >= start,
+        TrafficRollup.minute < until
+    )
+    if endpoint_id is not None:
+        query = query.filter(TrafficRollup.endpoint_id == endpoint_id)
+    rows = query.group_by(TrafficRollup.minute, TrafficRollup.status_class).all()
+
+    buckets: Dict[datetime, Counter] = defaultdict(Counter)
+    for minute, cls, count in rows:
+        buckets[bucket_start(minute, bucket)][status_class_label(cls)] += count
+
+    points = []
+    current = start
+    while current < until:
+        classes = buckets.get(current, Counter())
+        points.append({"timestamp": current, "count": sum(classes.values()), "status_classes": dict(classes)})
+        current += step
+    return points
+
+
+def bucket_start(ts: datetime, bucket: str) -> datetime:
+    """Start of the bucket containing ts."""
+    ts = minute_of(ts)
+    if bucket == "hour":
+        return ts.replace(minute=0)
+    if bucket == "day":
+        return ts.replace(hour=0, minute=0)
+    return ts
+
+
+def delete_entity_rollups(db, entity_id: int):
+    """Delete the rollups of an entity (caller commits)."""
+    from backend.models import TrafficRollup
+
+    db.query(TrafficRollup).filter(TrafficRollup.entity_id == entity_id).delete(synchronize_session=False)
+
+
+# Global rollups instance
+_traffic_rollups: Optional[TrafficRollups] = None
+
+
+def get_traffic_rollups(db_session_factory=None) -> TrafficRollups:
+    """Get or create the global traffic rollups."""
+    global _traffic_rollups
+
+    if _traffic_rollups is None:
+        if db_session_factory is None:
+            from backend.database import SessionLocal
+            db_session_factory = SessionLocal
+        _traffic_rollups = TrafficRollups(db_session_factory)
+    return _traffic_rollups
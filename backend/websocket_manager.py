@@ -0,0 +1,220 @@
+"""
+Live log WebSocket connections and broadcasts.
+
+Each connection has a bounded send queue drained by its own writer task, so a
+slow viewer only delays itself. A broadcast encodes its message to text once
+and appends it to the queue of every viewer of the entity without awaiting
+any socket. When a queue is full the slow-consumer policy decides:
+
+- drop_oldest: discard the oldest queued frame to make room
+- coalesce: discard new frames until the queue has drained, then send one
+  {"type": "logs_skipped", "count": N} frame in their place
+- disconnect: close the connection (code 1013, try again later)
+"""
+import os
+import json
+import asyncio
+import logging
+from collections import Counter, deque
+from typing import Callable, Deque, Dict, List, Optional, Set
+
+from fastapi import WebSocket
+
+logger = logging.getLogger(__name__)
+
+# Frames queued per connection before the slow-consumer policy applies. A log writer
+# flush broadcasts its whole batch at once, so keep this above LOG_BATCH_SIZE
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "1024"))
+
+# What to do when a connection's queue is full: drop_oldest | coalesce | disconnect
+WS_SLOW_CONSUMER_POLICY = os.getenv("WS_SLOW_CONSUMER_POLICY", "drop_oldest").lower()
+
+# Time allowed for the close handshake of a disconnected slow consumer
+WS_CLOSE_TIMEOUT_SECONDS = float(os.getenv("WS_CLOSE_TIMEOUT_SECONDS", "5"))
+
+SLOW_CONSUMER_POLICIES = ("drop_oldest", "coalesce", "disconnect")
+
+# Close code for slow consumers (1013: try again later)
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+class Connection:
+    """One WebSocket viewer: its send queue and writer task."""
+
+    def __init__(self, manager: "ConnectionManager", websocket: WebSocket, entity_id: int):
+        self.manager = manager
+        self.websocket = websocket
+        self.entity_id = entity_id
+        self.frames: Deque[str] = deque()
+        # Frames discarded by the coalesce policy since the last logs_skipped frame
+        self.skipped = 0
+        self.closed = False
+        self._wakeup = asyncio.Event()
+        self._writer = asyncio.create_task(self._write())
+
+    def send_json(self, message: dict):
+        """Queue a message for this connection only (no await)."""
+        self.send_text(json.dumps(message))
+
+    def send_text(self, text: str):
+        """Queue an encoded frame, applying the slow-consumer policy if the queue is full."""
+        if self.closed:
+            return
+        if self.skipped:
+            # Coalescing: keep discarding until the backlog has been sent
+            self.skipped += 1
+            self.manager.dropped["coalesced"] += 1
+            return
+        if len(self.frames) >= self.manager.queue_size:
+            policy = self.manager.policy
+            if policy == "disconnect":
+                self.manager.dropped["disconnected"] += len(self.frames) + 1
+                self.manager.slow_consumer_disconnects += 1
+                self.close(SLOW_CONSUMER_CLOSE_CODE, "Slow consumer")
+                return
+            if policy == "coalesce":
+                self.skipped = 1
+                self.manager.dropped["coalesced"] += 1
+                return
+            self.frames.popleft()
+            self.manager.dropped["dropped_oldest"] += 1
+        self.frames.append(text)
+        self._wakeup.set()
+
+    async def _write(self):
+        """Send queued frames in order until the connection closes."""
+        try:
+            while True:
+                if self.frames:
+                    text = self.frames.popleft()
+                elif self.skipped:
+                    text = json.dumps({"type": "logs_skipped", "count": self.skipped})
+                    self.skipped = 0
+                else:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                await self.websocket.send_text(text)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.debug(f"WebSocket send failed for entity {self.entity_id}: {e}")
+            self.manager.disconnect(self)
+
+    def close(self, code: int, reason: str):
+        """Stop the writer, drop queued frames and close the socket in the background."""
+        if self.closed:
+            return
+        self.manager.disconnect(self)
+        asyncio.create_task(self._close(code, reason))
+
+    async def _close(self, code: int, reason: str):
+        try:
+            await asyncio.wait_for(self.websocket.close(code=code, reason=reason), WS_CLOSE_TIMEOUT_SECONDS)
+        except Exception:
+            pass
+
+    def stop(self):
+        self.closed = True
+        self.frames.clear()
+        self.skipped = 0
+        if self._writer is not asyncio.current_task():
+            self._writer.cancel()
+
+
+class ConnectionManager:
+    """Live log viewers per entity."""
+
+    def __init__(self, queue_size: int = WS_SEND_QUEUE_SIZE, policy: str = WS_SLOW_CONSUMER_POLICY):
+        if policy not in SLOW_CONSUMER_POLICIES:
+            logger.warning(f"Unknown WebSocket slow consumer policy '{policy}', using 'drop_oldest'")
+            policy = "drop_oldest"
+
+        self.queue_size = queue_size
+        self.policy = policy
+        # entity_id -> connections
+        self.active_connections: Dict[int, Set[Connection]] = {}
+
+        # Counters
+        self.broadcasts = 0
+        # Frames not delivered, per reason: dropped_oldest | coalesced | disconnected
+        self.dropped: Counter = Counter()
+        self.slow_consumer_disconnects = 0
+
+        self._watch_listeners: List[Callable[[int, bool], None]] = []
+
+    def add_watch_listener(self, listener: Callable[[int, bool], None]):
+        """Call listener(entity_id, True) when an entity gets its first viewer and (entity_id, False) after its last."""
+        self._watch_listeners.append(listener)
+
+    def _notify_watch(self, entity_id: int, watching: bool):
+        for listener in self._watch_listeners:
+            try:
+                listener(entity_id, watching)
+            except Exception as e:
+                logger.error(f"WebSocket watch listener failed: {e}")
+
+    def connection_count(self) -> int:
+        return sum(len(connections) for connections in self.active_connections.values())
+
+    @property
+    def pending_broadcasts(self) -> int:
+        """Frames queued on all connections and not sent yet."""
+        return sum(len(connection.frames) for connections in self.active_connections.values() for connection in connections)
+
+    def max_queue_depth(self) -> int:
+        """Frames queued on the most backed-up connection."""
+        return max(
+            (len(connection.frames) for connections in self.active_connections.values() for connection in connections),
+            default=0
+        )
+
+    async def connect(self, websocket: WebSocket, entity_id: int) -> Connection:
+        await websocket.accept()
+        connection = Connection(self, websocket, entity_id)
+        if entity_id not in self.active_connections:
+            self.active_connections[entity_id] = set()
+            self._notify_watch(entity_id, True)
+        self.active_connections[entity_id].add(connection)
+        return connection
+
+    def disconnect(self, connection: Connection):
+        connection.stop()
+        connections = self.active_connections.get(connection.entity_id)
+        if connections is not None:
+            connections.discard(connection)
+            if not connections:
+                del self.active_connections[connection.entity_id]
+                self._notify_watch(connection.entity_id, False)
+
+    def schedule_broadcast(self, entity_id: int, message: dict):
+        """
+        Queue a message for every viewer of an entity (fire and forget).
+
+        The message is encoded once; the writer tasks send it.
+        """
+        if entity_id in self.active_connections:
+            self.broadcast_text(entity_id, json.dumps(message))
+
+    def broadcast_text(self, entity_id: int, text: str):
+        """Queue an encoded message for every viewer of an entity."""
+        connections = self.active_connections.get(entity_id)
+        if not connections:
+            return
+        self.broadcasts += 1
+        # Copy: the disconnect policy removes connections while iterating
+        for connection in list(connections):
+            connection.send_text(text)
+
+
+# Global manager instance
+_manager: Optional[ConnectionManager] = None
+
+
+def get_connection_manager() -> ConnectionManager:
+    """Get or create the global WebSocket connection manager."""
+    global _manager
+
+    if _manager is None:
+        _manager = ConnectionManager()
+    return _manager
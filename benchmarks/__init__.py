@@ -0,0 +1,9 @@
+"""
+Benchmarks for Mock-Lab.
+
+Run a benchmark as a module from the repository root, e.g.:
+    python -m benchmarks.log_compression
+
+The data plane benchmarks (micro, load) save and compare JSON baselines
+through benchmarks/harness.py.
+"""
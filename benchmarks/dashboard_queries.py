@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Admin dashboard query benchmark.
+
+Seeds a throwaway SQLite database with N users, their entities, endpoints,
+request logs and traffic rollups, then runs the dashboard listings of
+backend/dashboard_stats.py, counting the SQL statements each one executes. The count must not depend on
+the amount of data, so every listing is run at two scales and the counts are
+asserted to be equal (and to match the expected constant).
+
+Usage:
+    python -m benchmarks.dashboard_queries [--users 200] [--entities-per-user 5] [--logs-per-entity 20]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Tuple
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base
+from backend.models import User, Entity, MockEndpoint, RequestLog, TrafficRollup, user_entity_association
+from backend.dashboard_stats import user_stats, collection_stats
+
+# Statements each listing is expected to run, whatever the data size
+EXPECTED_QUERIES = {
+    "users": 5,
+    "collections": 3,
+}
+
+LISTINGS: Dict[str, Callable] = {
+    "users": user_stats,
+    "collections": collection_stats,
+}
+
+
+def seed(engine, users: int, entities_per_user: int, endpoints_per_entity: int, logs_per_entity: int):
+    """Bulk insert the fixture. Every user also gets one entity of the next user shared with them."""
+    now = datetime.utcnow()
+    entity_count = users * entities_per_user
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": u, "email": f"user{u}@example.com", "username": f"user{u}",
+             "hashed_password": "x", "is_admin": u == 1, "created_at": now}
+            for u in range(1, users + 1)
+        ])
+        conn.execute(insert(Entity), [
+            {"id": e, "name": f"entity{e}", "base_path": f"/api/entity{e}", "api_key": f"key{e}",
+             "owner_id": (e - 1) // entities_per_user + 1, "is_public": e % 2 == 0, "created_at": now}
+            for e in range(1, entity_count + 1)
+        ])
+        conn.execute(insert(user_entity_association), [
+            {"user_id": u, "entity_id": (u % users) * entities_per_user + 1}
+            for u in range(1, users + 1)
+        ])
+        conn.execute(insert(MockEndpoint), [
+            {"entity_id": e, "name": f"ep{i}", "method": "GET", "path": f"/items/{i}",
+             "response_code": 200, "response_body": "{}"}
+            for e in range(1, entity_count + 1) for i in range(endpoints_per_entity)
+        ])
+        for e in range(1, entity_count + 1):
+            conn.execute(insert(RequestLog), [
+                {"entity_id": e, "method": "GET", "path": f"/items/{i % 10}", "response_code": 200,
+                 "timestamp": now - timedelta(minutes=i)}
+                for i in range(logs_per_entity)
+            ])
+            conn.execute(insert(TrafficRollup), [
+                {"entity_id": e, "minute": (now - timedelta(minutes=i)).replace(second=0, microsecond=0),
+                 "endpoint_id": 0, "status_class": 2, "count": 1}
+                for i in range(logs_per_entity)
+            ])
+
+
+def run(database_path: str, scale: int, args) -> Dict[str, Tuple[int, float, int]]:
+    """Seed a database at the given scale and run every listing. Returns name -> (queries, seconds, rows)."""
+    engine = create_engine(f"sqlite:///{database_path}")
+    Base.metadata.create_all(engine)
+    seed(engine, args.users * scale, args.entities_per_user, args.endpoints_per_entity, args.logs_per_entity)
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *a, **kw: statements.append(a[2]))
+
+    results = {}
+    Session = sessionmaker(bind=engine)
+    for name, listing in LISTINGS.items():
+        db = Session()
+        try:
+            statements.clear()
+            start = time.perf_counter()
+            rows = listing(db)
+            results[name] = (len(statements), time.perf_counter() - start, len(rows))
+        finally:
+            db.close()
+    engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count and time admin dashboard queries")
+    parser.add_argument("--users", type=int, default=200, help="Users at the small scale")
+    parser.add_argument("--entities-per-user", type=int, default=5)
+    parser.add_argument("--endpoints-per-entity", type=int, default=3)
+    parser.add_argument("--logs-per-entity", type=int, default=20)
+    parser.add_argument("--scale", type=int, default=10, help="Multiplier of users for the large run")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        small = run(os.path.join(directory, "small.db"), 1, args)
+        large = run(os.path.join(directory, "large.db"), args.scale, args)
+
+    failed = False
+    print(f"{'listing':<14}{'rows':>8}{'queries':>9}{'ms':>10}{'rows':>10}{'queries':>9}{'ms':>10}")
+    for name in LISTINGS:
+        small_queries, small_time, small_rows = small[name]
+        large_queries, large_time, large_rows = large[name]
+        print(
+            f"{name:<14}{small_rows:>8}{small_queries:>9}{small_time * 1000:>10.1f}"
+            f"{large_rows:>10}{large_queries:>9}{large_time * 1000:>10.1f}"
+        )
+        if not small_queries == large_queries == EXPECTED_QUERIES[name]:
+            print(
+                f"FAIL: {name} ran {small_queries} / {large_queries} queries, "
+                f"expected {EXPECTED_QUERIES[name]}", file=sys.stderr
+            )
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,40 @@
+"""
+Request and endpoint payloads shared by the data plane benchmarks.
+"""
+import json
+
+TEMPLATE = json.dumps({
+    "id": "{{uuid}}",
+    "created_at": "{{timestamp_iso}}",
+    "customer": {"name": "{{random_name}}", "email": "{{random_email}}"},
+    "total": "{{random_float:1:500}}",
+    "items": [{"sku": "SKU-{{random_int:1:999}}", "quantity": "{{random_int:1:5}}"}],
+    "status": "confirmed",
+})
+
+SCHEMA = json.dumps({
+    "type": "object",
+    "required": ["order_id", "items"],
+    "properties": {
+        "order_id": {"type": "string"},
+        "items": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "required": ["sku", "quantity"],
+                "properties": {"sku": {"type": "string"}, "quantity": {"type": "integer", "minimum": 1}},
+            },
+        },
+    },
+})
+VALID_ORDER = {"order_id": "ORD-1", "items": [{"sku": "SKU-1", "quantity": 2}, {"sku": "SKU-2", "quantity": 1}]}
+INVALID_ORDER = {"order_id": "ORD-1", "items": [{"sku": "SKU-1", "quantity": 0}]}
+
+HEADERS = {
+    "host": "mocklab.example.com",
+    "user-agent": "python-httpx/0.25.0",
+    "accept": "application/json",
+    "content-type": "application/json",
+    "x-request-id": "0b6f2a8e-3c1d-4f5e-9a7b-2d4c6e8f0a1b",
+    "authorization": "Bearer " + "x" * 40,
+}
@@ -0,0 +1,159 @@
+"""
+Shared helpers for the data plane benchmarks: a scratch database, timing,
+percentiles and JSON baselines.
+
+A baseline file holds the results of one benchmark run:
+
+    {"benchmark": "micro", "created_at": "...", "python": "3.11.4", "platform": "...",
+     "results": {"match_path/param": {"us_per_op": 0.52}, ...}}
+
+compare() reports every metric that got worse than the baseline by more than
+the tolerance. Baselines depend on the machine, so compare runs from the same host.
+"""
+import os
+import sys
+import json
+import math
+import time
+import platform
+import tempfile
+import argparse
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Sequence
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+# Metrics where a larger value is better; every other metric is a cost
+HIGHER_IS_BETTER = {"rps"}
+
+Results = Dict[str, Dict[str, float]]
+
+
+def use_scratch_database() -> str:
+    """
+    Point DATABASE_URL at a throwaway SQLite file. Must run before backend modules are imported.
+
+    Returns:
+        Path of the database file
+    """
+    path = os.path.join(tempfile.mkdtemp(prefix="mocklab-bench-"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    return path
+
+
+def time_per_op(fn: Callable[[], object], repeat: int = 5, min_time: float = 0.2) -> float:
+    """
+    Microseconds per call of fn: the fastest of `repeat` rounds, each long enough to be measurable.
+
+    Args:
+        fn: Function under test (no arguments)
+        repeat: Number of timed rounds
+        min_time: Minimum duration of a round in seconds
+    """
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / 10:
+            break
+        loops *= 10
+    loops = max(1, int(loops * (min_time / max(elapsed, 1e-9))))
+
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        best = min(best, time.perf_counter() - start)
+    return best / loops * 1e6
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list (q between 0 and 1)."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+# ==================== Baselines ====================
+
+def add_baseline_arguments(parser: argparse.ArgumentParser, benchmark: str):
+    default = os.path.join(BASELINE_DIR, f"{benchmark}.json")
+    parser.add_argument("--baseline", default=default, help=f"Baseline file (default: {default})")
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="Allowed relative regression before failing (default: 0.15)")
+
+
+def save_baseline(path: str, benchmark: str, results: Results):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({
+            "benchmark": benchmark,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "results": results,
+        }, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def load_baseline(path: str) -> Optional[Results]:
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def compare(baseline: Results, results: Results, tolerance: float) -> List[str]:
+    """
+    Print each metric next to its baseline and list the regressions.
+
+    Returns:
+        One message per metric worse than the baseline by more than tolerance
+    """
+    regressions = []
+    print(f"\n{'metric':<40}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            reference = baseline.get(name, {}).get(metric)
+            if not reference:
+                print(f"{name + ' ' + metric:<40}{'-':>12}{value:>12.2f}{'new':>10}")
+                continue
+            change = (value - reference) / reference
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            flag = " !" if worse > tolerance else ""
+            print(f"{name + ' ' + metric:<40}{reference:>12.2f}{value:>12.2f}{change:>+10.1%}{flag}")
+            if worse > tolerance:
+                regressions.append(f"{name} {metric}: {reference:.2f} -> {value:.2f} ({change:+.1%})")
+    return regressions
+
+
+def finish(args, benchmark: str, results: Results) -> int:
+    """
+    Save or compare against the baseline as requested on the command line.
+
+    Returns:
+        Process exit code (1 if a metric regressed beyond the tolerance)
+    """
+    if args.save_baseline:
+        save_baseline(args.baseline, benchmark, results)
+        print(f"\nSaved baseline to {args.baseline}")
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+
+    regressions = compare(baseline, results, args.tolerance)
+    if regressions:
+        print(f"\nFAIL: {len(regressions)} regression(s) beyond {args.tolerance:.0%}:", file=sys.stderr)
+        for message in regressions:
+            print(f"  {message}", file=sys.stderr)
+        return 1
+    print(f"\nOK: no regression beyond {args.tolerance:.0%}")
+    return 0
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Load test of the mock data plane.
+
+Seeds a throwaway SQLite database with N entities of four endpoints each
+(static, path parameters, placeholder template, schema validated POST), starts
+the app in process and drives concurrent mock requests through httpx's ASGI
+transport, so the numbers measure the application rather than the network.
+Request logging, rollups and histograms run as in production.
+
+Reports throughput (rps), latency percentiles (p50/p95/p99/max in ms) and the
+number of unexpected responses, and compares them against a JSON baseline
+(see benchmarks/harness.py).
+
+Usage:
+    python -m benchmarks.load [--entities 50] [--concurrency 32] [--requests 5000]
+                              [--save-baseline] [--baseline PATH] [--tolerance 0.15]
+"""
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+from typing import Dict, List, Tuple
+
+import httpx
+
+from benchmarks.harness import add_baseline_arguments, finish, percentile, use_scratch_database
+
+# backend.main creates its engine and runs migrations on import
+use_scratch_database()
+
+from backend.main import app  # noqa: E402
+from backend.models import Entity, MockEndpoint  # noqa: E402
+from backend.database import SessionLocal  # noqa: E402
+from benchmarks.fixtures import HEADERS, SCHEMA, TEMPLATE, VALID_ORDER  # noqa: E402
+
+# One INFO line per request otherwise
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+# (method, path, body, expected status); {n} is replaced with a request counter
+REQUEST_MIX = [
+    ("GET", "/status", None, 200),
+    ("GET", "/users/{n}", None, 200),
+    ("GET", "/orders/{n}", None, 200),
+    ("POST", "/orders", VALID_ORDER, 201),
+]
+
+
+def seed(entities: int):
+    """Create the entities and their endpoints."""
+    db = SessionLocal()
+    try:
+        for e in range(1, entities + 1):
+            entity = Entity(name=f"load{e}", base_path=f"/api/load{e}")
+            db.add(entity)
+            db.flush()
+            db.add_all([
+                MockEndpoint(entity_id=entity.id, name="status", method="GET", path="/status",
+                             response_body='{"status": "ok"}', response_code=200),
+                MockEndpoint(entity_id=entity.id, name="user", method="GET", path="/users/{id}",
+                             response_body='{"id": "{{uuid}}", "name": "{{random_name}}"}', response_code=200),
+                MockEndpoint(entity_id=entity.id, name="order", method="GET", path="/orders/{id}",
+                             response_body=TEMPLATE, response_code=200),
+                MockEndpoint(entity_id=entity.id, name="create order", method="POST", path="/orders",
+                             response_body=TEMPLATE, response_code=201,
+                             request_schema=SCHEMA, schema_validation_enabled=True),
+            ])
+        db.commit()
+    finally:
+        db.close()
+
+
+async def run_load(entities: int, concurrency: int, requests: int) -> Tuple[List[float], int, float]:
+    """
+    Send `requests` mock requests from `concurrency` workers.
+
+    Returns:
+        (latencies in ms, unexpected responses, wall time in seconds)
+    """
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(requests))
+    headers = {key: value for key, value in HEADERS.items() if key != "host"}
+
+    async def worker(client: httpx.AsyncClient, rng: random.Random):
+        nonlocal errors
+        for n in counter:
+            method, path, body, expected = REQUEST_MIX[n % len(REQUEST_MIX)]
+            url = f"/api/load{rng.randint(1, entities)}{path.format(n=n)}"
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, url, headers=headers,
+                                                content=json.dumps(body) if body is not None else None)
+                if response.status_code != expected:
+                    errors += 1
+            except Exception:
+                errors += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://mocklab.test") as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client, random.Random(i)) for i in range(concurrency)))
+        wall = time.perf_counter() - started
+    return latencies, errors, wall
+
+
+async def run(args) -> Dict[str, float]:
+    await app.router.startup()
+    try:
+        # Warm up the route table, compiled templates and connection pool
+        await run_load(args.entities, args.concurrency, min(args.requests, 200))
+        latencies, errors, wall = await run_load(args.entities, args.concurrency, args.requests)
+    finally:
+        await app.router.shutdown()
+
+    latencies.sort()
+    return {
+        "rps": round(len(latencies) / wall, 1),
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+        "max_ms": round(latencies[-1], 3) if latencies else 0.0,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test of the mock data plane")
+    parser.add_argument("--entities", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=5000)
+    add_baseline_arguments(parser, "load")
+    args = parser.parse_args()
+
+    print(f"Seeding {args.entities} entities x {len(REQUEST_MIX)} endpoints...")
+    seed(args.entities)
+    print(f"Sending {args.requests} requests from {args.concurrency} workers...")
+    summary = asyncio.run(run(args))
+
+    for metric, value in summary.items():
+        print(f"  {metric:<8}{value:>12}")
+    if summary["errors"]:
+        print(f"\nFAIL: {summary['errors']} unexpected response(s)", file=sys.stderr)
+        return 1
+
+    return finish(args, "load", {"mock_requests": summary})
+
+
+if __name__ == "__main__":
+    sys.exit(main())
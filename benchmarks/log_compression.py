@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Request log compression benchmark.
+
+Reports the compression ratio and the per-log encode/decode cost of the storage
+formats supported by backend/log_codec.py (plain, zlib, zstd, zstd with a trained
+dictionary).
+
+Payloads are synthetic mock traffic by default, or the most recent logs of an
+entity from the configured database (DATABASE_URL) with --entity-id.
+
+Usage:
+    python -m benchmarks.log_compression [--count 5000] [--level 3] [--entity-id 1]
+"""
+import sys
+import json
+import zlib
+import time
+import random
+import argparse
+import uuid
+from typing import Callable, List, Tuple
+
+from backend.log_codec import (
+    ZSTD_AVAILABLE, LOG_DICTIONARY_SIZE, PAYLOAD_FIELDS, pack_payload, unpack_payload
+)
+
+if ZSTD_AVAILABLE:
+    import zstandard
+
+
+def synthetic_payloads(count: int, seed: int = 42) -> List[bytes]:
+    """Generate repetitive request/response payloads like a typical mock entity receives."""
+    rng = random.Random(seed)
+    agents = ["python-requests/2.31.0", "okhttp/4.12.0", "axios/1.6.2"]
+    payloads = []
+    for i in range(count):
+        headers = {
+            "host": "mocklab.example.com",
+            "user-agent": rng.choice(agents),
+            "accept": "application/json",
+            "accept-encoding": "gzip, deflate",
+            "content-type": "application/json",
+            "x-request-id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "authorization": "Bearer " + "x" * 40,
+        }
+        request_body = {
+            "order_id": f"ORD-{100000 + i}",
+            "customer": {"id": rng.randint(1, 5000), "tier": rng.choice(["gold", "silver", "bronze"])},
+            "items": [
+                {"sku": f"SKU-{rng.randint(1, 300)}", "quantity": rng.randint(1, 5), "price": round(rng.uniform(1, 200), 2)}
+                for _ in range(rng.randint(1, 4))
+            ],
+            "currency": "USD",
+        }
+        response_body = {
+            "status": "accepted",
+            "order_id": request_body["order_id"],
+            "tracking_id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "estimated_delivery_days": rng.randint(1, 7),
+            "message": "Your order has been received and is being processed",
+        }
+        payloads.append(pack_payload({
+            "request_headers": json.dumps(headers),
+            "request_body": json.dumps(request_body),
+            "response_body": json.dumps(response_body),
+        }))
+    return payloads
+
+
+def database_payloads(entity_id: int, count: int) -> List[bytes]:
+    """Load the most recent payloads of an entity from the configured database."""
+    from backend.database import SessionLocal
+    from backend.models import RequestLog
+    from backend.log_codec import get_log_codec
+
+    db = SessionLocal()
+    try:
+        logs = db.query(RequestLog).filter(
+            RequestLog.entity_id == entity_id
+        ).order_by(RequestLog.id.desc()).limit(count).all()
+        get_log_codec().decode_logs(db, logs)
+        return [pack_payload({field: getattr(log, field) for field in PAYLOAD_FIELDS}) for log in logs]
+    finally:
+        db.close()
+
+
+def measure(
+    name: str,
+    payloads: List[bytes],
+    encode: Callable[[bytes], bytes],
+    decode: Callable[[bytes], bytes]
+) -> Tuple[str, float, float, float]:
+    """Encode and decode every payload. Returns (name, ratio, encode us/log, decode us/log)."""
+    start = time.perf_counter()
+    encoded = [encode(p) for p in payloads]
+    encode_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for data in encoded:
+        unpack_payload(decode(data))
+    decode_time = time.perf_counter() - start
+
+    raw_size = sum(len(p) for p in payloads)
+    stored_size = sum(len(e) for e in encoded)
+    return (
+        name,
+        raw_size / stored_size,
+        encode_time / len(payloads) * 1e6,
+        decode_time / len(payloads) * 1e6,
+    )
+
+
+def run(payloads: List[bytes], level: int) -> List[Tuple[str, float, float, float]]:
+    """Run all codecs. The first 20% of payloads train the dictionary, the rest are measured."""
+    split = max(1, len(payloads) // 5)
+    training, measured = payloads[:split], payloads[split:]
+
+    results = [
+        measure("plain", measured, lambda p: p, lambda d: d),
+        measure(f"zlib-{level}", measured, lambda p: zlib.compress(p, level), zlib.decompress),
+    ]
+
+    if not ZSTD_AVAILABLE:
+        print("zstandard is not installed; skipping zstd codecs", file=sys.stderr)
+        return results
+
+    compressor = zstandard.ZstdCompressor(level=level)
+    decompressor = zstandard.ZstdDecompressor()
+    results.append(measure(f"zstd-{level}", measured, compressor.compress, decompressor.decompress))
+
+    try:
+        dictionary = zstandard.train_dictionary(LOG_DICTIONARY_SIZE, training)
+    except zstandard.ZstdError as e:
+        print(f"Dictionary training failed ({e}); skipping zstd+dict", file=sys.stderr)
+        return results
+    dict_compressor = zstandard.ZstdCompressor(level=level, dict_data=dictionary)
+    dict_decompressor = zstandard.ZstdDecompressor(dict_data=dictionary)
+    results.append(measure(
+        f"zstd-{level}+dict({len(dictionary.as_bytes()) // 1024}KB)",
+        measured, dict_compressor.compress, dict_decompressor.decompress
+    ))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark request log compression")
+    parser.add_argument("--count", type=int, default=5000, help="Number of log payloads")
+    parser.add_argument("--level", type=int, default=3, help="Compression level")
+    parser.add_argument("--entity-id", type=int, default=None, help="Use logs of this entity instead of synthetic data")
+    args = parser.parse_args()
+
+    if args.entity_id is not None:
+        payloads = database_payloads(args.entity_id, args.count)
+        source = f"entity {args.entity_id}"
+    else:
+        payloads = synthetic_payloads(args.count)
+        source = "synthetic"
+    if len(payloads) < 10:
+        print(f"Not enough payloads to benchmark ({len(payloads)})", file=sys.stderr)
+        return 1
+
+    average = sum(len(p) for p in payloads) / len(payloads)
+    print(f"Payloads: {len(payloads)} ({source}), average {average:.0f} bytes")
+    print()
+    print(f"{'codec':<26}{'ratio':>8}{'encode us/log':>16}{'decode us/log':>16}")
+    for name, ratio, encode_us, decode_us in run(payloads, args.level):
+        print(f"{name:<26}{ratio:>8.2f}{encode_us:>16.1f}{decode_us:>16.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
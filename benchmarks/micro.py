@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks of the mock data plane.
+
+Times the per-request building blocks of handle_mock_request in isolation:
+path matching and route resolution, placeholder rendering, request schema
+validation, scenario selection and request log serialization. Each result is
+the fastest of several rounds, in microseconds per call.
+
+Results are compared against a JSON baseline (see benchmarks/harness.py).
+
+Usage:
+    python -m benchmarks.micro [--save-baseline] [--baseline PATH] [--tolerance 0.15] [--only PREFIX]
+"""
+import sys
+import json
+import argparse
+from datetime import datetime
+from typing import Callable, Dict
+
+from benchmarks.harness import add_baseline_arguments, finish, time_per_op, use_scratch_database
+
+# backend.main creates its engine and runs migrations on import
+use_scratch_database()
+
+from backend.main import match_path, log_summary  # noqa: E402
+from backend.models import Entity, MockEndpoint  # noqa: E402
+from backend.routing import RouteTable  # noqa: E402
+from backend.placeholders import placeholder_engine  # noqa: E402
+from backend.schema_validator import schema_validator  # noqa: E402
+from backend.response_plans import compile_response_plan  # noqa: E402
+from backend.log_headers import normalize_headers  # noqa: E402
+from backend.log_writer import RequestLogWriter  # noqa: E402
+from benchmarks.fixtures import HEADERS, INVALID_ORDER, SCHEMA, TEMPLATE, VALID_ORDER  # noqa: E402
+
+
+def mock_endpoint(endpoint_id: int, entity_id: int, path: str, **fields) -> MockEndpoint:
+    """Transient MockEndpoint with the column defaults filled in."""
+    values = dict(
+        id=endpoint_id, entity_id=entity_id, name=f"ep{endpoint_id}", method="GET", path=path,
+        response_body='{"ok": true}', response_code=200, response_headers="{}", delay_ms=0,
+        is_active=True, response_scenarios="[]", active_scenario_index=0,
+        scenario_selection_mode="fixed", scenario_weights="[]", callback_enabled=False,
+        schema_validation_enabled=False, config_revision=1,
+    )
+    values.update(fields)
+    return MockEndpoint(**values)
+
+
+def build_route_table(entities: int = 100, endpoints_per_entity: int = 20) -> RouteTable:
+    """Route table with static and parameterized endpoints, built without a database."""
+    table = RouteTable()
+    endpoint_id = 0
+    for entity_id in range(1, entities + 1):
+        table.sync_entity(Entity(
+            id=entity_id, base_path=f"/api/entity{entity_id}", config_revision=1,
+            log_level="full", log_sample_rate=1.0, error_log_level="full", server_timing_enabled=False
+        ))
+        for i in range(endpoints_per_entity):
+            endpoint_id += 1
+            path = f"/resources{i}/{{id}}/items/{{item_id}}" if i % 2 else f"/resources{i}"
+            table.sync_endpoint(mock_endpoint(endpoint_id, entity_id, path))
+    table.loaded = True
+    return table
+
+
+def benchmarks() -> Dict[str, Callable[[], object]]:
+    """Benchmark name -> function under test."""
+    table = build_route_table()
+    weighted_plan = compile_response_plan(mock_endpoint(
+        1, 1, "/orders",
+        response_scenarios=json.dumps([
+            {"name": f"s{i}", "response_code": 200 + i, "response_body": '{"ok": true}'} for i in range(5)
+        ]),
+        scenario_selection_mode="weighted", scenario_weights="[5, 1, 1, 2, 1]"
+    ))
+    template = placeholder_engine.get_template(TEMPLATE)
+    record = {
+        "id": 1, "entity_id": 1, "mock_endpoint_id": 1, "method": "POST", "path": "/orders",
+        "request_headers": normalize_headers(HEADERS), "request_body": json.dumps(VALID_ORDER),
+        "query_params": "{}", "response_code": 201, "response_body": template.render(),
+        "timestamp": datetime.utcnow(), "duration_ms": 1.234, "request_size": 80, "response_size": 250,
+    }
+
+    return {
+        "match_path/static": lambda: match_path("/users", "/users"),
+        "match_path/param": lambda: match_path("/users/{id}/orders/{order_id}", "/users/42/orders/7"),
+        "route/resolve_static": lambda: table.resolve("GET", "/api/entity57/resources10"),
+        "route/resolve_param": lambda: table.resolve("GET", "/api/entity57/resources11/5/items/9"),
+        "route/resolve_miss": lambda: table.resolve("GET", "/api/entity57/unknown"),
+        "placeholders/replace": lambda: placeholder_engine.replace_placeholders(TEMPLATE),
+        "placeholders/render_compiled": template.render,
+        "schema/validate_valid": lambda: schema_validator.validate_request(SCHEMA, VALID_ORDER),
+        "schema/validate_invalid": lambda: schema_validator.validate_request(SCHEMA, INVALID_ORDER),
+        "scenario/select_weighted": weighted_plan.select,
+        "log/row": lambda: RequestLogWriter._row({**record, "request_headers": normalize_headers(HEADERS)}),
+        "log/ws_summary": lambda: json.dumps(log_summary(record)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks of the mock data plane")
+    parser.add_argument("--only", default="", help="Run only benchmarks whose name starts with this prefix")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed rounds per benchmark")
+    add_baseline_arguments(parser, "micro")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'benchmark':<32}{'us/op':>10}")
+    for name, fn in benchmarks().items():
+        if not name.startswith(args.only):
+            continue
+        us_per_op = time_per_op(fn, repeat=args.repeat)
+        results[name] = {"us_per_op": round(us_per_op, 3)}
+        print(f"{name:<32}{us_per_op:>10.2f}")
+
+    return finish(args, "micro", results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
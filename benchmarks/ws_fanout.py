@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Live log WebSocket fan-out benchmark.
+
+Creates public entities through the admin API, opens N `/ws/logs/{entity_id}`
+clients per entity and drives mock requests at a target rate. Every request
+path carries a sequence number, so each log in a received `logs` frame can be
+matched to the request that produced it. Reports (a "frame" below is one log
+delivered to one viewer, however the server batches them):
+
+- broadcast latency: from sending the mock request to receiving its log
+  (includes the log flush interval and the fan-out batching window)
+- dropped frames: logs expected (successful requests x viewers of the
+  entity) but not received by the end of the drain period
+- server CPU (% of one core) and resident memory
+
+Two modes:
+
+- in process (default): the app is served by uvicorn on a random localhost
+  port inside this process, against a throwaway SQLite database. CPU and
+  memory are those of the whole process, clients included.
+- --url http://localhost:8001: an already running server. Pass --server-pid
+  to read its CPU and memory from /proc; the entities are deleted afterwards.
+
+Results are compared against a JSON baseline (see benchmarks/harness.py).
+
+Usage:
+    python -m benchmarks.ws_fanout [--entities 5] [--clients 20] [--rate 200] [--duration 10]
+                                   [--url URL] [--server-pid PID]
+                                   [--save-baseline] [--baseline PATH] [--tolerance 0.15]
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import logging
+import secrets
+import argparse
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+import websockets
+
+from benchmarks.harness import add_baseline_arguments, finish, percentile, use_scratch_database
+
+EVENT_PATH = "/events/{seq}"
+
+# One INFO line per request otherwise
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+def process_usage(pid="self") -> Optional[Dict[str, float]]:
+    """
+    CPU seconds (user + system) and resident memory of a process, read from /proc.
+
+    Returns:
+        {"cpu_seconds", "rss_mb"}, or None where /proc is not available
+    """
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # Fields after the parenthesized command name; utime and stime are fields 14 and 15
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open(f"/proc/{pid}/status") as f:
+            rss_kb = next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+    except (OSError, StopIteration, IndexError, ValueError):
+        return None
+    ticks = os.sysconf("SC_CLK_TCK")
+    return {"cpu_seconds": (int(fields[11]) + int(fields[12])) / ticks, "rss_mb": rss_kb / 1024}
+
+
+class FanoutRun:
+    """Clients, traffic and measurements of one benchmark run."""
+
+    def __init__(self, base_url: str, entities: int, clients: int):
+        self.base_url = base_url.rstrip("/")
+        self.ws_url = "ws" + self.base_url[len("http"):]
+        self.entity_count = entities
+        self.clients_per_entity = clients
+        self.prefix = f"wsbench-{secrets.token_hex(3)}"
+        self.token: Optional[str] = None
+        # entity id -> base path
+        self.entities: Dict[int, str] = {}
+        # seq -> (entity id, send time)
+        self.sent: Dict[int, tuple] = {}
+        # entity id -> successful requests
+        self.delivered_requests: Dict[int, int] = defaultdict(int)
+        self.failed_requests = 0
+        self.latencies: List[float] = []
+        self.frames_received = 0
+        # WebSocket messages carrying those frames
+        self.messages_received = 0
+
+    # ==================== Setup ====================
+
+    async def setup(self, client: httpx.AsyncClient):
+        """Register a throwaway user and create the public entities and their event endpoint."""
+        credentials = {"username": self.prefix, "password": secrets.token_urlsafe(16)}
+        response = await client.post("/auth/register", json={**credentials, "email": f"{self.prefix}@example.com"})
+        response.raise_for_status()
+        response = await client.post("/auth/login", json=credentials)
+        response.raise_for_status()
+        self.token = response.json()["token"]
+        headers = {"Authorization": f"Bearer {self.token}"}
+
+        for e in range(self.entity_count):
+            response = await client.post("/admin/entities", headers=headers, json={
+                "name": f"{self.prefix}-{e}", "is_public": True
+            })
+            response.raise_for_status()
+            entity = response.json()
+            response = await client.post(f"/admin/entities/{entity['id']}/endpoints", headers=headers, json={
+                "name": "event", "method": "POST", "path": "/events/{seq}",
+                "response_body": '{"received": true, "id": "{{uuid}}"}', "response_code": 202
+            })
+            response.raise_for_status()
+            self.entities[entity["id"]] = entity["base_path"]
+
+    async def teardown(self, client: httpx.AsyncClient):
+        headers = {"Authorization": f"Bearer {self.token}"}
+        for entity_id in self.entities:
+            await client.delete(f"/admin/entities/{entity_id}", headers=headers)
+
+    # ==================== Clients and traffic ====================
+
+    async def viewer(self, entity_id: int, ready: asyncio.Event, connected: List[int], stop: asyncio.Event):
+        """One live log viewer: connect, then time every frame until stopped."""
+        async with websockets.connect(f"{self.ws_url}/ws/logs/{entity_id}", max_size=None) as ws:
+            await ws.recv()  # "connected"
+            connected.append(entity_id)
+            if len(connected) == len(self.entities) * self.clients_per_entity:
+                ready.set()
+            while not stop.is_set():
+                try:
+                    message = await asyncio.wait_for(ws.recv(), timeout=0.2)
+                except asyncio.TimeoutError:
+                    continue
+                received = time.perf_counter()
+                data = json.loads(message)
+                if data.get("type") != "logs":
+                    continue
+                self.messages_received += 1
+                for log in data["logs"]:
+                    seq = int(log["path"].rsplit("/", 1)[1])
+                    if seq in self.sent:
+                        self.frames_received += 1
+                        self.latencies.append((received - self.sent[seq][1]) * 1000)
+
+    async def drive(self, client: httpx.AsyncClient, rate: float, duration: float, concurrency: int):
+        """Send mock requests round-robin over the entities, paced to `rate` per second."""
+        semaphore = asyncio.Semaphore(concurrency)
+        entity_ids = list(self.entities)
+        tasks = []
+
+        async def send(seq: int, entity_id: int):
+            async with semaphore:
+                self.sent[seq] = (entity_id, time.perf_counter())
+                try:
+                    response = await client.post(
+                        self.entities[entity_id] + EVENT_PATH.format(seq=seq), json={"seq": seq}
+                    )
+                    if response.status_code == 202:
+                        self.delivered_requests[entity_id] += 1
+                    else:
+                        self.failed_requests += 1
+                except httpx.HTTPError:
+                    self.failed_requests += 1
+
+        started = time.perf_counter()
+        total = int(rate * duration)
+        for seq in range(total):
+            delay = started + seq / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(send(seq, entity_ids[seq % len(entity_ids)])))
+        await asyncio.gather(*tasks)
+        return time.perf_counter() - started
+
+    def frames_expected(self) -> int:
+        return sum(self.delivered_requests.values()) * self.clients_per_entity
+
+
+async def run_benchmark(args, base_url: str, server_pid) -> Dict[str, float]:
+    run = FanoutRun(base_url, args.entities, args.clients)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=run.base_url, limits=limits, timeout=30) as client:
+        await run.setup(client)
+        print(f"Opening {args.clients} viewers on each of {args.entities} entities...")
+        ready, stop, connected = asyncio.Event(), asyncio.Event(), []
+        viewers = [
+            asyncio.create_task(run.viewer(entity_id, ready, connected, stop))
+            for entity_id in run.entities for _ in range(args.clients)
+        ]
+        try:
+            await asyncio.wait_for(ready.wait(), timeout=60)
+
+            print(f"Sending {args.rate:g} requests/s for {args.duration:g}s...")
+            before = process_usage(server_pid)
+            peak_rss = before["rss_mb"] if before else 0.0
+            sampling = True
+
+            async def sample_memory():
+                nonlocal peak_rss
+                while sampling:
+                    usage = process_usage(server_pid)
+                    if usage:
+                        peak_rss = max(peak_rss, usage["rss_mb"])
+                    await asyncio.sleep(0.25)
+
+            sampler = asyncio.create_task(sample_memory())
+            started = time.perf_counter()
+            send_time = await run.drive(client, args.rate, args.duration, args.concurrency)
+
+            # Wait for outstanding frames, up to the drain period
+            deadline = time.perf_counter() + args.drain
+            while run.frames_received < run.frames_expected() and time.perf_counter() < deadline:
+                await asyncio.sleep(0.05)
+            wall = time.perf_counter() - started
+            sampling = False
+            await sampler
+            after = process_usage(server_pid)
+        finally:
+            stop.set()
+            await asyncio.gather(*viewers, return_exceptions=True)
+            await run.teardown(client)
+
+    expected = run.frames_expected()
+    latencies = sorted(run.latencies)
+    summary = {
+        "rps": round(sum(run.delivered_requests.values()) / send_time, 1),
+        "failed_requests": run.failed_requests,
+        "frames_expected": expected,
+        "frames_received": run.frames_received,
+        "ws_messages": run.messages_received,
+        "dropped_frames": max(expected - run.frames_received, 0),
+        "drop_rate": round(max(expected - run.frames_received, 0) / expected, 4) if expected else 0.0,
+        "broadcast_p50_ms": round(percentile(latencies, 0.50), 3),
+        "broadcast_p95_ms": round(percentile(latencies, 0.95), 3),
+        "broadcast_p99_ms": round(percentile(latencies, 0.99), 3),
+        "broadcast_max_ms": round(latencies[-1], 3) if latencies else 0.0,
+    }
+    if before and after:
+        summary["cpu_percent"] = round((after["cpu_seconds"] - before["cpu_seconds"]) / wall * 100, 1)
+        summary["peak_rss_mb"] = round(peak_rss, 1)
+    return summary
+
+
+async def run_in_process(args) -> Dict[str, float]:
+    """Serve the app with uvicorn on a random localhost port of this process and run the benchmark."""
+    use_scratch_database()
+    import uvicorn
+    from backend.main import app
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(app, log_level="warning", ws_max_size=16 * 1024 * 1024))
+    serving = asyncio.create_task(server.serve(sockets=[sock]))
+    while not server.started:
+        if serving.done():
+            serving.result()
+        await asyncio.sleep(0.05)
+    try:
+        return await run_benchmark(args, f"http://127.0.0.1:{port}", "self")
+    finally:
+        server.should_exit = True
+        await serving
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Live log WebSocket fan-out benchmark")
+    parser.add_argument("--entities", type=int, default=5)
+    parser.add_argument("--clients", type=int, default=20, help="WebSocket viewers per entity")
+    parser.add_argument("--rate", type=float, default=200, help="Mock requests per second (all entities)")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds of traffic")
+    parser.add_argument("--concurrency", type=int, default=64, help="Maximum requests in flight")
+    parser.add_argument("--drain", type=float, default=5, help="Seconds to wait for outstanding frames")
+    parser.add_argument("--url", help="Benchmark a running server (e.g. http://localhost:8001) instead of in process")
+    parser.add_argument("--server-pid", type=int, help="PID of the --url server, to report its CPU and memory")
+    add_baseline_arguments(parser, "ws_fanout")
+    args = parser.parse_args()
+
+    if args.url:
+        summary = asyncio.run(run_benchmark(args, args.url, args.server_pid))
+    else:
+        summary = asyncio.run(run_in_process(args))
+
+    for metric, value in summary.items():
+        print(f"  {metric:<20}{value:>12}")
+    if "cpu_percent" not in summary:
+        print("  (no CPU/memory: pass --server-pid on Linux)")
+
+    # Counts depend on the run parameters; compare rates, latencies and resources
+    compared = {metric: value for metric, value in summary.items()
+                if metric not in ("failed_requests", "frames_expected", "frames_received", "ws_messages", "dropped_frames")}
+    return finish(args, "ws_fanout", {"fanout": compared})
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1185,10 +1185,15 @@ function EntityDetail() {
     
     ws.current.onmessage = (event) => {
       const data = JSON.parse(event.data)
-      if (data.type === 'new_log') {
-        setLogs(prevLogs => [data.log, ...prevLogs])
+      if (data.type === 'logs') {
+        // Batched log summaries, oldest first; bodies are loaded when a log is selected
+        const newLogs = [...data.logs].reverse()
+        setLogs(prevLogs => [...newLogs, ...prevLogs])
         // Auto-select first log if none selected
         setSelectedLogIndex(prev => prev === -1 ? 0 : prev)
+      } else if (data.type === 'logs_skipped') {
+        // The server dropped logs while this tab was falling behind; reload the latest ones
+        loadLogs()
       }
     }
     
@@ -1239,6 +1244,23 @@ function EntityDetail() {
     }
   }
 
+  const loadLogDetail = async (logId) => {
+    try {
+      const response = await api.get(`/admin/logs/${logId}`)
+      setLogs(prevLogs => prevLogs.map(log => log.id === logId ? response.data : log))
+    } catch (error) {
+      console.error('Error loading log details:', error)
+    }
+  }
+
+  // Live logs arrive as summaries; fetch headers and bodies of the selected one
+  const selectedLog = logs[selectedLogIndex]
+  useEffect(() => {
+    if (selectedLog && selectedLog.request_headers === undefined) {
+      loadLogDetail(selectedLog.id)
+    }
+  }, [selectedLog && selectedLog.id])
+
   const deleteEndpoint = async (id) => {
     if (!confirm('Are you sure you want to delete this endpoint?')) return
     
@@ -1254,10 +1276,18 @@ function EntityDetail() {
     if (!confirm('Are you sure you want to clear all logs?')) return
     
     try {
-      await api.delete(`/admin/entities/${entityId}/logs`)
-      setLogs([])
+      // Logs are deleted by a background job; wait for it before reloading the list
+      let { data: job } = await api.delete(`/admin/entities/${entityId}/logs`)
+      while (job.status === 'pending' || job.status === 'running') {
+        await new Promise(resolve => setTimeout(resolve, 1000))
+        job = (await api.get(`/admin/log-jobs/${job.job_id}`)).data
+      }
+      if (job.status === 'failed') {
+        alert('Error clearing logs: ' + (job.error || 'job failed'))
+      }
+      loadLogs()
     } catch (error) {
-      alert('Error clearing logs: ' + error.message)
+      alert('Error clearing logs: ' + (error.response?.data?.detail || error.message))
     }
   }
 
@@ -2670,6 +2700,7 @@ function LogDetailView({ log }) {
   const [showRequestBody, setShowRequestBody] = useState(true) // Open by default
   const [showResponseHeaders, setShowResponseHeaders] = useState(false)
   const [showResponseBody, setShowResponseBody] = useState(false)
+  const detailsLoading = log.request_headers === undefined
   
   const methodColors = {
     GET: 'bg-green-100 text-green-800',
@@ -2731,67 +2762,74 @@ function LogDetailView({ log }) {
         <code className="block p-3 bg-gray-50 rounded text-sm break-all">{log.path}</code>
       </div>
 
-      {/* Query Parameters */}
-      {log.query_params && log.query_params !== '{}' && (
-        <div>
-          <h5 className="font-semibold text-sm text-gray-700 mb-2">Query Parameters</h5>
-          <pre className="bg-gray-50 p-3 rounded text-sm overflow-auto max-h-64">
-            {JSON.stringify(JSON.parse(log.query_params), null, 2)}
-          </pre>
-        </div>
-      )}
-
-      {/* Request Headers - Collapsible */}
-      <ToggleSection 
-        title="Request Headers" 
-        isOpen={showRequestHeaders} 
-        onToggle={() => setShowRequestHeaders(!showRequestHeaders)}
-        hasContent={log.request_headers && log.request_headers !== '{}'}
-      >
-        <pre className="bg-gray-50 p-3 rounded text-sm overflow-auto max-h-64">
-          {JSON.stringify(JSON.parse(log.request_headers), null, 2)}
-        </pre>
-      </ToggleSection>
-
-      {/* Request Body - Collapsible (Open by default) */}
-      <ToggleSection 
-        title="Request Body" 
-        isOpen={showRequestBody} 
-        onToggle={() => setShowRequestBody(!showRequestBody)}
-        hasContent={log.request_body}
-      >
-        <pre className="bg-gray-50 p-3 rounded text-sm overflow-auto max-h-96">
-          {log.request_body}
-        </pre>
-      </ToggleSection>
-
-      {/* Response Headers - Collapsible */}
-      <ToggleSection 
-        title="Response Headers" 
-        isOpen={showResponseHeaders} 
-        onToggle={() => setShowResponseHeaders(!showResponseHeaders)}
-        hasContent={true} // Always show as we might have custom headers
-      >
-        <pre className="bg-gray-50 p-3 rounded text-sm overflow-auto max-h-64">
-          {JSON.stringify(
-            log.response_headers ? JSON.parse(log.response_headers) : {}, 
-            null, 
-            2
+      {/* Live logs arrive as summaries; headers and bodies load on selection */}
+      {detailsLoading ? (
+        <p className="text-gray-500 text-sm">Loading request details...</p>
+      ) : (
+        <>
+          {/* Query Parameters */}
+          {log.query_params && log.query_params !== '{}' && (
+            <div>
+              <h5 className="font-semibold text-sm text-gray-700 mb-2">Query Parameters</h5>
+              <pre className="bg-gray-50 p-3 rounded text-sm overflow-auto max-h-64">
+                {JSON.stringify(JSON.parse(log.query_params), null, 2)}
+              </pre>
+            </div>
           )}
-        </pre>
-      </ToggleSection>
-
-      {/* Response Body - Collapsible */}
-      <ToggleSection 
-        title="Response Body" 
-        isOpen={showResponseBody} 
-        onToggle={() => setShowResponseBody(!showResponseBody)}
-        hasContent={true}
-      >
-        <pre className="bg-gray-50 p-3 rounded text-sm overflow-auto max-h-96">
-          {log.response_body}
-        </pre>
-      </ToggleSection>
+
+          {/* Request Headers - Collapsible */}
+          <ToggleSection 
+            title="Request Headers" 
+            isOpen={showRequestHeaders} 
+            onToggle={() => setShowRequestHeaders(!showRequestHeaders)}
+            hasContent={log.request_headers && log.request_headers !== '{}'}
+          >
+            <pre className="bg-gray-50 p-3 rounded text-sm overflow-auto max-h-64">
+              {log.request_headers ? JSON.stringify(JSON.parse(log.request_headers), null, 2) : ''}
+            </pre>
+          </ToggleSection>
+
+          {/* Request Body - Collapsible (Open by default) */}
+          <ToggleSection 
+            title="Request Body" 
+            isOpen={showRequestBody} 
+            onToggle={() => setShowRequestBody(!showRequestBody)}
+            hasContent={log.request_body}
+          >
+            <pre className="bg-gray-50 p-3 rounded text-sm overflow-auto max-h-96">
+              {log.request_body}
+            </pre>
+          </ToggleSection>
+
+          {/* Response Headers - Collapsible */}
+          <ToggleSection 
+            title="Response Headers" 
+            isOpen={showResponseHeaders} 
+            onToggle={() => setShowResponseHeaders(!showResponseHeaders)}
+            hasContent={true} // Always show as we might have custom headers
+          >
+            <pre className="bg-gray-50 p-3 rounded text-sm overflow-auto max-h-64">
+              {JSON.stringify(
+                log.response_headers ? JSON.parse(log.response_headers) : {}, 
+                null, 
+                2
+              )}
+            </pre>
+          </ToggleSection>
+
+          {/* Response Body - Collapsible */}
+          <ToggleSection 
+            title="Response Body" 
+            isOpen={showResponseBody} 
+            onToggle={() => setShowResponseBody(!showResponseBody)}
+            hasContent={true}
+          >
+            <pre className="bg-gray-50 p-3 rounded text-sm overflow-auto max-h-96">
+              {log.response_body}
+            </pre>
+          </ToggleSection>
+        </>
+      )}
     </div>
   )
 }